@@ -7,8 +7,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+import codecs
+import contextvars
+import inspect
 import os
+import tempfile
+import time
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # pyarrow 확인 및 설정
 try:
@@ -20,7 +27,13 @@ except ImportError:
     import warnings
     warnings.filterwarnings('ignore', category=UserWarning, message='.*pyarrow.*')
 
-from snowflake_connector import get_snowflake_connector, format_currency, format_percentage
+from snowflake_connector import (
+    get_snowflake_connector, QueryFilters, ResultPager, query_label, query_workload, WORKLOAD_TILE, WORKLOAD_ADHOC,
+)
+from formatting import format_currency, format_metric_value, style_currency
+from financial_ratios import ratio_engine
+from figure_cache import figure_cache
+from tracing import tracer, span, start_metrics_server
 
 # 페이지 설정
 st.set_page_config(
@@ -30,7 +43,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# shadcn/ui 디자인 시스템 적용
+# shadcn/ui 디자인 시스템 적용 (주입 시간은 inject_css span으로 기록)
+css_started = time.perf_counter()
 st.markdown("""
 <style>
     /* shadcn/ui Color Palette - CSS Variables */
@@ -274,13 +288,37 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
+tracer.observe("inject_css", time.perf_counter() - css_started)
+
+
+# 데이터셋별 결과 캐시 유지 시간 (초)
+SUMMARY_CACHE_TTL = 300         # 주요 지표: 당일 기준 데이터
+STATEMENT_CACHE_TTL = 3600      # 손익계산서/재무상태표: 마감 데이터
+
+
+# 데이터셋별 조회 조건 컬럼 (QueryFilters.where 인자)
+# 기간은 기준일자/매출일자, 연도는 연도 컬럼에 그대로 비교해 클러스터링 키로 pruning되도록 함
+# 예시 쿼리에 없는 컬럼은 비워 두었으며, 실제 테이블로 바꿀 때 함께 지정하세요
+SUMMARY_FILTER_COLUMNS = {}
+INCOME_FILTER_COLUMNS = {'year_column': '연도'}
+BALANCE_FILTER_COLUMNS = {}
+SALES_FILTER_COLUMNS = {'date_column': '매출일자', 'department_column': '부서명'}
+DATASET_FILTER_COLUMNS = (SUMMARY_FILTER_COLUMNS, INCOME_FILTER_COLUMNS, BALANCE_FILTER_COLUMNS, SALES_FILTER_COLUMNS)
+
+
+def filter_supported(column_key):
+    """column_key(brand_column 등) 조건을 적용하는 데이터셋이 하나라도 있는지 여부"""
+    return any(column_key in columns for columns in DATASET_FILTER_COLUMNS)
 
 
-def load_financial_summary(connector):
+def load_financial_summary(connector, filters=None):
     """주요 재무 지표 요약 데이터 로드"""
     # 실제 테이블 구조에 맞게 쿼리를 수정해야 합니다
     # 예시 쿼리 (실제 테이블명과 컬럼명에 맞게 수정 필요)
+    # 실제 테이블로 바꾸면 SUMMARY_FILTER_COLUMNS에 조회 조건 컬럼을 지정하세요
+    where, params = (filters or QueryFilters()).where(**SUMMARY_FILTER_COLUMNS)
     query = """
+    SELECT * FROM (
     -- 주요 재무 지표 조회 쿼리
     -- 실제 테이블 구조에 맞게 수정이 필요합니다
     SELECT 
@@ -318,21 +356,25 @@ def load_financial_summary(connector):
         12.5,
         '%',
         1.2
-    """
+    ) WHERE {where}
+    """.format(where=where)
     
-    try:
-        return connector.execute_query(query)
-    except Exception as e:
-        st.error(f"데이터 로드 오류: {str(e)}")
-        return None
+    return connector.execute_query(query, params, ttl=SUMMARY_CACHE_TTL)
 
 
-def load_income_statement(connector, years=3):
-    """손익계산서 데이터 로드"""
+def load_income_statement(connector, filters=None, years=3):
+    """손익계산서 데이터 로드 (연도를 선택하지 않으면 최근 years개 연도)"""
+    filters = filters or QueryFilters()
+    if not filters.years:
+        current_year = datetime.now().year
+        filters = filters.replace(years=range(current_year - years + 1, current_year + 1))
+    where, params = filters.where(**INCOME_FILTER_COLUMNS)
+    
     # 실제 테이블 구조에 맞게 쿼리를 수정해야 합니다
     query = """
     -- 손익계산서 데이터 조회 쿼리
     -- 실제 테이블 구조에 맞게 수정이 필요합니다
+    SELECT * FROM (
     SELECT 
         '매출액' as "항목",
         2024 as "연도",
@@ -359,21 +401,21 @@ def load_income_statement(connector, years=3):
     SELECT '순이익', 2023, 113000000000
     UNION ALL
     SELECT '순이익', 2022, 105000000000
-    """
+    ) WHERE {where}
+    """.format(where=where)
     
-    try:
-        return connector.execute_query(query)
-    except Exception as e:
-        st.error(f"손익계산서 데이터 로드 오류: {str(e)}")
-        return None
+    return connector.execute_query(query, params, ttl=STATEMENT_CACHE_TTL)
 
 
-def load_balance_sheet(connector):
+def load_balance_sheet(connector, filters=None):
     """재무상태표 데이터 로드"""
+    where, params = (filters or QueryFilters()).where(**BALANCE_FILTER_COLUMNS)
+    
     # 실제 테이블 구조에 맞게 쿼리를 수정해야 합니다
     query = """
     -- 재무상태표 데이터 조회 쿼리
     -- 실제 테이블 구조에 맞게 수정이 필요합니다
+    SELECT * FROM (
     SELECT 
         '현금 및 현금성자산' as "항목",
         500000000000 as "값",
@@ -392,13 +434,301 @@ def load_balance_sheet(connector):
     SELECT '자본금', 500000000000, '자본'
     UNION ALL
     SELECT '이익잉여금', 2150000000000, '자본'
+    ) WHERE {where}
+    """.format(where=where)
+    
+    return connector.execute_query(query, params, ttl=STATEMENT_CACHE_TTL)
+
+
+# 일별 매출 추이 (매출테이블, 조회 기간 - 기본 최근 12개월)
+# {filters}는 조회 조건, {watermark_filter}는 증분 조회 시 "매출일자 >= 마지막 워터마크"로 바뀜
+DAILY_SALES_QUERY = """
+SELECT 
+    TO_DATE(매출일자) as "매출일자",
+    SUM(매출금액) as "매출액"
+FROM FNF.SAP_FNF.매출테이블
+WHERE {filters}
+    AND {watermark_filter}
+GROUP BY TO_DATE(매출일자)
+"""
+
+# 매출 추이 증분 조회 최소 간격 (초)
+SALES_TREND_REFRESH_INTERVAL = 60
+
+
+def load_daily_sales_trend(connector, filters=None):
+    """일별 매출 추이 데이터 로드 (마지막 워터마크 이후 일자만 증분 조회)
+    
+    증분 데이터셋은 조회 조건별로 따로 보관하므로, 세션마다 조건이 달라도 서로의 데이터셋을
+    처음부터 다시 조회하게 만들지 않습니다.
     """
+    filters = filters or QueryFilters()
+    # 기본 시작일은 날짜마다 바뀌므로 사용자가 지정한 조건으로 이름을 정함 (조건당 데이터셋 하나)
+    name = f"daily_sales:{filters.token(**SALES_FILTER_COLUMNS)}"
+    if filters.start_date is None:
+        filters = filters.replace(start_date=(pd.Timestamp.now() - pd.DateOffset(months=12)).normalize())
+    where, params = filters.where(**SALES_FILTER_COLUMNS)
+    return connector.refresh_incremental(
+        name,
+        DAILY_SALES_QUERY.replace('{filters}', where),
+        watermark_column='매출일자',
+        key_columns=['매출일자'],
+        min_interval=SALES_TREND_REFRESH_INTERVAL,
+        params=params
+    )
+
+
+# 매출 드릴다운 큐브의 팩트 (월 × 부서 × 제품 합계, 조회 기간 - 기본 최근 12개월)
+# 드릴다운/롤업/Top 10은 이 결과 한 번으로 만든 메모리 큐브에서 처리
+SALES_CUBE_QUERY = """
+SELECT 
+    DATE_TRUNC('MONTH', 매출일자) as "월",
+    부서명 as "부서",
+    제품명 as "제품",
+    SUM(매출금액) as "매출액",
+    SUM(판매수량) as "판매수량"
+FROM FNF.SAP_FNF.매출테이블
+WHERE {where}
+GROUP BY 1, 2, 3
+"""
+SALES_CUBE_DIMENSIONS = ['월', '부서', '제품']
+SALES_CUBE_MEASURES = ['매출액', '판매수량']
+SALES_CUBE_CACHE_TTL = 900
+
+
+def load_sales_cube(connector, filters=None):
+    """매출 드릴다운 큐브 로드 (팩트 결과가 캐시에서 바뀌지 않았으면 기존 큐브 재사용)"""
+    filters = filters or QueryFilters()
+    # 기본 시작일은 날짜마다 바뀌므로 사용자가 지정한 조건으로 이름을 정함 (조건당 큐브 하나)
+    name = f"sales_cube:{filters.token(**SALES_FILTER_COLUMNS)}"
+    if filters.start_date is None:
+        filters = filters.replace(start_date=(pd.Timestamp.now() - pd.DateOffset(months=12)).normalize())
+    where, params = filters.where(**SALES_FILTER_COLUMNS)
+    return connector.rollup_cube(
+        name,
+        SALES_CUBE_QUERY.format(where=where),
+        SALES_CUBE_DIMENSIONS,
+        SALES_CUBE_MEASURES,
+        params=params,
+        ttl=SALES_CUBE_CACHE_TTL
+    )
+
+
+# 페이지에서 사용하는 데이터셋: 이름 → (로더 함수, 오류 메시지)
+DATASET_LOADERS = {
+    'summary': (load_financial_summary, "데이터 로드 오류"),
+    'income': (load_income_statement, "손익계산서 데이터 로드 오류"),
+    'balance': (load_balance_sheet, "재무상태표 데이터 로드 오류"),
+    'sales_trend': (load_daily_sales_trend, "매출 추이 데이터 로드 오류"),
+    'sales_cube': (load_sales_cube, "매출 드릴다운 데이터 로드 오류"),
+}
+
+
+class DatasetLoader:
+    """페이지에 필요한 데이터셋을 스레드 풀에서 동시에 조회하는 로더
     
-    try:
-        return connector.execute_query(query)
-    except Exception as e:
-        st.error(f"재무상태표 데이터 로드 오류: {str(e)}")
-        return None
+    모든 쿼리를 한 번에 제출하므로 첫 화면까지의 대기 시간은 쿼리 시간의 합이 아니라
+    가장 느린 쿼리 하나의 시간이 됩니다. st.error 등 Streamlit 호출은 작업 스레드가 아닌
+    결과를 꺼내는 메인 스크립트 스레드에서만 합니다.
+    """
+    
+    def __init__(self, connector, filters=None, datasets=None):
+        self._datasets = datasets or DATASET_LOADERS
+        executor = ThreadPoolExecutor(max_workers=len(self._datasets), thread_name_prefix="dataset-loader")
+        # 작업 스레드에도 현재 실행의 쿼리 소유자(세션/실행 ID)를 전달 - 재실행 시 취소 대상 추적
+        self._futures = {
+            name: executor.submit(contextvars.copy_context().run, self._load, loader, connector, filters)
+            for name, (loader, _) in self._datasets.items()
+        }
+        executor.shutdown(wait=False)
+    
+    @staticmethod
+    def _load(loader, connector, filters):
+        """로더 함수 이름을 쿼리 성능 기록의 라벨과 span 라벨로 붙여 지표(tile) 등급으로 실행"""
+        with query_label(loader.__name__), query_workload(WORKLOAD_TILE), span("loader", loader=loader.__name__):
+            return loader(connector, filters)
+    
+    def as_completed(self):
+        """조회가 끝나는 순서대로 데이터셋 이름을 반환"""
+        names = {future: name for name, future in self._futures.items()}
+        for future in as_completed(names):
+            yield names[future]
+    
+    def done(self, name):
+        """데이터셋 조회 완료 여부"""
+        return self._futures[name].done()
+    
+    def get(self, name):
+        """데이터셋 결과 반환 (완료될 때까지 대기, 실패 시 오류 표시 후 None)"""
+        try:
+            return self._futures[name].result()
+        except Exception as e:
+            _, error_label = self._datasets[name]
+            st.error(f"{error_label}: {str(e)}")
+            return None
+
+
+# 프로세스 첫 연결 상태 확인 결과를 기다리는 최대 시간 (초) - 이후에는 기록된 상태를 바로 사용
+FIRST_HEALTH_CHECK_WAIT = 10
+
+# 조회 조건 기본 기간 (일) / 연도 선택지 개수
+FILTER_DEFAULT_DAYS = 365
+FILTER_YEAR_OPTIONS = 10
+
+# 성능 패널에 표시할 느린 쿼리 개수
+SLOW_QUERY_COUNT = 10
+
+# 커스텀 쿼리 실행 제한 시간 (초)
+CUSTOM_QUERY_TIMEOUT = 900
+
+# 커스텀 쿼리 결과 뷰어: 페이지당 행 수, 받아둘 페이지의 최대 행 수/메모리 (MB)
+CUSTOM_QUERY_PAGE_SIZE = int(os.getenv('CUSTOM_QUERY_PAGE_SIZE', '500'))
+CUSTOM_QUERY_CACHE_ROWS = int(os.getenv('CUSTOM_QUERY_CACHE_ROWS', '20000'))
+CUSTOM_QUERY_CACHE_MB = int(os.getenv('CUSTOM_QUERY_CACHE_MB', '64'))
+
+
+def write_csv_batch(csv_file, batch, include_header):
+    """Arrow/DataFrame 배치를 CSV 파일에 이어서 기록"""
+    if HAS_PYARROW and isinstance(batch, pyarrow.Table):
+        import pyarrow.csv as pa_csv
+        pa_csv.write_csv(batch, csv_file, write_options=pa_csv.WriteOptions(include_header=include_header))
+    else:
+        batch.to_csv(csv_file, index=False, header=include_header, encoding='utf-8')
+
+
+def run_custom_query(connector, query):
+    """커스텀 쿼리를 실행하고 결과 페이지 뷰어를 세션에 저장 (결과 행은 받아오지 않음)
+    
+    실행 대기 중에도 상태 표시를 갱신하므로, 취소 버튼이나 위젯 변경으로 재실행되면
+    그 시점에 쿼리가 취소됩니다.
+    """
+    status_placeholder = st.empty()
+    
+    def show_elapsed(elapsed):
+        status_placeholder.caption(f"⏳ 쿼리 실행 중... {elapsed:.0f}초")
+    
+    previous = st.session_state.pop('custom_result', None)
+    if previous is not None:
+        previous.close()
+    
+    result = connector.open_result(query, timeout=CUSTOM_QUERY_TIMEOUT, on_wait=show_elapsed)
+    status_placeholder.empty()
+    st.session_state.custom_result = ResultPager(
+        connector,
+        result,
+        page_size=CUSTOM_QUERY_PAGE_SIZE,
+        max_rows=CUSTOM_QUERY_CACHE_ROWS,
+        max_bytes=CUSTOM_QUERY_CACHE_MB * 1024 * 1024
+    )
+    st.session_state.custom_result_page = 1
+
+
+def render_result_pager(connector, pager):
+    """커스텀 쿼리 결과를 한 페이지씩 표시 (앞뒤 페이지는 미리 받아둠)"""
+    result = pager.result
+    if result.row_count == 0:
+        st.info("조회 결과가 없습니다")
+        return
+    
+    page = st.number_input("페이지", min_value=1, max_value=pager.page_count, step=1, key='custom_result_page')
+    show_dataframe(pager.page(int(page) - 1), "custom_query", hide_index=True)
+    st.caption(
+        f"✅ 총 {result.row_count:,}행 · {int(page)}/{pager.page_count} 페이지 "
+        f"({pager.page_size:,}행씩)"
+    )
+    
+    if st.button("📄 CSV 만들기", use_container_width=True):
+        export_result_csv(connector, result)
+
+
+def export_result_csv(connector, result):
+    """보관된 쿼리 결과 전체를 배치 단위로 CSV에 기록하고 다운로드 버튼 표시"""
+    status_placeholder = st.empty()
+    
+    # CSV는 배치마다 임시 파일에 기록하여 전체 결과를 메모리에 올리지 않음
+    with tempfile.TemporaryFile() as csv_file:
+        csv_file.write(codecs.BOM_UTF8)
+        
+        total_rows = 0
+        for batch in connector.iter_query_batches(connector.result_query(result), as_arrow=HAS_PYARROW):
+            write_csv_batch(csv_file, batch, include_header=total_rows == 0)
+            total_rows += len(batch)
+            status_placeholder.caption(f"⏳ {total_rows:,} / {result.row_count:,}행 기록 중...")
+        status_placeholder.empty()
+        
+        # 다운로드 버튼에는 완성된 CSV 바이트만 전달 (DataFrame 전체는 만들지 않음)
+        csv_file.seek(0)
+        st.download_button(
+            label="📥 CSV 다운로드",
+            data=csv_file.read(),
+            file_name=f"query_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
+
+
+def parse_filter_list(text):
+    """쉼표로 구분한 입력을 값 목록으로 변환"""
+    return [value.strip() for value in text.split(',') if value.strip()]
+
+
+def render_filter_controls():
+    """사이드바 조회 조건 입력 (기간, 연도, 브랜드, 부서) → QueryFilters"""
+    today = datetime.now().date()
+    period = st.date_input(
+        "기간",
+        value=(today - timedelta(days=FILTER_DEFAULT_DAYS), today),
+        max_value=today
+    )
+    # 시작일만 선택한 중간 상태에서는 종료일 없이 조회
+    start_date, end_date = (tuple(period) + (None, None))[:2] if isinstance(period, (tuple, list)) else (period, None)
+    
+    years = st.multiselect(
+        "연도 (선택하지 않으면 최근 3년)",
+        options=list(range(today.year, today.year - FILTER_YEAR_OPTIONS, -1))
+    )
+    # 조건 컬럼이 매핑된 데이터셋이 없으면 입력을 비활성화 (입력해도 아무것도 걸러지지 않음)
+    brand_supported = filter_supported('brand_column')
+    department_supported = filter_supported('department_column')
+    brands = st.text_input(
+        "브랜드", placeholder="예: MLB, DISCOVERY", disabled=not brand_supported,
+        help=None if brand_supported else "브랜드 컬럼이 있는 데이터셋이 없어 아직 사용할 수 없습니다"
+    )
+    departments = st.text_input(
+        "부서", placeholder="쉼표로 구분", disabled=not department_supported,
+        help="매출 추이/매출 드릴다운에 적용됩니다" if department_supported else None
+    )
+    
+    return QueryFilters(
+        start_date=start_date,
+        end_date=end_date,
+        years=years,
+        brands=parse_filter_list(brands) if brand_supported else (),
+        departments=parse_filter_list(departments) if department_supported else ()
+    )
+
+
+def show_cached_chart(chart, data, build, **spec):
+    """차트 캐시를 거쳐 Plotly 차트 표시 - 데이터 버전이나 사양이 바뀐 경우에만 build()로 생성
+    
+    data는 차트를 그리는 원본 DataFrame(파생 DataFrame이면 그 원본), spec은 차트 이름 외에
+    결과에 영향을 주는 값입니다. 생성 시간은 plotly_build span으로 기록합니다.
+    """
+    def timed_build():
+        with span("plotly_build", chart=chart):
+            return build()
+    show_chart(figure_cache.figure(data, dict(spec, chart=chart), timed_build), chart)
+
+
+def show_chart(fig, chart):
+    """Plotly 차트 표시 (직렬화/전송 시간을 plotly_chart span으로 기록)"""
+    with span("plotly_chart", chart=chart):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def show_dataframe(data, table, **kwargs):
+    """st.dataframe 표시 (직렬화/전송 시간을 dataframe span으로 기록)"""
+    with span("dataframe", table=table):
+        st.dataframe(data, **kwargs)
 
 
 def create_metric_card(label, value, unit="", change=None, change_label=""):
@@ -409,7 +739,7 @@ def create_metric_card(label, value, unit="", change=None, change_label=""):
         change_icon = "↑" if change >= 0 else "↓"
         change_html = f'<div class="metric-change {change_class}">{change_icon} {abs(change):.1f}% {change_label}</div>'
     
-    formatted_value = format_currency(value, unit) if unit == "원" else f"{value:,.1f} {unit}"
+    formatted_value = format_metric_value(value, unit)
     
     card_html = f"""
     <div class="metric-card">
@@ -421,105 +751,694 @@ def create_metric_card(label, value, unit="", change=None, change_label=""):
     return card_html
 
 
-def main():
-    # 헤더 - shadcn 스타일
-    st.markdown("""
-    <div class="main-header">
-        <h1>F&F 실적 대시보드</h1>
-        <p>실시간 재무 실적 모니터링</p>
-    </div>
-    """, unsafe_allow_html=True)
+def render_summary_tab(summary_data):
+    """탭 1: 전체 요약 렌더링"""
+    st.markdown("## 주요 재무 지표")
     
-    # 사이드바 - 연결 설정 및 테이블 탐색 (shadcn 스타일)
-    with st.sidebar:
-        st.markdown("### ⚙️ 설정")
+    # 디버깅: 데이터 확인
+    if summary_data is None:
+        st.error("❌ 데이터를 불러올 수 없습니다 (None 반환)")
+    elif summary_data.empty:
+        st.warning("⚠️ 데이터가 비어있습니다")
+    elif len(summary_data) == 0:
+        st.warning("⚠️ 데이터 행이 없습니다")
+    else:
+        st.success(f"✅ {len(summary_data)}개의 데이터 로드 완료")
+    
+    if summary_data is not None and not summary_data.empty and len(summary_data) > 0:
+        # 주요 지표 카드
+        cols = st.columns(3)
+        for idx, row in summary_data.head(6).iterrows():
+            with cols[idx % 3]:
+                change = row.get('변동률', None)
+                change_label = "전년 대비" if change is not None else ""
+                st.markdown(
+                    create_metric_card(
+                        row['항목'],
+                        row['값'],
+                        row.get('단위', ''),
+                        change,
+                        change_label
+                    ),
+                    unsafe_allow_html=True
+                )
         
-        # 환경 변수 상태 확인
-        env_status = {
-            "SNOWFLAKE_ACCOUNT": os.getenv('SNOWFLAKE_ACCOUNT'),
-            "SNOWFLAKE_USER": os.getenv('SNOWFLAKE_USER'),
-            "SNOWFLAKE_PASSWORD": "설정됨" if os.getenv('SNOWFLAKE_PASSWORD') else "미설정",
-            "SNOWFLAKE_WAREHOUSE": os.getenv('SNOWFLAKE_WAREHOUSE', 'DEV_WH'),
-            "SNOWFLAKE_DATABASE": os.getenv('SNOWFLAKE_DATABASE', 'FNF'),
-            "SNOWFLAKE_SCHEMA": os.getenv('SNOWFLAKE_SCHEMA', 'SAP_FNF'),
-            "SNOWFLAKE_ROLE": os.getenv('SNOWFLAKE_ROLE', 'PU_SQL_SAP')
-        }
+        st.divider()
         
-        with st.expander("🔍 환경 변수 확인", expanded=False):
-            for key, value in env_status.items():
-                if value:
-                    st.text(f"{key}: {value}")
-                else:
-                    st.error(f"{key}: ❌ 미설정")
+        # 차트
+        col1, col2 = st.columns(2)
         
-        # 연결 테스트
-        if st.button("🔌 Snowflake 연결 테스트", use_container_width=True):
-            try:
-                connector = get_snowflake_connector()
-                result = connector.test_connection()
-                if result["status"] == "success":
-                    st.success("✅ 연결 성공!")
-                    st.json(result)
-                else:
-                    st.error(f"❌ 연결 실패: {result.get('message', 'Unknown error')}")
-            except Exception as e:
-                error_msg = str(e)
-                st.error(f"❌ 연결 실패: {error_msg}")
-                if "환경 변수가 설정되지 않았습니다" in error_msg:
-                    st.info("💡 사이드바의 '환경 변수 확인'을 열어 설정 상태를 확인하세요.")
+        with col1:
+            st.subheader("주요 지표 비교")
+            # shadcn primary color: hsl(221.2 83.2% 53.3%)
+            def build_figure():
+                fig = px.bar(
+                    summary_data,
+                    x='항목',
+                    y='값',
+                    color='항목',
+                    color_discrete_sequence=['hsl(221.2, 83.2%, 53.3%)', 'hsl(221.2, 83.2%, 60%)', 'hsl(221.2, 83.2%, 65%)'],
+                    title="주요 재무 지표"
+                )
+                fig.update_layout(
+                    showlegend=False, 
+                    height=400,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("summary_values", summary_data, build_figure)
         
-        st.divider()
+        with col2:
+            st.markdown("### 변동률")
+            # shadcn destructive (red) and success (green) colors
+            def build_figure():
+                fig = px.bar(
+                    summary_data,
+                    x='항목',
+                    y='변동률',
+                    color='변동률',
+                    color_continuous_scale=['hsl(0, 84.2%, 60.2%)', 'hsl(142.1, 76.2%, 36.3%)'],
+                    title="전년 대비 변동률 (%)"
+                )
+                fig.update_layout(
+                    height=400,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("summary_changes", summary_data, build_figure)
         
-        # 테이블 탐색
-        st.markdown("### 📋 테이블 탐색")
-        if st.button("테이블 목록 조회", use_container_width=True):
-            try:
-                connector = get_snowflake_connector()
-                tables = connector.get_tables()
-                if tables:
-                    st.success(f"✅ {len(tables)}개의 테이블을 찾았습니다")
-                    for table in tables:
-                        with st.expander(table['TABLE_NAME']):
-                            st.write(f"**타입:** {table['TABLE_TYPE']}")
-                            st.write(f"**생성일:** {table.get('CREATED', 'N/A')}")
-                            # 컬럼 정보 조회
-                            if st.button(f"{table['TABLE_NAME']} 컬럼 보기", key=f"cols_{table['TABLE_NAME']}"):
-                                cols = connector.get_table_columns(table['TABLE_NAME'])
-                                st.dataframe(cols)
-                else:
-                    st.info("테이블이 없습니다")
-            except Exception as e:
-                st.error(f"오류: {str(e)}")
+        # 상세 테이블
+        st.subheader("상세 내역")
+        show_dataframe(summary_data, "summary", use_container_width=True)
+    else:
+        st.info("데이터를 불러올 수 없습니다. Snowflake 연결 및 쿼리를 확인하세요.")
+
+
+def render_income_tab(income_data):
+    """탭 2: 손익계산서 렌더링"""
+    st.markdown("## 손익계산서")
+    
+    if income_data is not None and not income_data.empty:
+        # 연도별 비교 차트
+        st.markdown("### 연도별 비교")
         
-        st.divider()
+        # 피벗 테이블 생성
+        pivot_data = income_data.pivot(index='항목', columns='연도', values='금액').reset_index()
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # shadcn color palette
+            def build_figure():
+                fig = px.bar(
+                    income_data,
+                    x='항목',
+                    y='금액',
+                    color='연도',
+                    barmode='group',
+                    color_discrete_sequence=[
+                        'hsl(221.2, 83.2%, 53.3%)',
+                        'hsl(221.2, 83.2%, 60%)',
+                        'hsl(221.2, 83.2%, 65%)'
+                    ],
+                    title="연도별 손익계산서 비교"
+                )
+                fig.update_layout(
+                    height=500,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("income_by_year", income_data, build_figure)
         
-        # 커스텀 쿼리 실행
-        st.markdown("### 🔍 커스텀 쿼리")
-        custom_query = st.text_area("SQL 쿼리 입력", height=150, label_visibility="collapsed", placeholder="SELECT * FROM ...")
-        if st.button("쿼리 실행", use_container_width=True):
+        with col2:
+            # 주요 항목 트렌드
+            main_items = ['매출액', '영업이익', '순이익']
+            trend_data = income_data[income_data['항목'].isin(main_items)]
+            
+            def build_figure():
+                fig = px.line(
+                    trend_data,
+                    x='연도',
+                    y='금액',
+                    color='항목',
+                    markers=True,
+                    color_discrete_sequence=[
+                        'hsl(221.2, 83.2%, 53.3%)',
+                        'hsl(142.1, 76.2%, 36.3%)',
+                        'hsl(0, 84.2%, 60.2%)'
+                    ],
+                    title="주요 항목 트렌드"
+                )
+                fig.update_layout(
+                    height=500,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("income_trend", income_data, build_figure)
+        
+        # 상세 테이블
+        st.markdown("### 상세 내역")
+        show_dataframe(style_currency(pivot_data), "income", use_container_width=True)
+    else:
+        st.info("손익계산서 데이터를 불러올 수 없습니다.")
+
+
+def render_balance_tab(balance_data):
+    """탭 3: 재무상태표 렌더링"""
+    st.markdown("## 재무상태표")
+    
+    if balance_data is not None and not balance_data.empty:
+        # 자산/부채/자본 요약
+        # 분류가 category dtype이어도 실제 있는 분류만 집계
+        summary_by_category = balance_data.groupby('분류', observed=True)['값'].sum().reset_index()
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("### 분류별 구성")
+            # shadcn color palette for pie chart
+            def build_figure():
+                fig = px.pie(
+                    summary_by_category,
+                    values='값',
+                    names='분류',
+                    color_discrete_sequence=[
+                        'hsl(221.2, 83.2%, 53.3%)',
+                        'hsl(142.1, 76.2%, 36.3%)',
+                        'hsl(0, 84.2%, 60.2%)',
+                        'hsl(38, 92%, 50%)',
+                        'hsl(280, 70%, 50%)'
+                    ],
+                    title="자산/부채/자본 구성"
+                )
+                fig.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("balance_composition", balance_data, build_figure)
+        
+        with col2:
+            st.markdown("### 분류별 금액")
+            def build_figure():
+                fig = px.bar(
+                    summary_by_category,
+                    x='분류',
+                    y='값',
+                    color='분류',
+                    color_discrete_sequence=[
+                        'hsl(221.2, 83.2%, 53.3%)',
+                        'hsl(142.1, 76.2%, 36.3%)',
+                        'hsl(0, 84.2%, 60.2%)',
+                        'hsl(38, 92%, 50%)',
+                        'hsl(280, 70%, 50%)'
+                    ],
+                    title="분류별 총액"
+                )
+                fig.update_layout(
+                    showlegend=False, 
+                    height=400,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("balance_by_category", balance_data, build_figure)
+        
+        # 상세 테이블
+        st.markdown("### 상세 내역")
+        show_dataframe(style_currency(balance_data, ['값']), "balance", use_container_width=True)
+    else:
+        st.info("재무상태표 데이터를 불러올 수 없습니다.")
+
+
+# 분석 탭 상단에 카드로 표시할 비율 (전체 목록은 financial_ratios.FINANCIAL_METRICS)
+ANALYSIS_KEY_METRICS = ['영업이익률', '순이익률', 'ROE', '부채비율']
+
+
+def render_analysis_tab(summary_data, income_data, balance_data, sales_trend):
+    """탭 4: 분석 렌더링"""
+    st.markdown("## 재무 분석")
+    
+    st.markdown("### 📌 분석 지표")
+    
+    if summary_data is not None and income_data is not None:
+        # 재무 비율 - 모든 기간을 한 번에 계산 (같은 데이터 버전이면 이전 계산 결과 재사용)
+        ratios = ratio_engine.compute(income_data, balance_data)
+        if not ratios.empty:
+            # 가장 최근 기간의 주요 비율과 직전 기간 대비 변화
+            latest = ratios.iloc[-1]
+            previous = ratios.iloc[-2] if len(ratios) > 1 else None
+            metrics_cols = st.columns(len(ANALYSIS_KEY_METRICS))
+            for column, name in zip(metrics_cols, ANALYSIS_KEY_METRICS):
+                if pd.isna(latest[name]):
+                    continue
+                delta = None
+                if previous is not None and pd.notna(previous[name]):
+                    delta = f"{latest[name] - previous[name]:+.2f}%p"
+                column.metric(
+                    name,
+                    f"{latest[name]:.2f}%",
+                    delta=delta,
+                    # 부채비율은 낮아지는 것이 개선
+                    delta_color="inverse" if name == '부채비율' else "normal",
+                    help=f"{ratios.index[-1]} · {ratio_engine.metrics[name].description}",
+                )
+            
+            st.markdown("### 기간별 재무 비율")
+            units = ratio_engine.units()
+            ratio_names = [name for name, unit in units.items() if unit != "원"]
+            ratio_table = ratios[ratio_names].T
+            periods = list(ratio_table.columns)
+            ratio_table.insert(0, '단위', [units[name] for name in ratio_names])
+            show_dataframe(
+                ratio_table.style.format("{:.2f}", subset=periods, na_rep="-"),
+                "analysis_ratios",
+                use_container_width=True,
+            )
+        
+        if sales_trend is not None and not sales_trend.empty:
+            st.markdown("### 일별 매출 추이")
+            def build_figure():
+                fig = px.line(
+                    sales_trend,
+                    x='매출일자',
+                    y='매출액',
+                    color_discrete_sequence=['hsl(221.2, 83.2%, 53.3%)'],
+                    title="최근 12개월 일별 매출"
+                )
+                fig.update_layout(
+                    height=400,
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(family='system-ui, -apple-system, sans-serif')
+                )
+                return fig
+            show_cached_chart("sales_trend", sales_trend, build_figure)
+        
+        st.info("💡 **참고:** 실제 Snowflake 테이블 구조에 맞게 쿼리를 수정해야 합니다. 현재는 샘플 데이터를 사용하고 있습니다.")
+    else:
+        st.warning("분석을 위한 데이터를 불러올 수 없습니다.")
+
+
+def render_drilldown_tab(sales_cube):
+    """탭 5: 매출 드릴다운 (월 → 부서 → 제품, 큐브에서 바로 응답)"""
+    st.markdown("## 매출 드릴다운")
+    
+    if sales_cube is None or sales_cube.rows == 0:
+        st.info("매출 드릴다운 데이터를 불러올 수 없습니다.")
+        return
+    
+    # 선택한 월/부서로 좁히고, 선택하지 않은 차원은 전체로 롤업
+    select_cols = st.columns(2)
+    month = select_cols[0].selectbox(
+        "월",
+        [None] + sales_cube.members['월'],
+        format_func=lambda value: "전체" if value is None else f"{pd.Timestamp(value):%Y-%m}",
+        key='drilldown_month'
+    )
+    department = select_cols[1].selectbox(
+        "부서",
+        [None] + sales_cube.members['부서'],
+        format_func=lambda value: "전체" if value is None else str(value),
+        key='drilldown_department'
+    )
+    
+    started = time.perf_counter()
+    monthly = sales_cube.rollup(['월'], {'부서': department})
+    by_department = sales_cube.drill_down('부서', {'월': month})
+    top_products = sales_cube.top_n('제품', '매출액', 10, {'월': month, '부서': department})
+    total = sales_cube.rollup((), {'월': month, '부서': department})
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    metric_cols = st.columns(2)
+    metric_cols[0].metric("매출액", format_currency(total['매출액'].iloc[0]))
+    metric_cols[1].metric("판매수량", f"{total['판매수량'].iloc[0]:,.0f}")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        def build_figure():
+            fig = px.line(
+                monthly,
+                x='월',
+                y='매출액',
+                markers=True,
+                color_discrete_sequence=['hsl(221.2, 83.2%, 53.3%)'],
+                title="월별 매출"
+            )
+            fig.update_layout(
+                height=400,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='system-ui, -apple-system, sans-serif')
+            )
+            return fig
+        show_cached_chart("drilldown_monthly", monthly, build_figure)
+    
+    with col2:
+        def build_figure():
+            fig = px.bar(
+                by_department.sort_values('매출액', ascending=False),
+                x='부서',
+                y='매출액',
+                color_discrete_sequence=['hsl(142.1, 76.2%, 36.3%)'],
+                title="부서별 매출"
+            )
+            fig.update_layout(
+                height=400,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='system-ui, -apple-system, sans-serif')
+            )
+            return fig
+        show_cached_chart("drilldown_department", by_department, build_figure)
+    
+    st.markdown("### 제품별 매출 Top 10")
+    show_dataframe(style_currency(top_products, ['매출액']), "drilldown_top_products", use_container_width=True, hide_index=True)
+    st.caption(
+        f"큐브 조회 {elapsed_ms:.2f}ms · 팩트 {sales_cube.rows:,}행 · "
+        f"생성 {sales_cube.built_at:%H:%M:%S} ({sales_cube.build_ms:.0f}ms)"
+    )
+
+
+# 탭 구성: (탭 이름, 필요한 데이터셋, 렌더링 함수)
+DASHBOARD_TABS = [
+    ("전체 요약", ('summary',), render_summary_tab),
+    ("손익계산서", ('income',), render_income_tab),
+    ("재무상태표", ('balance',), render_balance_tab),
+    ("분석", ('summary', 'income', 'balance', 'sales_trend'), render_analysis_tab),
+    ("매출 드릴다운", ('sales_cube',), render_drilldown_tab),
+]
+
+# st.tabs가 선택 상태 추적(on_change)을 지원하면 선택한 탭만 실행 (지원하지 않으면 모든 탭 실행)
+LAZY_TABS = 'on_change' in inspect.signature(st.tabs).parameters
+
+
+@st.fragment
+def render_tab(tab_index, filters):
+    """탭 하나의 데이터 조회와 렌더링
+    
+    fragment로 실행되므로 탭 안의 위젯(드릴다운 선택 등)을 조작하면 해당 탭만 다시 실행됩니다.
+    데이터가 도착하기 전까지는 자리표시자를 보여줍니다.
+    """
+    # fragment 재실행은 main()을 거치지 않으므로 세션의 현재 실행을 쿼리 소유자로 다시 지정
+    get_snowflake_connector().attach_run(get_session_id())
+    started = time.perf_counter()
+    tab_name, datasets, renderer = DASHBOARD_TABS[tab_index]
+    placeholder = st.empty()
+    placeholder.info("⏳ 데이터를 불러오는 중...")
+    
+    # 탭에 필요한 데이터셋을 동시에 조회
+    loader = DatasetLoader(
+        get_snowflake_connector(), filters, {name: DATASET_LOADERS[name] for name in datasets}
+    )
+    data = [loader.get(name) for name in datasets]
+    with placeholder.container(), span("render_tab", tab=tab_name):
+        renderer(*data)
+    # 탭 실행 시작부터 내용이 표시될 때까지 (탭별 지연 시간)
+    tracer.observe("tab_ready", time.perf_counter() - started, tab=tab_name)
+
+
+def get_session_id():
+    """현재 Streamlit 세션 ID (스크립트 실행 컨텍스트 밖에서는 'default')"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'default'
+
+
+@st.cache_resource
+def start_metrics_exporter():
+    """DASHBOARD_METRICS_PORT가 있으면 프로세스당 한 번 /metrics HTTP 서버를 시작"""
+    port = os.getenv('DASHBOARD_METRICS_PORT')
+    if not port:
+        return None
+    try:
+        return start_metrics_server(int(port))
+    except OSError as e:
+        # 같은 포트를 쓰는 다른 대시보드 프로세스가 있으면 파일 내보내기만 사용
+        st.sidebar.warning(f"지표 서버를 시작할 수 없습니다 (포트 {port}): {str(e)}")
+        return None
+
+
+def export_metrics():
+    """DASHBOARD_METRICS_FILE이 있으면 실행 구간 히스토그램을 Prometheus 텍스트 파일로 기록"""
+    path = os.getenv('DASHBOARD_METRICS_FILE')
+    if not path:
+        return
+    try:
+        tracer.write_prometheus_file(path)
+    except OSError:
+        pass
+
+
+@st.fragment
+def render_sidebar(session_id):
+    """사이드바 - 연결 설정, 상태, 조회 조건, 테이블 탐색, 커스텀 쿼리 (shadcn 스타일)
+    
+    fragment로 실행되므로 사이드바 위젯을 조작하면 사이드바만 다시 실행됩니다.
+    조회 조건이 바뀐 경우에만 앱 전체를 재실행하며, 현재 조건은 session_state.dashboard_filters에 둡니다.
+    """
+    # fragment 재실행은 main()을 거치지 않으므로 세션의 현재 실행을 쿼리 소유자로 다시 지정
+    get_snowflake_connector().attach_run(session_id)
+    
+    st.markdown("### ⚙️ 설정")
+    
+    # 환경 변수 상태 확인
+    env_status = {
+        "SNOWFLAKE_ACCOUNT": os.getenv('SNOWFLAKE_ACCOUNT'),
+        "SNOWFLAKE_USER": os.getenv('SNOWFLAKE_USER'),
+        "SNOWFLAKE_PASSWORD": "설정됨" if os.getenv('SNOWFLAKE_PASSWORD') else "미설정",
+        "SNOWFLAKE_WAREHOUSE": os.getenv('SNOWFLAKE_WAREHOUSE', 'DEV_WH'),
+        "SNOWFLAKE_DATABASE": os.getenv('SNOWFLAKE_DATABASE', 'FNF'),
+        "SNOWFLAKE_SCHEMA": os.getenv('SNOWFLAKE_SCHEMA', 'SAP_FNF'),
+        "SNOWFLAKE_ROLE": os.getenv('SNOWFLAKE_ROLE', 'PU_SQL_SAP')
+    }
+    
+    with st.expander("🔍 환경 변수 확인", expanded=False):
+        for key, value in env_status.items():
+            if value:
+                st.text(f"{key}: {value}")
+            else:
+                st.error(f"{key}: ❌ 미설정")
+    
+    # 연결 테스트
+    if st.button("🔌 Snowflake 연결 테스트", use_container_width=True):
+        try:
+            connector = get_snowflake_connector()
+            result = connector.test_connection()
+            if result["status"] == "success":
+                st.success("✅ 연결 성공!")
+                st.json(result)
+            else:
+                st.error(f"❌ 연결 실패: {result.get('message', 'Unknown error')}")
+        except Exception as e:
+            error_msg = str(e)
+            st.error(f"❌ 연결 실패: {error_msg}")
+            if "환경 변수가 설정되지 않았습니다" in error_msg:
+                st.info("💡 사이드바의 '환경 변수 확인'을 열어 설정 상태를 확인하세요.")
+    
+    with st.expander("🔗 연결 풀 상태", expanded=False):
+        st.json(get_snowflake_connector().pool_stats())
+        st.json(get_snowflake_connector().health())
+        running = get_snowflake_connector().running_queries(session_id)
+        st.caption(f"이 세션에서 실행 중인 쿼리: {len(running)}개")
+        cancel_errors = [entry for entry in running if entry.get("cancel_error")]
+        if cancel_errors:
+            st.warning(f"⚠️ 취소 요청이 실패한 쿼리 {len(cancel_errors)}개: {cancel_errors[-1]['cancel_error']}")
+    
+    # 쿼리 스케줄러 - 등급별 실행/대기 현황과 대기열
+    scheduler_stats = get_snowflake_connector().scheduler_stats()
+    with st.expander(f"🚦 쿼리 대기열 ({scheduler_stats['queued']})", expanded=False):
+        st.caption(f"실행 중 {scheduler_stats['running']} / {scheduler_stats['max_concurrency']}")
+        st.dataframe(
+            pd.DataFrame.from_dict(scheduler_stats['classes'], orient='index'),
+            use_container_width=True,
+        )
+        if scheduler_stats['queue']:
+            st.dataframe(pd.DataFrame(scheduler_stats['queue']), use_container_width=True, hide_index=True)
+        else:
+            st.caption("대기 중인 쿼리가 없습니다.")
+    
+    # 쿼리 결과 캐시 현황
+    cache_stats = get_snowflake_connector().cache_stats()
+    with st.expander("🗄️ 쿼리 캐시", expanded=False):
+        cache_cols = st.columns(2)
+        cache_cols[0].metric("적중", f"{cache_stats['hits']:,}")
+        cache_cols[1].metric("미스", f"{cache_stats['misses']:,}")
+        st.caption(
+            f"적중률 {cache_stats['hit_ratio'] * 100:.1f}% · 항목 {cache_stats['entries']}개 · "
+            f"{cache_stats['bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB"
+        )
+        disk_stats = cache_stats['disk']
+        if disk_stats:
+            st.caption(
+                f"디스크: 적중 {disk_stats['hits']:,} · 미스 {disk_stats['misses']:,} "
+                f"(변경 감지 {disk_stats['stale']:,}) · 항목 {disk_stats['entries']}개 · "
+                f"{disk_stats['bytes'] / 1024 / 1024:.1f} MB"
+            )
+        coalesced = cache_stats['coalesced']
+        st.caption(
+            f"동시 요청 병합: {coalesced['coalesced']:,}건 (실행 {coalesced['leaders']:,}건 · "
+            f"지금 대기 {coalesced['waiting']} · 최대 동시 대기 {coalesced['max_waiters']})"
+        )
+        replica_cache = cache_stats.get('replica')
+        if replica_cache:
+            st.caption(
+                f"복제본: 적중 {replica_cache['hits']:,} · 미스 {replica_cache['misses']:,} · "
+                f"병합 {replica_cache['coalesced']['coalesced']:,} · 항목 {replica_cache['entries']}개"
+            )
+        figure_stats = figure_cache.stats()
+        st.caption(
+            f"차트: 적중 {figure_stats['hits']:,} · 미스 {figure_stats['misses']:,} · "
+            f"항목 {figure_stats['entries']}개 · {figure_stats['bytes'] / 1024 / 1024:.1f} MB"
+        )
+        if st.button("캐시 비우기", use_container_width=True):
+            get_snowflake_connector().invalidate_cache()
+            figure_cache.clear()
+            st.rerun()
+    
+    # 쿼리 성능 - 로더별 소요 시간 분포와 느린 쿼리
+    with st.expander("⏱️ 성능", expanded=False):
+        metrics = get_snowflake_connector().query_metrics()
+        if metrics:
+            summary = get_snowflake_connector().query_metrics_summary()
+            st.dataframe(summary, use_container_width=True, hide_index=True)
+            st.caption(f"최근 쿼리 {len(metrics):,}건 기준 · 소요 시간 단위 ms")
+            slowest = pd.DataFrame(metrics).nlargest(SLOW_QUERY_COUNT, 'total_ms')
+            st.markdown("**느린 쿼리**")
+            st.dataframe(
+                slowest[['label', 'query_id', 'cache', 'total_ms', 'execute_ms', 'fetch_ms',
+                         'convert_ms', 'normalize_ms', 'rows', 'query']],
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.caption("아직 기록된 쿼리가 없습니다.")
+        
+        tab_latency = tracer.summary("tab_ready")
+        if tab_latency:
+            st.markdown("**탭별 표시 시간**")
+            st.dataframe(
+                pd.DataFrame(tab_latency)[['tab', 'count', 'p50_ms', 'p95_ms', 'p99_ms']],
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.caption("탭 실행 시작부터 내용 표시까지 · 히스토그램 구간 보간 추정치")
+    
+    # 로컬 복제본 동기화 현황 (DASHBOARD_BACKEND=replica)
+    connector = get_snowflake_connector()
+    if hasattr(connector, 'replica_status'):
+        replica_status = connector.replica_status()
+        with st.expander("🪞 로컬 복제본", expanded=False):
+            if replica_status['last_run'] is not None:
+                st.caption(f"마지막 동기화: {replica_status['last_run']:%Y-%m-%d %H:%M:%S}")
+            if replica_status['last_error']:
+                st.warning(f"동기화 오류: {replica_status['last_error']}")
+            st.dataframe(pd.DataFrame(replica_status['tables']), use_container_width=True, hide_index=True)
+            if st.button("지금 동기화", use_container_width=True):
+                with st.spinner("복제본 동기화 중..."):
+                    connector.sync.sync_once()
+                st.rerun()
+    
+    st.divider()
+    
+    # 조회 조건 - 로더 쿼리의 WHERE 절로 전달됨
+    st.markdown("### 📅 조회 조건")
+    filters = render_filter_controls()
+    previous_filters = st.session_state.get('dashboard_filters')
+    st.session_state.dashboard_filters = filters
+    if previous_filters is not None and filters != previous_filters:
+        # 조회 조건은 모든 탭에 영향을 주므로 사이드바만이 아니라 앱 전체를 재실행
+        st.rerun()
+    
+    st.divider()
+    
+    # 테이블 탐색
+    st.markdown("### 📋 테이블 탐색")
+    if st.button("테이블 목록 조회", use_container_width=True):
+        st.session_state.show_table_explorer = True
+    if st.session_state.get('show_table_explorer'):
+        try:
+            # 테이블과 컬럼을 한 번에 조회한 카탈로그를 메모리에서 사용 (테이블별 추가 조회 없음)
+            catalog = get_snowflake_connector().get_catalog()
+            if catalog.tables:
+                st.success(f"✅ {len(catalog)}개의 테이블을 찾았습니다")
+                for table in catalog.tables:
+                    with st.expander(table['TABLE_NAME']):
+                        st.write(f"**타입:** {table['TABLE_TYPE']}")
+                        st.write(f"**생성일:** {table.get('CREATED', 'N/A')}")
+                        st.dataframe(catalog.columns(table['TABLE_NAME']), hide_index=True)
+            else:
+                st.info("테이블이 없습니다")
+        except Exception as e:
+            st.error(f"오류: {str(e)}")
+    
+    st.divider()
+    
+    # 커스텀 쿼리 실행
+    st.markdown("### 🔍 커스텀 쿼리")
+    custom_query = st.text_area("SQL 쿼리 입력", height=150, label_visibility="collapsed", placeholder="SELECT * FROM ...")
+    run_col, cancel_col = st.columns(2)
+    run_clicked = run_col.button("쿼리 실행", use_container_width=True)
+    # 누르면 재실행되면서 실행 중인 커스텀 쿼리가 취소됨
+    if cancel_col.button("⏹ 취소", use_container_width=True):
+        cancelled = get_snowflake_connector().cancel_session_queries(session_id)
+        st.info(f"⏹ 쿼리를 취소했습니다{f' (남은 쿼리 {cancelled}개 취소 요청)' if cancelled else ''}")
+    # 커스텀 쿼리와 결과 페이지/CSV 조회는 가장 낮은 등급(adhoc)으로 대기열에 들어감
+    with query_workload(WORKLOAD_ADHOC):
+        if run_clicked:
             if custom_query:
                 try:
                     connector = get_snowflake_connector()
-                    df = connector.execute_query(custom_query)
-                    st.dataframe(df)
-                    st.download_button(
-                        label="📥 CSV 다운로드",
-                        data=df.to_csv(index=False).encode('utf-8-sig'),
-                        file_name=f"query_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
+                    run_custom_query(connector, custom_query)
                 except Exception as e:
                     st.error(f"쿼리 실행 오류: {str(e)}")
+        if 'custom_result' in st.session_state:
+            try:
+                render_result_pager(get_snowflake_connector(), st.session_state.custom_result)
+            except Exception as e:
+                st.error(f"결과 조회 오류: {str(e)}")
+
+
+def main():
+    start_metrics_exporter()
+    
+    # 이번 실행을 쿼리 소유자로 지정하고, 재실행으로 대체된 이전 실행의 쿼리는 취소 (fragment 재실행은 attach_run)
+    session_id = get_session_id()
+    get_snowflake_connector().begin_run(session_id)
+    
+    # 헤더 - shadcn 스타일
+    st.markdown("""
+    <div class="main-header">
+        <h1>F&F 실적 대시보드</h1>
+        <p>실시간 재무 실적 모니터링</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # 사이드바 - fragment (조회 조건은 session_state로 전달)
+    with st.sidebar:
+        render_sidebar(session_id)
+    filters = st.session_state.dashboard_filters
     
     # 메인 대시보드
     try:
-        # Snowflake 연결 시도
+        # Snowflake 연결 상태 확인 - 백그라운드 하트비트 결과만 읽고, 끊긴 경우에만 중단
         try:
             connector = get_snowflake_connector()
-            # 연결 테스트
-            test_result = connector.test_connection()
-            if test_result["status"] != "success":
-                raise ConnectionError(test_result.get("message", "연결 실패"))
+            health = connector.health(wait=FIRST_HEALTH_CHECK_WAIT)
+            if health["status"] == "down":
+                raise ConnectionError(health.get("message") or "연결 실패")
+            if health["status"] == "degraded":
+                st.warning(f"⚠️ Snowflake에 연결할 수 없어 로컬 복제본 데이터를 표시합니다: {health.get('message')}")
         except (ConnectionError, Exception) as conn_error:
             st.warning("⚠️ **Snowflake 연결 실패**")
             st.info(f"""
@@ -544,262 +1463,22 @@ def main():
             """)
             st.stop()
         
-        # 탭 생성
-        tab1, tab2, tab3, tab4 = st.tabs(["전체 요약", "손익계산서", "재무상태표", "분석"])
-        
-        # 탭 1: 전체 요약
-        with tab1:
-            st.markdown("## 주요 재무 지표")
-            
-            summary_data = load_financial_summary(connector)
-            
-            # 디버깅: 데이터 확인
-            if summary_data is None:
-                st.error("❌ 데이터를 불러올 수 없습니다 (None 반환)")
-            elif summary_data.empty:
-                st.warning("⚠️ 데이터가 비어있습니다")
-            elif len(summary_data) == 0:
-                st.warning("⚠️ 데이터 행이 없습니다")
-            else:
-                st.success(f"✅ {len(summary_data)}개의 데이터 로드 완료")
-            
-            if summary_data is not None and not summary_data.empty and len(summary_data) > 0:
-                # 주요 지표 카드
-                cols = st.columns(3)
-                for idx, row in summary_data.head(6).iterrows():
-                    with cols[idx % 3]:
-                        change = row.get('변동률', None)
-                        change_label = "전년 대비" if change is not None else ""
-                        st.markdown(
-                            create_metric_card(
-                                row['항목'],
-                                row['값'],
-                                row.get('단위', ''),
-                                change,
-                                change_label
-                            ),
-                            unsafe_allow_html=True
-                        )
-                
-                st.divider()
-                
-                # 차트
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("주요 지표 비교")
-                    # shadcn primary color: hsl(221.2 83.2% 53.3%)
-                    fig = px.bar(
-                        summary_data,
-                        x='항목',
-                        y='값',
-                        color='항목',
-                        color_discrete_sequence=['hsl(221.2, 83.2%, 53.3%)', 'hsl(221.2, 83.2%, 60%)', 'hsl(221.2, 83.2%, 65%)'],
-                        title="주요 재무 지표"
-                    )
-                    fig.update_layout(
-                        showlegend=False, 
-                        height=400,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(family='system-ui, -apple-system, sans-serif')
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    st.markdown("### 변동률")
-                    # shadcn destructive (red) and success (green) colors
-                    fig = px.bar(
-                        summary_data,
-                        x='항목',
-                        y='변동률',
-                        color='변동률',
-                        color_continuous_scale=['hsl(0, 84.2%, 60.2%)', 'hsl(142.1, 76.2%, 36.3%)'],
-                        title="전년 대비 변동률 (%)"
-                    )
-                    fig.update_layout(
-                        height=400,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(family='system-ui, -apple-system, sans-serif')
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # 상세 테이블
-                st.subheader("상세 내역")
-                st.dataframe(summary_data, use_container_width=True)
-            else:
-                st.info("데이터를 불러올 수 없습니다. Snowflake 연결 및 쿼리를 확인하세요.")
-        
-        # 탭 2: 손익계산서
-        with tab2:
-            st.markdown("## 손익계산서")
-            
-            income_data = load_income_statement(connector)
-            
-            if income_data is not None and not income_data.empty:
-                # 연도별 비교 차트
-                st.markdown("### 연도별 비교")
-                
-                # 피벗 테이블 생성
-                pivot_data = income_data.pivot(index='항목', columns='연도', values='금액').reset_index()
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # shadcn color palette
-                    fig = px.bar(
-                        income_data,
-                        x='항목',
-                        y='금액',
-                        color='연도',
-                        barmode='group',
-                        color_discrete_sequence=[
-                            'hsl(221.2, 83.2%, 53.3%)',
-                            'hsl(221.2, 83.2%, 60%)',
-                            'hsl(221.2, 83.2%, 65%)'
-                        ],
-                        title="연도별 손익계산서 비교"
-                    )
-                    fig.update_layout(
-                        height=500,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(family='system-ui, -apple-system, sans-serif')
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    # 주요 항목 트렌드
-                    main_items = ['매출액', '영업이익', '순이익']
-                    trend_data = income_data[income_data['항목'].isin(main_items)]
-                    
-                    fig = px.line(
-                        trend_data,
-                        x='연도',
-                        y='금액',
-                        color='항목',
-                        markers=True,
-                        color_discrete_sequence=[
-                            'hsl(221.2, 83.2%, 53.3%)',
-                            'hsl(142.1, 76.2%, 36.3%)',
-                            'hsl(0, 84.2%, 60.2%)'
-                        ],
-                        title="주요 항목 트렌드"
-                    )
-                    fig.update_layout(
-                        height=500,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(family='system-ui, -apple-system, sans-serif')
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # 상세 테이블
-                st.markdown("### 상세 내역")
-                st.dataframe(pivot_data, use_container_width=True)
-            else:
-                st.info("손익계산서 데이터를 불러올 수 없습니다.")
-        
-        # 탭 3: 재무상태표
-        with tab3:
-            st.markdown("## 재무상태표")
-            
-            balance_data = load_balance_sheet(connector)
-            
-            if balance_data is not None and not balance_data.empty:
-                # 자산/부채/자본 요약
-                summary_by_category = balance_data.groupby('분류')['값'].sum().reset_index()
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown("### 분류별 구성")
-                    # shadcn color palette for pie chart
-                    fig = px.pie(
-                        summary_by_category,
-                        values='값',
-                        names='분류',
-                        color_discrete_sequence=[
-                            'hsl(221.2, 83.2%, 53.3%)',
-                            'hsl(142.1, 76.2%, 36.3%)',
-                            'hsl(0, 84.2%, 60.2%)',
-                            'hsl(38, 92%, 50%)',
-                            'hsl(280, 70%, 50%)'
-                        ],
-                        title="자산/부채/자본 구성"
-                    )
-                    fig.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(family='system-ui, -apple-system, sans-serif')
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    st.markdown("### 분류별 금액")
-                    fig = px.bar(
-                        summary_by_category,
-                        x='분류',
-                        y='값',
-                        color='분류',
-                        color_discrete_sequence=[
-                            'hsl(221.2, 83.2%, 53.3%)',
-                            'hsl(142.1, 76.2%, 36.3%)',
-                            'hsl(0, 84.2%, 60.2%)',
-                            'hsl(38, 92%, 50%)',
-                            'hsl(280, 70%, 50%)'
-                        ],
-                        title="분류별 총액"
-                    )
-                    fig.update_layout(
-                        showlegend=False, 
-                        height=400,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(family='system-ui, -apple-system, sans-serif')
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # 상세 테이블
-                st.markdown("### 상세 내역")
-                st.dataframe(balance_data, use_container_width=True)
-            else:
-                st.info("재무상태표 데이터를 불러올 수 없습니다.")
+        # 탭 - 탭마다 fragment로 필요한 데이터셋만 조회해 렌더링
+        tab_names = [name for name, _, _ in DASHBOARD_TABS]
+        if LAZY_TABS:
+            # 선택한 탭만 실행 - 숨은 탭은 처음 열 때 조회/렌더링 (탭을 바꾸면 재실행)
+            tabs = st.tabs(tab_names, key="dashboard_tab", on_change="rerun")
+        else:
+            tabs = st.tabs(tab_names)
+            # 선택 상태를 알 수 없어 모든 탭을 실행 - 조회를 먼저 한꺼번에 시작해 두면 탭별 조회는
+            # 진행 중인 같은 쿼리에 합류하므로 전체 대기 시간은 가장 느린 쿼리 하나의 시간이 됨
+            DatasetLoader(connector, filters)
         
-        # 탭 4: 분석
-        with tab4:
-            st.markdown("## 재무 분석")
-            
-            st.markdown("### 📌 분석 지표")
-            
-            summary_data = load_financial_summary(connector)
-            income_data = load_income_statement(connector)
-            
-            if summary_data is not None and income_data is not None:
-                # 주요 비율 계산
-                metrics_cols = st.columns(4)
-                
-                # 매출액 대비 영업이익률
-                if not income_data.empty:
-                    revenue_2024 = income_data[(income_data['항목'] == '매출액') & (income_data['연도'] == 2024)]['금액'].values
-                    operating_2024 = income_data[(income_data['항목'] == '영업이익') & (income_data['연도'] == 2024)]['금액'].values
-                    
-                    if len(revenue_2024) > 0 and len(operating_2024) > 0 and revenue_2024[0] > 0:
-                        operating_margin = (operating_2024[0] / revenue_2024[0]) * 100
-                        with metrics_cols[0]:
-                            st.metric("영업이익률", f"{operating_margin:.2f}%")
-                    
-                    # 순이익률
-                    net_2024 = income_data[(income_data['항목'] == '순이익') & (income_data['연도'] == 2024)]['금액'].values
-                    if len(net_2024) > 0 and revenue_2024[0] > 0:
-                        net_margin = (net_2024[0] / revenue_2024[0]) * 100
-                        with metrics_cols[1]:
-                            st.metric("순이익률", f"{net_margin:.2f}%")
-                
-                st.info("💡 **참고:** 실제 Snowflake 테이블 구조에 맞게 쿼리를 수정해야 합니다. 현재는 샘플 데이터를 사용하고 있습니다.")
-            else:
-                st.warning("분석을 위한 데이터를 불러올 수 없습니다.")
+        for tab_index, tab in enumerate(tabs):
+            if getattr(tab, 'open', None) is False:
+                continue
+            with tab:
+                render_tab(tab_index, filters)
     
     except ImportError as import_error:
         if 'pyarrow' in str(import_error):
@@ -819,5 +1498,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        with span("page"):
+            main()
+    finally:
+        export_metrics()
 
@@ -0,0 +1,38 @@
+"""
+데이터셋 버전
+쿼리 캐시가 돌려주는 결과 DataFrame 객체마다 버전 번호를 붙여, 파생 계산(재무 비율, 차트 등)을
+데이터를 다시 훑거나 해시하지 않고 "같은 데이터인지"만으로 재사용할 수 있게 합니다.
+"""
+
+import itertools
+import threading
+import weakref
+from typing import Optional
+
+# DataFrame id → 버전 번호 (객체가 사라지면 제거)
+_versions = {}
+# 객체 소멸 콜백이 잠금을 쥔 스레드에서 실행될 수 있으므로 재진입 가능한 잠금 사용
+_lock = threading.RLock()
+_counter = itertools.count(1)
+
+
+def dataset_version(frame) -> Optional[int]:
+    """DataFrame 객체의 버전 번호 (처음 보는 객체에는 새 번호를 붙임, None이면 None)
+    
+    캐시가 같은 결과 객체를 돌려주는 동안은 같은 번호이고, 새로 조회된 결과는 새 번호가 됩니다.
+    객체 자체를 기준으로 하므로 반환된 DataFrame을 그 자리에서 수정하지 마세요.
+    """
+    if frame is None:
+        return None
+    key = id(frame)
+    with _lock:
+        version = _versions.get(key)
+        if version is None:
+            version = _versions[key] = next(_counter)
+            weakref.finalize(frame, _forget, key)
+        return version
+
+
+def _forget(key: int):
+    with _lock:
+        _versions.pop(key, None)
@@ -0,0 +1,102 @@
+"""
+Plotly 차트 캐시
+입력 데이터 버전과 차트 사양(차트 이름, 선택값 등)이 같으면 px 차트 생성과 update_layout을
+건너뛰고 만들어 둔 Figure 객체를 재사용합니다.
+st.plotly_chart는 dict를 받으면 Figure로 다시 만들어 검증하므로, 캐시는 JSON/dict가 아닌
+검증이 끝난 Figure 객체를 그대로 넘깁니다 (적중 시 남는 비용은 to_dict/to_json 변환뿐).
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from data_version import dataset_version
+
+# 보관할 차트 개수 (LRU)
+FIGURE_CACHE_SIZE = int(os.getenv('DASHBOARD_FIGURE_CACHE_SIZE', '256'))
+
+
+class FigureCache:
+    """(데이터 버전, 차트 사양) → 만들어 둔 Plotly Figure 캐시
+    
+    데이터는 내용을 해시하지 않고 data_version.dataset_version으로 구분하므로, 캐시된 쿼리 결과가
+    그대로인 동안은 같은 키가 되고 새로 조회되면 자동으로 다른 키가 됩니다.
+    파생 DataFrame(groupby 결과 등)으로 그리는 차트는 원본 DataFrame을 data로 넘기세요.
+    Figure는 여러 세션이 함께 쓰므로 반환된 Figure를 수정하지 마세요.
+    """
+    
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bytes = 0       # 항목별 JSON 크기 합계 (추정치, 저장할 때 한 번 계산)
+    
+    @staticmethod
+    def key(data, spec: Dict) -> tuple:
+        """data(DataFrame 또는 DataFrame 튜플)의 버전과 정렬한 사양 JSON으로 만든 캐시 키"""
+        frames = data if isinstance(data, (tuple, list)) else (data,)
+        return (
+            tuple(dataset_version(frame) for frame in frames),
+            json.dumps(spec, sort_keys=True, ensure_ascii=False, default=str),
+        )
+    
+    def get(self, key: tuple) -> Optional[go.Figure]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+    
+    def put(self, key: tuple, figure: go.Figure):
+        size = len(pio.to_json(figure, validate=False))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (figure, size)
+            self._bytes += size
+            while len(self._entries) > self._max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[1]
+    
+    def figure(self, data, spec: Dict, build: Callable) -> go.Figure:
+        """캐시된 Figure를 반환합니다. 없으면 build()로 만들어 저장합니다.
+        
+        반환값은 st.plotly_chart에 그대로 넘기세요 (dict로 바꾸면 다시 검증됨).
+        """
+        key = self.key(data, spec)
+        figure = self.get(key)
+        if figure is None:
+            figure = build()
+            self.put(key, figure)
+        return figure
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# 프로세스 공용 차트 캐시 (Streamlit 재실행/세션 사이에도 유지)
+figure_cache = FigureCache()
@@ -0,0 +1,202 @@
+"""
+재무 비율 계산 엔진
+기본 계정(매출액, 영업이익, 유동자산 등)에서 파생 지표(이익률, ROE, ROA, 부채비율, 유동비율, 회전율)를
+의존 관계 그래프(DAG)로 선언하고, 모든 기간에 대해 한 번에(벡터 연산) 계산합니다.
+원본 데이터 버전별로 기간 × 계정 표와 계산한 지표를 기억하므로 같은 데이터에서는 다시 훑지 않습니다.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from data_version import dataset_version
+
+# 데이터 버전 조합별로 기억해 두는 계산 결과 개수
+RATIO_MEMO_SIZE = 32
+
+# 재무상태표에 연도 컬럼이 없을 때(시점 잔액) 손익계산서도 없으면 쓰는 기간 이름
+SNAPSHOT_PERIOD = "현재"
+
+
+class Metric:
+    """파생 지표 정의
+    
+    - name: 지표 이름 (다른 지표의 inputs에서 참조)
+    - inputs: 입력 이름 (기본 계정 또는 다른 지표)
+    - formula: 입력 Series들(기간 인덱스)을 받아 Series를 반환하는 함수
+    - unit: 표시 단위 ("%", "회", "원")
+    """
+    
+    def __init__(self, name: str, inputs: Sequence[str], formula: Callable[..., pd.Series],
+                 unit: str = "%", description: str = ""):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.formula = formula
+        self.unit = unit
+        self.description = description
+
+
+def ratio(numerator: pd.Series, denominator: pd.Series, scale: float = 1.0) -> pd.Series:
+    """분모가 0이거나 없는 기간은 NaN인 비율"""
+    return numerator / denominator.where(denominator != 0) * scale
+
+
+def percent(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    return ratio(numerator, denominator, 100.0)
+
+
+# 기본 제공 지표 (입력은 손익계산서 항목, 재무상태표 항목/분류 합계 또는 다른 지표)
+FINANCIAL_METRICS = [
+    Metric("매출총이익", ["매출액", "매출원가"], lambda revenue, cost: revenue - cost, "원"),
+    Metric("자산총계", ["유동자산", "비유동자산"], lambda current, non_current: current.add(non_current, fill_value=0), "원"),
+    Metric("부채총계", ["유동부채", "비유동부채"], lambda current, non_current: current.add(non_current, fill_value=0), "원"),
+    Metric("자본총계", ["자본"], lambda equity: equity, "원"),
+    Metric("매출총이익률", ["매출총이익", "매출액"], percent, "%", "매출총이익 / 매출액"),
+    Metric("영업이익률", ["영업이익", "매출액"], percent, "%", "영업이익 / 매출액"),
+    Metric("순이익률", ["순이익", "매출액"], percent, "%", "순이익 / 매출액"),
+    Metric("ROE", ["순이익", "자본총계"], percent, "%", "순이익 / 자본총계"),
+    Metric("ROA", ["순이익", "자산총계"], percent, "%", "순이익 / 자산총계"),
+    Metric("부채비율", ["부채총계", "자본총계"], percent, "%", "부채총계 / 자본총계"),
+    Metric("유동비율", ["유동자산", "유동부채"], percent, "%", "유동자산 / 유동부채"),
+    Metric("총자산회전율", ["매출액", "자산총계"], ratio, "회", "매출액 / 자산총계"),
+    Metric("재고자산회전율", ["매출원가", "재고자산"], ratio, "회", "매출원가 / 재고자산"),
+    Metric("매출채권회전율", ["매출액", "매출채권"], ratio, "회", "매출액 / 매출채권"),
+]
+
+
+class RatioEngine:
+    """지표 DAG를 기간별로 한 번에 계산하는 엔진
+    
+    손익계산서(항목/연도/금액)와 재무상태표(항목/값/분류, 선택적으로 연도)를 기간 × 계정 표로
+    한 번 펼친 뒤, 요청한 지표와 그 선행 지표만 의존 순서대로 계산합니다.
+    표와 계산한 지표는 두 원본의 데이터 버전 조합별로 기억하므로, 지표를 더 요청해도 원본을 다시
+    훑지 않고 새 지표만 계산합니다. 반환된 DataFrame은 수정하지 마세요.
+    
+    재무상태표에 연도 컬럼이 없으면 시점 잔액으로 보고 가장 최근 기간에 붙입니다.
+    """
+    
+    def __init__(self, metrics: Sequence[Metric] = FINANCIAL_METRICS, memo_size: int = RATIO_MEMO_SIZE):
+        self.metrics = {}
+        for metric in metrics:
+            if metric.name in self.metrics:
+                raise ValueError(f"중복된 지표 이름: {metric.name}")
+            self.metrics[metric.name] = metric
+        self._order = self._topological_order()
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+    
+    def compute(self, income: Optional[pd.DataFrame], balance: Optional[pd.DataFrame] = None,
+                names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """기간 × 지표 DataFrame (names를 생략하면 모든 지표, 입력이 없는 기간/지표는 NaN)"""
+        names = list(self.metrics) if names is None else list(names)
+        unknown = [name for name in names if name not in self.metrics]
+        if unknown:
+            raise ValueError(f"정의되지 않은 지표: {', '.join(unknown)}")
+        
+        needed = self._dependencies(names)
+        state = self._state(income, balance)
+        with state["lock"]:
+            values = state["values"]
+            for name in self._order:
+                if name in values or name not in needed:
+                    continue
+                metric = self.metrics[name]
+                inputs = [values[source] if source in values else self._base(state, source) for source in metric.inputs]
+                values[name] = metric.formula(*inputs).astype("float64")
+            return pd.DataFrame({name: values[name] for name in names}, index=state["base"].index)
+    
+    def base_frame(self, income: Optional[pd.DataFrame], balance: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """기간 × 기본 계정 표 (손익계산서 항목, 재무상태표 항목과 분류 합계)"""
+        return self._state(income, balance)["base"]
+    
+    def units(self, names: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """지표별 표시 단위"""
+        return {name: self.metrics[name].unit for name in (names or self.metrics)}
+    
+    def _dependencies(self, names: Sequence[str]) -> set:
+        """names와 그 선행 지표 전체"""
+        needed = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in needed or name not in self.metrics:
+                continue
+            needed.add(name)
+            pending.extend(self.metrics[name].inputs)
+        return needed
+    
+    def _topological_order(self) -> List[str]:
+        order = []
+        visiting = set()
+        done = set()
+        
+        def visit(name, path):
+            if name in done or name not in self.metrics:
+                return
+            if name in visiting:
+                raise ValueError(f"지표 의존 관계에 순환이 있습니다: {' → '.join(path + [name])}")
+            visiting.add(name)
+            for source in self.metrics[name].inputs:
+                visit(source, path + [name])
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+        
+        for name in self.metrics:
+            visit(name, [])
+        return order
+    
+    @staticmethod
+    def _base(state: Dict, name: str) -> pd.Series:
+        base = state["base"]
+        if name in base.columns:
+            return base[name]
+        return pd.Series(np.nan, index=base.index, dtype="float64")
+    
+    def _state(self, income, balance) -> Dict:
+        """데이터 버전 조합별 계산 상태 (기간 × 계정 표, 계산한 지표)"""
+        key = (dataset_version(income), dataset_version(balance))
+        with self._lock:
+            state = self._memo.get(key)
+            if state is not None:
+                self._memo.move_to_end(key)
+                return state
+        
+        state = {"base": self._build_base(income, balance), "values": {}, "lock": threading.Lock()}
+        with self._lock:
+            # 다른 스레드가 먼저 만들었으면 그 상태를 사용
+            state = self._memo.setdefault(key, state)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return state
+    
+    @staticmethod
+    def _build_base(income, balance) -> pd.DataFrame:
+        frames = []
+        if income is not None and not income.empty:
+            frames.append(income.pivot_table(index='연도', columns='항목', values='금액', aggfunc='sum', observed=True))
+        periods = frames[0].index if frames else pd.Index([])
+        
+        if balance is not None and not balance.empty:
+            # 항목별 잔액과 분류(유동자산 등)별 합계를 함께 펼침
+            by_period = '연도' in balance.columns
+            index = '연도' if by_period else np.full(len(balance), periods.max() if len(periods) else SNAPSHOT_PERIOD)
+            items = balance.pivot_table(index=index, columns='항목', values='값', aggfunc='sum', observed=True)
+            categories = balance.pivot_table(index=index, columns='분류', values='값', aggfunc='sum', observed=True)
+            frames.append(items.join(categories[categories.columns.difference(items.columns)]))
+        
+        if not frames:
+            return pd.DataFrame(dtype="float64")
+        base = frames[0] if len(frames) == 1 else frames[0].join(frames[1], how='outer', rsuffix='_재무상태표')
+        base.index.name = '연도'
+        base.columns = [str(column) for column in base.columns]
+        return base.sort_index().astype("float64")
+
+
+# 프로세스 공용 엔진 (Streamlit 재실행 사이에도 계산 결과 유지)
+ratio_engine = RatioEngine()
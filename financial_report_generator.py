@@ -8,6 +8,8 @@ import pandas as pd
 from datetime import datetime
 from pathlib import Path
 
+from formatting import format_currency, format_currency_array
+
 
 class FinancialReportGenerator:
     """재무실적보고서 HTML 생성 클래스"""
@@ -65,7 +67,7 @@ class FinancialReportGenerator:
             cards_html += f"""
             <div class="metric-card">
                 <div class="metric-name">{name}</div>
-                <div class="metric-value">{self._format_number(value)} {unit}</div>
+                <div class="metric-value">{format_currency(value, unit="")} {unit}</div>
                 <div class="metric-change {change_class}">
                     {change_icon} {abs(change):.1f}%
                 </div>
@@ -178,15 +180,22 @@ class FinancialReportGenerator:
         headers = list(data[0].keys())
         header_html = "<thead><tr>" + "".join([f"<th>{h}</th>" for h in headers]) + "</tr></thead>"
         
+        # 숫자 셀은 컬럼별로 모아 한 번에 포맷팅
+        columns = {}
+        for header in headers:
+            values = [row.get(header, '') for row in data]
+            numeric = [i for i, value in enumerate(values) if isinstance(value, (int, float))]
+            if numeric:
+                for i, formatted in zip(numeric, format_currency_array([values[i] for i in numeric], unit="")):
+                    values[i] = formatted
+            columns[header] = values
+        
         # 바디 생성
         body_html = "<tbody>"
-        for row in data:
+        for row_index in range(len(data)):
             body_html += "<tr>"
             for header in headers:
-                value = row.get(header, '')
-                if isinstance(value, (int, float)):
-                    value = self._format_number(value)
-                body_html += f"<td>{value}</td>"
+                body_html += f"<td>{columns[header][row_index]}</td>"
             body_html += "</tr>"
         body_html += "</tbody>"
         
@@ -268,36 +277,19 @@ class FinancialReportGenerator:
         <div class="balance-overview">
             <div class="balance-item">
                 <h3>총 자산</h3>
-                <div class="balance-value">{self._format_number(total_assets)}</div>
+                <div class="balance-value">{format_currency(total_assets, unit="")}</div>
             </div>
             <div class="balance-item">
                 <h3>총 부채</h3>
-                <div class="balance-value">{self._format_number(total_liabilities)}</div>
+                <div class="balance-value">{format_currency(total_liabilities, unit="")}</div>
             </div>
             <div class="balance-item">
                 <h3>총 자본</h3>
-                <div class="balance-value">{self._format_number(total_equity)}</div>
+                <div class="balance-value">{format_currency(total_equity, unit="")}</div>
             </div>
         </div>
         """
     
-    def _format_number(self, value):
-        """숫자 포맷팅"""
-        if isinstance(value, str):
-            try:
-                value = float(value.replace(',', '').replace('원', '').strip())
-            except:
-                return value
-        
-        if abs(value) >= 1000000000000:  # 조
-            return f"{value/1000000000000:.2f}조"
-        elif abs(value) >= 100000000:  # 억
-            return f"{value/100000000:.2f}억"
-        elif abs(value) >= 10000:  # 만
-            return f"{value/10000:.2f}만"
-        else:
-            return f"{value:,.0f}"
-    
     def generate_html(self, output_file='financial_report.html'):
         """전체 HTML 보고서 생성"""
         html_content = f"""
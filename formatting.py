@@ -0,0 +1,139 @@
+"""
+금액/비율 표시 형식 모듈
+조/억/만 단위 금액 표시를 배열 단위로 처리하여 대시보드(pandas Styler)와 HTML 보고서 생성기가
+같은 형식을 셀마다 파이썬 함수를 호출하지 않고 한 번에 만들 수 있게 합니다.
+"""
+
+import numpy as np
+import pandas as pd
+
+# 금액 표시 단위 (기준값 이상이면 해당 단위로 나눠 소수 둘째 자리까지 표시)
+KOREAN_UNITS = (
+    ("조", 1_000_000_000_000),
+    ("억", 100_000_000),
+    ("만", 10_000),
+)
+
+_UNIT_THRESHOLDS = np.array([threshold for _, threshold in KOREAN_UNITS], dtype="float64")
+# 단위 번호별 나눗수와 접미사 (마지막 칸은 단위 없음 - 천 단위 구분 기호를 넣은 정수)
+_UNIT_DIVISORS = np.append(_UNIT_THRESHOLDS, 1.0)
+_UNIT_SUFFIXES = np.array([name for name, _ in KOREAN_UNITS] + [""])
+
+
+def to_amounts(values) -> np.ndarray:
+    """값 배열을 float64 배열로 변환합니다.
+    
+    숫자는 그대로, "1,234원" 같은 문자열은 쉼표/원/공백을 지우고 읽으며, 읽을 수 없는 값은 NaN입니다.
+    """
+    array = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+    if array.dtype.kind in "iufb":
+        return array.astype("float64", copy=False).reshape(-1)
+    text = pd.Series(array.reshape(-1), dtype=object).astype(str).str.replace(r"[,원\s]", "", regex=True)
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype="float64")
+
+
+def format_currency_array(values, unit: str = "원", decimals: int = 2, na_rep: str = "0",
+                          keep_text: bool = True) -> np.ndarray:
+    """금액 배열을 한국어 단위(조/억/만) 문자열 배열로 변환합니다.
+    
+    단위 선택과 나눗셈은 NumPy로 한 번에 하고, 문자열은 단위 그룹별로 미리 만든 형식 문자열 하나로
+    묶어서 만듭니다 (셀마다 분기하는 스칼라 함수 호출 없음).
+    unit이 있으면 "1.50억 원"처럼 뒤에 붙이고, 만 미만은 "1,234 원"처럼 정수로 표시합니다.
+    keep_text=True이면 숫자로 읽을 수 없는 문자열은 원래 값 그대로 둡니다.
+    """
+    original = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values, dtype=object)
+    amounts = to_amounts(values)
+    result = np.full(amounts.shape, na_rep, dtype=object)
+    tail = f" {unit}" if unit else ""
+    
+    valid = ~np.isnan(amounts)
+    # 기준값 이상인 단위 개수로 단위 번호 결정 → 0: 조, 1: 억, 2: 만, 3: 단위 없음
+    unit_index = len(KOREAN_UNITS) - (np.abs(amounts)[:, None] >= _UNIT_THRESHOLDS[None, :]).sum(axis=1)
+    scaled = amounts / _UNIT_DIVISORS[unit_index]
+    
+    for index, suffix in enumerate(_UNIT_SUFFIXES):
+        mask = valid & (unit_index == index)
+        if not mask.any():
+            continue
+        if suffix:
+            template = f"{{:.{decimals}f}}{suffix}{tail}"
+        else:
+            template = f"{{:,.0f}}{tail}"
+        result[mask] = list(map(template.format, scaled[mask].tolist()))
+    
+    if keep_text and original.dtype == object:
+        original = original.reshape(-1)
+        for position in np.flatnonzero(~valid):
+            if isinstance(original[position], str) and original[position].strip():
+                result[position] = original[position]
+    return result
+
+
+def format_currency(value, unit: str = "원") -> str:
+    """금액 하나를 한국어 단위 형식으로 포맷팅합니다 (format_currency_array와 같은 형식)."""
+    return format_currency_array([value], unit)[0]
+
+
+def format_percentage_array(values, decimals: int = 2, na_rep: str = "0%") -> np.ndarray:
+    """비율 배열을 "12.34%" 형식 문자열 배열로 변환합니다."""
+    amounts = to_amounts(values)
+    result = np.full(amounts.shape, na_rep, dtype=object)
+    valid = ~np.isnan(amounts)
+    if valid.any():
+        result[valid] = list(map(f"{{:.{decimals}f}}%".format, amounts[valid].tolist()))
+    return result
+
+
+def format_percentage(value, decimals: int = 2) -> str:
+    """퍼센트를 포맷팅합니다."""
+    return format_percentage_array([value], decimals)[0]
+
+
+def format_metric_value(value, unit: str) -> str:
+    """지표 값 표시: 원 단위는 조/억/만 형식, 그 밖의 단위는 소수 첫째 자리 + 단위"""
+    if unit == "원":
+        return format_currency(value, unit)
+    return f"{value:,.1f} {unit}"
+
+
+def format_frame(df: pd.DataFrame, currency_columns=None, percent_columns=(), unit: str = "원") -> pd.DataFrame:
+    """표시용 DataFrame (지정한 컬럼을 문자열로 변환한 복사본, HTML 표 등에 사용)
+    
+    currency_columns가 None이면 숫자 컬럼 전체를 금액으로 봅니다.
+    """
+    if currency_columns is None:
+        currency_columns = [column for column in df.select_dtypes("number").columns if column not in percent_columns]
+    display = df.copy()
+    for column in currency_columns:
+        display[column] = format_currency_array(df[column], unit)
+    for column in percent_columns:
+        display[column] = format_percentage_array(df[column])
+    return display
+
+
+def style_currency(data, columns=None, unit: str = "원", percent_columns=()):
+    """금액/비율 컬럼 표시 형식을 지정한 pandas Styler를 반환합니다 (st.dataframe 등에 전달).
+    
+    컬럼별 고유값을 배열 단위로 한 번에 포맷팅해 두고, Styler에는 값 → 문자열 조회만 맡기므로
+    정렬 등에 쓰이는 원래 숫자 데이터는 그대로 유지됩니다.
+    data는 DataFrame 또는 Styler이며, columns가 None이면 숫자 컬럼 전체를 금액으로 봅니다.
+    """
+    styler = data.style if isinstance(data, pd.DataFrame) else data
+    frame = styler.data
+    if columns is None:
+        columns = [column for column in frame.select_dtypes("number").columns if column not in percent_columns]
+    
+    for column_list, formatter, na_rep in (
+        (columns, lambda values: format_currency_array(values, unit), "0"),
+        (percent_columns, format_percentage_array, "0%"),
+    ):
+        for column in column_list:
+            values = frame[column]
+            unique = pd.unique(values[values.notna()].to_numpy())
+            lookup = dict(zip(unique, formatter(unique)))
+            styler = styler.format(
+                lambda value, lookup=lookup, formatter=formatter: lookup.get(value) or formatter([value])[0],
+                subset=[column],
+                na_rep=na_rep,
+            )
+    return styler
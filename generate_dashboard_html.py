@@ -7,22 +7,7 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-
-def format_currency(value, unit="원"):
-    """금액을 한국어 형식으로 포맷팅"""
-    if value is None:
-        return "0"
-    
-    abs_value = abs(value)
-    
-    if abs_value >= 1000000000000:  # 조
-        return f"{value/1000000000000:.2f}조 {unit}"
-    elif abs_value >= 100000000:  # 억
-        return f"{value/100000000:.2f}억 {unit}"
-    elif abs_value >= 10000:  # 만
-        return f"{value/10000:.2f}만 {unit}"
-    else:
-        return f"{value:,.0f} {unit}"
+from formatting import format_currency, format_currency_array, format_metric_value
 
 
 def generate_metric_card(item):
@@ -32,7 +17,7 @@ def generate_metric_card(item):
     unit = item.get('단위', '')
     change = item.get('변동률', None)
     
-    formatted_value = format_currency(value, unit) if unit == "원" else f"{value:,.1f} {unit}"
+    formatted_value = format_metric_value(value, unit)
     
     change_html = ""
     if change is not None:
@@ -74,7 +59,7 @@ def generate_summary_tab(data):
         unit = item.get('단위', '')
         change = item.get('변동률', None)
         
-        formatted_value = format_currency(value, unit) if unit == "원" else f"{value:,.1f} {unit}"
+        formatted_value = format_metric_value(value, unit)
         change_str = f"{change:+.1f}%" if change is not None else "-"
         change_class = "positive-change" if (change is not None and change >= 0) else "negative-change"
         
@@ -139,15 +124,16 @@ def generate_income_statement_tab(data):
                     years.append(key)
     years = sorted(years, reverse=True)
     
-    # 테이블 생성
+    # 테이블 생성 (항목 × 연도 값을 한 번에 포맷팅)
+    formatted = format_currency_array(
+        [item.get(year, 0) for item in income_data for year in years], '원'
+    ).reshape(len(income_data), len(years))
     table_rows = ""
-    for item in income_data:
+    for item, formatted_values in zip(income_data, formatted):
         name = item.get('항목', '')
         table_rows += "<tr>"
         table_rows += f"<td>{name}</td>"
-        for year in years:
-            value = item.get(year, 0)
-            formatted_value = format_currency(value, '원')
+        for formatted_value in formatted_values:
             table_rows += f"<td>{formatted_value}</td>"
         table_rows += "</tr>"
     
@@ -215,12 +201,11 @@ def generate_balance_sheet_tab(data):
         category_totals[category] = sum([item.get('값', 0) for item in items])
     
     # 테이블 생성
+    formatted = format_currency_array([item.get('값', 0) for item in balance_data], '원')
     table_rows = ""
-    for item in balance_data:
+    for item, formatted_value in zip(balance_data, formatted):
         name = item.get('항목', '')
-        value = item.get('값', 0)
         category = item.get('분류', '')
-        formatted_value = format_currency(value, '원')
         table_rows += f"""
         <tr>
             <td>{name}</td>
@@ -0,0 +1,357 @@
+"""
+로컬 DuckDB 쿼리 백엔드
+Snowflake 웨어하우스 없이 대시보드를 개발/부하 테스트/벤치마크할 수 있도록
+sample_data.json 형식 또는 Parquet 데이터를 DuckDB에 올려 같은 로더 SQL에 응답합니다.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+from snowflake.connector import DictCursor
+
+from snowflake_connector import QueryBackend, QueryCancelledError, QueryResult, register_statement
+
+
+# DuckDB에 없는 Snowflake 함수 (연결 시 매크로로 등록)
+_SNOWFLAKE_MACROS = [
+    "CREATE OR REPLACE MACRO TO_DATE(x) AS CAST(x AS DATE)",
+    "CREATE OR REPLACE MACRO DATEADD(part, n, d) AS CAST(d AS TIMESTAMP) + CAST(n || ' ' || part AS INTERVAL)",
+    "CREATE OR REPLACE MACRO CURRENT_VERSION() AS version()",
+]
+
+# DATEADD(MONTH, ...) → DATEADD('MONTH', ...) (DuckDB 매크로는 날짜 단위 키워드를 받을 수 없음)
+_DATEADD_PART_PATTERN = re.compile(r"\bDATEADD\s*\(\s*(\w+)\s*,", re.IGNORECASE)
+
+# JSON에는 날짜 형식이 없으므로 이 형식의 문자열만 있는 컬럼은 날짜로 읽음 (YYYY-MM-DD[ HH:MM:SS])
+_ISO_DATE_PATTERN = r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?"
+
+
+# DuckDB INFORMATION_SCHEMA용 SQL 문 템플릿 (Snowflake 템플릿과 같은 컬럼 이름으로 반환)
+register_statement("local.tables", """
+    SELECT
+        table_name as "TABLE_NAME",
+        table_type as "TABLE_TYPE",
+        NULL as "CREATED",
+        NULL as "LAST_ALTERED"
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_CATALOG = ? AND TABLE_SCHEMA = ?
+    ORDER BY TABLE_NAME
+""")
+register_statement("local.catalog_version", """
+    SELECT COUNT(DISTINCT table_name) AS "TABLE_COUNT", COUNT(*) AS "COLUMN_COUNT"
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_CATALOG = ? AND TABLE_SCHEMA = ?
+""")
+register_statement("local.catalog_rows", """
+    SELECT
+        t.table_name as "TABLE_NAME",
+        t.table_type as "TABLE_TYPE",
+        NULL as "CREATED",
+        NULL as "LAST_ALTERED",
+        c.column_name as "COLUMN_NAME",
+        c.data_type as "DATA_TYPE",
+        c.is_nullable as "IS_NULLABLE",
+        c.column_default as "COLUMN_DEFAULT",
+        NULL as "COMMENT"
+    FROM INFORMATION_SCHEMA.TABLES t
+    LEFT JOIN INFORMATION_SCHEMA.COLUMNS c
+        ON c.table_catalog = t.table_catalog AND c.table_schema = t.table_schema AND c.table_name = t.table_name
+    WHERE t.TABLE_CATALOG = ? AND t.TABLE_SCHEMA = ?
+    ORDER BY t.table_name, c.ordinal_position
+""")
+
+
+def translate_snowflake_sql(query: str) -> str:
+    """Snowflake SQL을 DuckDB에서 실행할 수 있도록 최소한으로 변환합니다."""
+    return _DATEADD_PART_PATTERN.sub(lambda m: f"DATEADD('{m.group(1).upper()}',", query)
+
+
+class _LocalCursor:
+    """DuckDB 커서를 Snowflake 커서 인터페이스로 감싼 어댑터"""
+    
+    def __init__(self, backend: "LocalQueryBackend", as_dict: bool = False):
+        self._backend = backend
+        self._cursor = backend.duckdb_cursor()
+        self._as_dict = as_dict
+        self.description = None
+        self.sfqid = None
+    
+    def execute(self, query: str, params=None, timeout: Optional[int] = None, **kwargs):
+        """지연 시간을 주입한 뒤 쿼리를 실행합니다.
+        
+        timeout(초)을 넘기면 DuckDB 실행을 중단(interrupt)하고 TimeoutError를 냅니다.
+        """
+        self._backend.inject_latency()
+        self.sfqid = str(uuid.uuid4())
+        timer = threading.Timer(timeout, self._cursor.interrupt) if timeout else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+        try:
+            self._cursor.execute(translate_snowflake_sql(query), params)
+        except duckdb.InterruptException:
+            if timer is not None and timer.finished.is_set():
+                raise TimeoutError(f"쿼리 실행 시간 초과 ({timeout:g}초, {self.sfqid})") from None
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        self.description = self._cursor.description
+        return self
+    
+    def fetch_pandas_all(self) -> pd.DataFrame:
+        return self._cursor.fetchdf()
+    
+    def fetch_arrow_all(self, force_return_table: bool = False):
+        table = _call_first(self._cursor, "to_arrow_table", "fetch_arrow_table")
+        return table if table.num_rows or force_return_table else None
+    
+    def fetch_arrow_batches(self):
+        reader = _call_first(self._cursor, "to_arrow_reader", "fetch_record_batch")
+        for batch in reader:
+            yield pa.Table.from_batches([batch])
+    
+    def fetch_pandas_batches(self):
+        for table in self.fetch_arrow_batches():
+            yield table.to_pandas()
+    
+    def fetchall(self) -> List:
+        return self._rows(self._cursor.fetchall())
+    
+    def fetchmany(self, size: int) -> List:
+        return self._rows(self._cursor.fetchmany(size))
+    
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._rows([row])[0] if row is not None else None
+    
+    def close(self):
+        self._cursor.close()
+    
+    def _rows(self, rows: List) -> List:
+        """DictCursor로 열린 경우 행을 dict로 변환합니다."""
+        if not self._as_dict:
+            return rows
+        columns = [desc[0] for desc in self.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+
+class _LocalConnection:
+    """LocalQueryBackend의 DB-API 연결 (DuckDB DB 공유)"""
+    
+    def __init__(self, backend: "LocalQueryBackend"):
+        self._backend = backend
+        self._closed = False
+    
+    def cursor(self, cursor_class=None) -> _LocalCursor:
+        return _LocalCursor(self._backend, as_dict=cursor_class is DictCursor)
+    
+    def is_closed(self) -> bool:
+        return self._closed
+    
+    def close(self):
+        self._closed = True
+
+
+class LocalQueryBackend(QueryBackend):
+    """DuckDB 기반 로컬 쿼리 백엔드
+    
+    - data_path: sample_data.json 형식 JSON 파일(최상위 키 → 테이블) 또는
+      Parquet 파일/디렉터리(파일 이름 → 테이블)
+    - tables: 테이블 이름 → DataFrame (직접 전달)
+    - latency / jitter: 쿼리마다 주입할 지연 시간 (초) - 캐시/동시성 효과를 재현 가능하게 측정
+    - database_path: DuckDB 파일 경로 (없으면 인메모리)
+    
+    테이블은 {database}.{schema} 아래에 만들어지므로 FNF.SAP_FNF.테이블명 형태의
+    로더 SQL을 그대로 실행할 수 있습니다.
+    
+    쿼리는 Snowflake와 같이 연결 풀과 실행 슬롯을 거쳐 실행되며, timeout을 넘기면 DuckDB 실행을
+    중단합니다. 다만 비동기 제출이 없어 동기로 실행하므로 대기 중 on_wait 콜백은 호출되지 않습니다.
+    """
+    
+    def __init__(self, data_path: Optional[str] = None, tables: Optional[Dict[str, pd.DataFrame]] = None,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 database: str = 'FNF', schema: str = 'SAP_FNF', database_path: Optional[str] = None):
+        self.account = 'local'
+        self.user = 'local'
+        self.warehouse = 'LOCAL'
+        self.database = database
+        self.schema = schema
+        self.role = 'LOCAL'
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(0)
+        self._random_lock = threading.Lock()
+        
+        self._database = duckdb.connect()
+        if database_path:
+            Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        attach_path = str(database_path or ':memory:').replace("'", "''")
+        self._database.execute(f"ATTACH '{attach_path}' AS {database}")
+        self._database.execute(f"CREATE SCHEMA IF NOT EXISTS {database}.{schema}")
+        for macro in _SNOWFLAKE_MACROS:
+            self._database.execute(macro)
+        
+        if data_path:
+            for name, df in load_local_tables(data_path).items():
+                self.register_table(name, df)
+        for name, df in (tables or {}).items():
+            self.register_table(name, df)
+        
+        super().__init__(disk_cache_dir=None)
+    
+    def connect(self):
+        """DuckDB DB에 대한 새 연결을 반환합니다."""
+        return _LocalConnection(self)
+    
+    def duckdb_cursor(self):
+        """DuckDB DB에 대한 새 네이티브 커서를 반환합니다 (지연 주입 없음, 사용 후 close 필요)."""
+        cursor = self._database.cursor()
+        cursor.execute(f"SET search_path = '{self.database}.{self.schema},memory.main'")
+        return cursor
+    
+    def register_table(self, name: str, df: pd.DataFrame):
+        """DataFrame을 {database}.{schema}.{name} 테이블로 등록합니다 (기존 테이블은 교체)."""
+        cursor = self._database.cursor()
+        try:
+            cursor.register("_incoming", df)
+            cursor.execute(f'CREATE OR REPLACE TABLE {self.database}.{self.schema}."{name}" AS SELECT * FROM _incoming')
+            cursor.unregister("_incoming")
+        finally:
+            cursor.close()
+    
+    def inject_latency(self):
+        """설정된 지연 시간만큼 대기합니다 (웨어하우스 왕복 시간 모사)."""
+        if self.latency <= 0 and self.jitter <= 0:
+            return
+        with self._random_lock:
+            jitter = self._random.uniform(0, self.jitter) if self.jitter > 0 else 0.0
+        time.sleep(self.latency + jitter)
+    
+    def get_tables(self, database: Optional[str] = None, schema: Optional[str] = None) -> List[Dict]:
+        """스키마의 테이블 목록을 반환합니다 (DuckDB에는 CREATED/LAST_ALTERED가 없어 None)."""
+        return self.execute_statement(
+            "local.tables", [database or self.database, schema or self.schema], ttl=0
+        ).to_dict('records')
+    
+    def _catalog_version(self, database: str, schema: str) -> tuple:
+        """DuckDB에는 LAST_ALTERED가 없어 테이블/컬럼 수로 변경을 감지합니다."""
+        row = self.execute_statement("local.catalog_version", [database, schema], ttl=0).iloc[0]
+        return int(row['TABLE_COUNT']), int(row['COLUMN_COUNT'])
+    
+    def _catalog_rows(self, database: str, schema: str) -> pd.DataFrame:
+        """스키마의 테이블 × 컬럼 행 (TABLES LEFT JOIN COLUMNS, 조회 1회)"""
+        return self.execute_statement("local.catalog_rows", [database, schema], ttl=0)
+    
+    def test_connection(self) -> Dict:
+        """로컬 엔진 정보를 반환합니다."""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version(), current_database(), current_schema()")
+                result = cursor.fetchone()
+                cursor.close()
+            
+            return {
+                "status": "success",
+                "version": f"DuckDB {result[0]}",
+                "user": self.user,
+                "database": result[1],
+                "schema": result[2],
+                "role": self.role
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+
+    
+    def open_result(self, query: str, params=None, timeout: Optional[float] = None,
+                    on_wait=None) -> QueryResult:
+        """쿼리 결과를 임시 테이블에 보관합니다 (Snowflake RESULT_SCAN 대응).
+        
+        다른 쿼리와 같이 실행 슬롯과 연결 풀을 거치고 timeout이 적용됩니다 (on_wait는 호출되지 않음).
+        """
+        query_id = str(uuid.uuid4())
+        table = f'memory.main."_result_{query_id}"'
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    self._execute(conn, cursor, f'CREATE TABLE {table} AS {query}', params, timeout, on_wait)
+                finally:
+                    cursor.close()
+            
+            cursor = self.duckdb_cursor()
+            try:
+                cursor.execute(f'SELECT * FROM {table} LIMIT 0')
+                columns = [desc[0] for desc in cursor.description]
+                cursor.execute(f'SELECT COUNT(*) FROM {table}')
+                row_count = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+        except (QueryCancelledError, TimeoutError):
+            raise
+        except Exception as e:
+            raise Exception(f"쿼리 실행 실패: {str(e)}") from e
+        return QueryResult(query_id, columns, row_count, query)
+    
+    def result_query(self, result: QueryResult) -> str:
+        return f'SELECT * FROM memory.main."_result_{result.query_id}"'
+    
+    def close_result(self, result: QueryResult):
+        cursor = self.duckdb_cursor()
+        try:
+            cursor.execute(f'DROP TABLE IF EXISTS memory.main."_result_{result.query_id}"')
+        finally:
+            cursor.close()
+    
+    def close(self):
+        """연결 풀을 정리하고 DuckDB DB를 닫습니다."""
+        super().close()
+        self._database.close()
+
+
+def load_local_tables(data_path: str) -> Dict[str, pd.DataFrame]:
+    """JSON(sample_data.json 형식) 또는 Parquet 파일/디렉터리에서 테이블을 읽어옵니다."""
+    path = Path(data_path)
+    if path.is_dir():
+        return {file.stem: pd.read_parquet(file) for file in sorted(path.glob("*.parquet"))}
+    if path.suffix == '.parquet':
+        return {path.stem: pd.read_parquet(path)}
+    if path.suffix == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {name: _parse_dates(pd.DataFrame(rows)) for name, rows in data.items() if isinstance(rows, list)}
+    raise ValueError(f"지원하지 않는 파일 형식: {path.suffix}")
+
+
+def _parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """ISO 날짜 문자열만 있는 컬럼(매출일자 등)을 datetime으로 변환합니다."""
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_string_dtype(values):
+            text = values.dropna().astype(str)
+            if len(text) and text.str.fullmatch(_ISO_DATE_PATTERN).all():
+                df[column] = pd.to_datetime(values)
+    return df
+
+
+def _call_first(target, *method_names):
+    """target에서 먼저 찾은 메서드를 호출합니다 (DuckDB 버전별 메서드 이름 차이 대응)."""
+    for name in method_names:
+        method = getattr(target, name, None)
+        if method is not None:
+            return method()
+    raise AttributeError(f"{type(target).__name__}에 {method_names} 메서드가 없습니다.")
+
@@ -0,0 +1,439 @@
+"""
+SAP_FNF 재무 테이블 로컬 복제본
+대시보드가 반복해서 읽는 재무 테이블을 로컬 DuckDB 파일로 주기적으로 증분 복제하고,
+대시보드 쿼리는 복제본에서 처리합니다. Snowflake는 변경 여부 확인(LAST_ALTERED)과
+사용자 정의 쿼리(ad-hoc)에만 사용합니다.
+"""
+
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import duckdb
+import pandas as pd
+
+from local_backend import LocalQueryBackend
+from snowflake_connector import (
+    DEFAULT_BATCH_ROWS, FETCH_MODE_ARROW, QueryBackend, QueryCancelledError, extract_source_tables,
+)
+
+
+class ReplicaTable:
+    """복제 대상 테이블 정의
+    
+    partition_column이 있으면 복제본의 최댓값 이후(같은 값 포함) 행만 다시 복사하고,
+    없으면 변경될 때마다 전체를 복사합니다.
+    """
+    
+    def __init__(self, name: str, partition_column: Optional[str] = None):
+        self.name = name
+        self.partition_column = partition_column
+
+
+# 대시보드가 사용하는 SAP_FNF 재무 테이블 (sample_queries.sql 기준 분할 컬럼)
+REPLICA_TABLES = [
+    ReplicaTable('손익계산서', partition_column='연도'),
+    ReplicaTable('재무상태표', partition_column='기준일자'),
+    ReplicaTable('매출테이블', partition_column='매출일자'),
+    ReplicaTable('부서별실적', partition_column='기준연도'),
+    ReplicaTable('제품별매출', partition_column='기준연도'),
+]
+
+# 복제 상태 테이블 (복제본 DB 파일 안에 함께 저장)
+STATE_SCHEMA = '_replica'
+
+# 복제본에서 처리할 수 없는 쿼리로 보고 원본으로 다시 보내는 DuckDB 오류
+# (테이블/컬럼/함수 없음, Snowflake 전용 문법)
+LOCAL_FALLBACK_ERRORS = (duckdb.CatalogException, duckdb.ParserException, duckdb.BinderException)
+
+
+class ReplicaSync:
+    """원본 백엔드의 테이블을 LocalQueryBackend(DuckDB 파일)로 증분 복제
+    
+    - 원본 LAST_ALTERED가 마지막 복제 때와 같으면 조회하지 않음 (INFORMATION_SCHEMA 조회 1회)
+    - 분할 컬럼이 있으면 복제본의 최댓값 이후 행만 다시 받아 같은 범위를 교체
+      (최근 분할 안의 수정/추가는 반영되고, 그 이전 분할의 삭제는 full=True 재동기화로 반영)
+    - start()는 interval초마다 sync_once()를 실행하는 백그라운드 스레드를 띄움
+    """
+    
+    def __init__(self, source: QueryBackend, replica: LocalQueryBackend,
+                 tables: Optional[List[ReplicaTable]] = None, interval: float = 300.0,
+                 batch_rows: int = DEFAULT_BATCH_ROWS):
+        self.source = source
+        self.replica = replica
+        self.tables = list(REPLICA_TABLES if tables is None else tables)
+        self.interval = interval
+        self.batch_rows = batch_rows
+        self.last_error = None
+        self.last_run = None
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ensure_state_table()
+    
+    def start(self):
+        """주기적 동기화 스레드를 시작합니다 (이미 실행 중이면 무시)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """동기화 스레드를 멈춥니다 (진행 중인 테이블 복사는 끝까지 진행)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def sync_once(self, full: bool = False) -> Dict[str, Dict]:
+        """모든 대상 테이블을 한 번 동기화하고 테이블별 결과를 반환합니다.
+        
+        반환값: 테이블 이름 → {"status": "copied"|"unchanged"|"missing"|"error", "rows": 복사한 행 수, ...}
+        """
+        with self._sync_lock:
+            results = {}
+            versions = self._source_versions()
+            state = self._load_state()
+            for table in self.tables:
+                try:
+                    if table.name.upper() not in versions:
+                        results[table.name] = {"status": "missing", "rows": 0}
+                        continue
+                    results[table.name] = self._sync_table(
+                        table, versions[table.name.upper()], state.get(table.name), full
+                    )
+                except Exception as e:
+                    results[table.name] = {"status": "error", "rows": 0, "message": str(e)}
+            
+            if any(result["status"] == "copied" for result in results.values()):
+                # 복제본이 바뀌었으므로 복제본 위에서 캐시된 결과를 버림
+                self.replica.invalidate_cache()
+            errors = [f"{name}: {result['message']}" for name, result in results.items() if result["status"] == "error"]
+            self.last_error = "; ".join(errors) or None
+            self.last_run = pd.Timestamp.now()
+            return results
+    
+    def status(self) -> List[Dict]:
+        """테이블별 복제 상태 (원본 LAST_ALTERED, 마지막 복제 시각, 행 수, 워터마크)를 반환합니다."""
+        state = self._load_state()
+        return [
+            {
+                "테이블": table.name,
+                "원본 변경 시각": state.get(table.name, {}).get("source_altered"),
+                "복제 시각": state.get(table.name, {}).get("synced_at"),
+                "행 수": state.get(table.name, {}).get("row_count"),
+                "워터마크": state.get(table.name, {}).get("watermark"),
+            }
+            for table in self.tables
+        ]
+    
+    def replicated_tables(self) -> set:
+        """복제본에 한 번 이상 복사된 테이블 이름(대문자)을 반환합니다."""
+        return {name.upper() for name in self._load_state()}
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                # 원본 연결 실패 등은 다음 주기에 다시 시도
+                self.last_error = str(e)
+                self.last_run = pd.Timestamp.now()
+            self._stop.wait(self.interval)
+    
+    def _source_versions(self) -> Dict[str, Optional[str]]:
+        """원본 스키마의 테이블 이름(대문자) → LAST_ALTERED(ISO 문자열) 매핑"""
+        versions = {}
+        for table in self.source.get_tables(self.source.database, self.source.schema):
+            altered = table['LAST_ALTERED']
+            versions[str(table['TABLE_NAME']).upper()] = (
+                None if altered is None or pd.isna(altered) else pd.Timestamp(altered).isoformat()
+            )
+        return versions
+    
+    def _sync_table(self, table: ReplicaTable, source_altered: Optional[str], state: Optional[Dict],
+                    full: bool) -> Dict:
+        # LAST_ALTERED를 알 수 없는 원본(뷰 등)은 매 주기 복사
+        if not full and state is not None and source_altered is not None and state["source_altered"] == source_altered:
+            return {"status": "unchanged", "rows": 0}
+        
+        watermark = None
+        if not full and state is not None and table.partition_column:
+            watermark = self._replica_watermark(table)
+        
+        source_name = f'{self.source.database}.{self.source.schema}."{table.name}"'
+        query = f"SELECT * FROM {source_name}"
+        params = None
+        if watermark is not None:
+            query += f' WHERE "{table.partition_column}" >= ?'
+            params = [watermark]
+        batches = self.source.iter_query_batches(query, batch_rows=self.batch_rows, as_arrow=True, params=params)
+        
+        if watermark is None:
+            rows = self._replace_table(table, batches)
+        else:
+            rows = self._replace_partitions(table, watermark, batches)
+        
+        self._save_state(table, source_altered)
+        return {"status": "copied", "rows": rows, "incremental": watermark is not None}
+    
+    def _replace_table(self, table: ReplicaTable, batches: Iterator) -> int:
+        """전체 복사: 스테이징 테이블에 적재한 뒤 한 트랜잭션으로 교체합니다."""
+        target = self._replica_name(table.name)
+        staging = self._replica_name(f"{table.name}__staging")
+        rows = 0
+        cursor = self.replica.duckdb_cursor()
+        try:
+            created = False
+            for batch in batches:
+                cursor.register("_batch", batch)
+                if created:
+                    cursor.execute(f"INSERT INTO {staging} BY NAME SELECT * FROM _batch")
+                else:
+                    cursor.execute(f"CREATE OR REPLACE TABLE {staging} AS SELECT * FROM _batch")
+                    created = True
+                cursor.unregister("_batch")
+                rows += batch.num_rows
+            if not created:
+                # 빈 테이블은 컬럼 구조만 복사
+                cursor.register("_batch", self.source.execute_query_arrow(
+                    f'SELECT * FROM {self.source.database}.{self.source.schema}."{table.name}" LIMIT 0'
+                ))
+                cursor.execute(f"CREATE OR REPLACE TABLE {staging} AS SELECT * FROM _batch")
+                cursor.unregister("_batch")
+            
+            cursor.execute("BEGIN TRANSACTION")
+            try:
+                cursor.execute(f"DROP TABLE IF EXISTS {target}")
+                cursor.execute(f'ALTER TABLE {staging} RENAME TO "{table.name}"')
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        finally:
+            cursor.close()
+        return rows
+    
+    def _replace_partitions(self, table: ReplicaTable, watermark, batches: Iterator) -> int:
+        """증분 복사: 워터마크 이후 분할을 삭제하고 새로 받은 행을 한 트랜잭션으로 넣습니다."""
+        target = self._replica_name(table.name)
+        rows = 0
+        cursor = self.replica.duckdb_cursor()
+        try:
+            cursor.execute("BEGIN TRANSACTION")
+            try:
+                cursor.execute(f'DELETE FROM {target} WHERE "{table.partition_column}" >= ?', [watermark])
+                for batch in batches:
+                    cursor.register("_batch", batch)
+                    cursor.execute(f"INSERT INTO {target} BY NAME SELECT * FROM _batch")
+                    cursor.unregister("_batch")
+                    rows += batch.num_rows
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        finally:
+            cursor.close()
+        return rows
+    
+    def _replica_watermark(self, table: ReplicaTable):
+        cursor = self.replica.duckdb_cursor()
+        try:
+            cursor.execute(f'SELECT MAX("{table.partition_column}") FROM {self._replica_name(table.name)}')
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+    
+    def _replica_name(self, name: str) -> str:
+        return f'{self.replica.database}.{self.replica.schema}."{name}"'
+    
+    def _ensure_state_table(self):
+        cursor = self.replica.duckdb_cursor()
+        try:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {self.replica.database}.{STATE_SCHEMA}")
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.replica.database}.{STATE_SCHEMA}.state (
+                    table_name VARCHAR PRIMARY KEY,
+                    source_altered VARCHAR,
+                    synced_at TIMESTAMP,
+                    row_count BIGINT,
+                    watermark VARCHAR
+                )
+            """)
+        finally:
+            cursor.close()
+    
+    def _load_state(self) -> Dict[str, Dict]:
+        cursor = self.replica.duckdb_cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {self.replica.database}.{STATE_SCHEMA}.state")
+            columns = [desc[0] for desc in cursor.description]
+            return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+    
+    def _save_state(self, table: ReplicaTable, source_altered: Optional[str]):
+        target = self._replica_name(table.name)
+        cursor = self.replica.duckdb_cursor()
+        try:
+            cursor.execute(f"SELECT COUNT(*) FROM {target}")
+            row_count = cursor.fetchone()[0]
+            watermark = None
+            if table.partition_column:
+                cursor.execute(f'SELECT MAX("{table.partition_column}") FROM {target}')
+                watermark = cursor.fetchone()[0]
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {self.replica.database}.{STATE_SCHEMA}.state VALUES (?, ?, ?, ?, ?)",
+                [table.name, source_altered, pd.Timestamp.now().to_pydatetime(), row_count,
+                 None if watermark is None else str(watermark)],
+            )
+        finally:
+            cursor.close()
+
+
+class ReplicaQueryBackend(LocalQueryBackend):
+    """복제본 우선 쿼리 백엔드
+    
+    execute_query()는 쿼리가 참조하는 테이블이 모두 복제본에 있으면 로컬 DuckDB에서 실행하고,
+    그렇지 않거나 로컬 실행에 실패하면(Snowflake 전용 문법 등) 원본 백엔드로 보냅니다.
+    사용자 정의 쿼리(iter_query_batches/execute_query_arrow), 테이블 탐색, 연결 테스트는
+    원본 백엔드를 그대로 사용합니다.
+    """
+    
+    def __init__(self, source: QueryBackend, database_path: str,
+                 tables: Optional[List[ReplicaTable]] = None, sync_interval: float = 300.0):
+        super().__init__(database=source.database, schema=source.schema, database_path=database_path)
+        # 복제본 결과 캐시 키가 원본 역할과 분리되도록 원본 식별 정보를 사용
+        self.source = source
+        self.account = source.account
+        self.user = source.user
+        self.role = source.role
+        self.warehouse = 'REPLICA'
+        self.sync = ReplicaSync(source, self, tables, interval=sync_interval)
+        self.sync.start()
+    
+    def serves_locally(self, query: str) -> bool:
+        """쿼리가 참조하는 테이블이 모두 복제본에 있으면 True (테이블이 없는 상수 쿼리 포함)"""
+        replicated = self.sync.replicated_tables()
+        return all(
+            database.upper() == self.database.upper() and schema.upper() == self.schema.upper()
+            and table.upper() in replicated
+            for database, schema, table in extract_source_tables(query, self.database, self.schema)
+        )
+    
+    def execute_query(self, query: str, params: Optional[Sequence] = None,
+                      fetch_mode: str = FETCH_MODE_ARROW, ttl: Optional[float] = None,
+                      persist: bool = True, timeout: Optional[float] = None) -> pd.DataFrame:
+        """복제본에서 처리 가능한 쿼리는 로컬에서, 나머지는 원본에서 실행합니다."""
+        if self.serves_locally(query):
+            try:
+                return super().execute_query(query, params, fetch_mode, ttl, persist=False, timeout=timeout)
+            except Exception as e:
+                # 취소/시간 초과 등은 원본에서 다시 실행하지 않고 그대로 전달
+                if not _is_local_sql_error(e):
+                    raise
+        return self.source.execute_query(query, params, fetch_mode, ttl, persist, timeout)
+    
+    def execute_query_arrow(self, query: str, params: Optional[Sequence] = None,
+                            timeout: Optional[float] = None):
+        return self.source.execute_query_arrow(query, params, timeout)
+    
+    def iter_query_batches(self, query: str, batch_rows: Optional[int] = DEFAULT_BATCH_ROWS,
+                           as_arrow: bool = False, params: Optional[Sequence] = None,
+                           timeout: Optional[float] = None, on_wait=None) -> Iterator:
+        return self.source.iter_query_batches(query, batch_rows, as_arrow, params, timeout, on_wait)
+    
+    def open_result(self, query: str, params: Optional[Sequence] = None, timeout: Optional[float] = None,
+                    on_wait=None):
+        return self.source.open_result(query, params, timeout, on_wait)
+    
+    def result_query(self, result) -> str:
+        return self.source.result_query(result)
+    
+    def fetch_result_page(self, result, offset: int, limit: int):
+        return self.source.fetch_result_page(result, offset, limit)
+    
+    def close_result(self, result):
+        self.source.close_result(result)
+    
+    def begin_run(self, session_id: str) -> str:
+        return self.source.begin_run(session_id)
+    
+    def attach_run(self, session_id: str) -> str:
+        return self.source.attach_run(session_id)
+    
+    def running_queries(self, session_id: Optional[str] = None) -> List[Dict]:
+        return self.source.running_queries(session_id)
+    
+    def cancel_query(self, query_id: str) -> bool:
+        return self.source.cancel_query(query_id)
+    
+    def cancel_session_queries(self, session_id: str) -> int:
+        return self.source.cancel_session_queries(session_id)
+    
+    def get_tables(self, database: Optional[str] = None, schema: Optional[str] = None) -> List[Dict]:
+        return self.source.get_tables(database, schema)
+    
+    def get_table_columns(self, table_name: str) -> pd.DataFrame:
+        return self.source.get_table_columns(table_name)
+    
+    def get_catalog(self, database: Optional[str] = None, schema: Optional[str] = None,
+                    refresh: bool = False):
+        return self.source.get_catalog(database, schema, refresh)
+    
+    def test_connection(self) -> Dict:
+        return self.source.test_connection()
+    
+    def health(self, wait: float = 0.0) -> Dict:
+        """원본 연결 상태를 반환합니다. 원본이 끊겨도 복제본이 있으면 "degraded"로 표시합니다."""
+        health = self.source.health(wait)
+        if health["status"] == "down" and self.sync.replicated_tables():
+            health = dict(health, status="degraded")
+        return health
+    
+    def pool_stats(self) -> Dict:
+        return self.source.pool_stats()
+    
+    def scheduler_stats(self) -> Dict:
+        """원본 스케줄러 현황에 복제본 스케줄러 현황('replica')을 더해 반환합니다."""
+        stats = self.source.scheduler_stats()
+        stats["replica"] = super().scheduler_stats()
+        return stats
+    
+    def invalidate_cache(self, query: Optional[str] = None, params: Optional[Sequence] = None):
+        super().invalidate_cache(query, params)
+        self.source.invalidate_cache(query, params)
+    
+    def cache_stats(self) -> Dict:
+        """원본 캐시 통계에 복제본 캐시 통계('replica')를 더해 반환합니다."""
+        stats = self.source.cache_stats()
+        stats["replica"] = super().cache_stats()
+        return stats
+    
+    def query_metrics(self) -> List[Dict]:
+        """복제본에서 처리한 쿼리와 원본으로 보낸 쿼리의 기록을 시간순으로 합쳐 반환합니다."""
+        records = super().query_metrics() + self.source.query_metrics()
+        return sorted(records, key=lambda entry: entry["timestamp"])
+    
+    def replica_status(self) -> Dict:
+        """복제 상태 (마지막 동기화 시각/오류, 테이블별 상태)를 반환합니다."""
+        return {
+            "last_run": self.sync.last_run,
+            "last_error": self.sync.last_error,
+            "tables": self.sync.status(),
+        }
+    
+    def close(self):
+        self.sync.stop(timeout=1.0)
+        super().close()
+        self.source.close()
+
+
+def _is_local_sql_error(error: BaseException) -> bool:
+    """복제본 실행 오류(원인 체인 포함)가 LOCAL_FALLBACK_ERRORS이면 True (취소/시간 초과는 False)"""
+    while error is not None:
+        if isinstance(error, (QueryCancelledError, TimeoutError)):
+            return False
+        if isinstance(error, LOCAL_FALLBACK_ERRORS):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
@@ -0,0 +1,152 @@
+"""
+메모리 내 OLAP 롤업 큐브
+팩트 데이터를 한 번 집계해 차원 조합(월 × 부서 × 제품 등)별 합계를 미리 만들어 두고,
+드릴다운/롤업/Top-N 요청을 다시 조회하지 않고 메모리에서 응답합니다.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 큐브 조회 결과를 기억해 두는 개수 (같은 드릴다운 경로를 다시 열면 바로 반환)
+CUBE_MEMO_SIZE = 256
+
+
+class RollupCube:
+    """차원의 모든 부분집합(큐보이드)별로 측정값 합계를 미리 계산한 롤업 큐브
+    
+    - dimensions: 차원 컬럼 (예: ["월", "부서", "제품"])
+    - measures: 합계를 낼 측정값 컬럼 (예: ["매출액", "판매수량"])
+    
+    가장 세밀한 큐보이드를 팩트에서 한 번 집계하고, 나머지는 그 결과를 다시 묶어 만듭니다
+    (측정값은 합산 가능해야 함). 조회 결과는 LRU로 기억하므로 반환된 DataFrame은 수정하지 마세요.
+    """
+    
+    def __init__(self, fact: pd.DataFrame, dimensions: Sequence[str], measures: Sequence[str],
+                 memo_size: int = CUBE_MEMO_SIZE):
+        missing = [column for column in [*dimensions, *measures] if column not in fact.columns]
+        if missing:
+            raise ValueError(f"큐브에 필요한 컬럼이 없습니다: {', '.join(missing)}")
+        
+        started = time.perf_counter()
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        self.rows = len(fact)
+        
+        base = fact.groupby(list(self.dimensions), observed=True, sort=True, dropna=False)[list(self.measures)].sum()
+        self._cuboids = {}
+        for size in range(len(self.dimensions) + 1):
+            for combination in itertools.combinations(self.dimensions, size):
+                if combination == self.dimensions:
+                    cuboid = base
+                elif combination:
+                    cuboid = base.groupby(level=list(combination), observed=True, sort=True, dropna=False).sum()
+                else:
+                    cuboid = base.sum().to_frame().T
+                self._cuboids[combination] = cuboid
+        self.members = {
+            dimension: list(self._cuboids[(dimension,)].index) for dimension in self.dimensions
+        }
+        
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.built_at = pd.Timestamp.now()
+    
+    def rollup(self, dimensions: Sequence[str] = (), filters: Optional[Dict] = None) -> pd.DataFrame:
+        """dimensions 단위로 묶은 측정값 합계 (filters: {차원: 값 또는 값 목록}, None 값은 전체)
+        
+        dimensions가 비어 있으면 전체 합계 한 행을 반환합니다.
+        """
+        dimensions = tuple(dimensions)
+        filters = self._normalize_filters(filters)
+        return self._memoized(("rollup", dimensions, filters), lambda: self._rollup(dimensions, filters))
+    
+    def drill_down(self, dimension: str, path: Optional[Dict] = None) -> pd.DataFrame:
+        """path(상위 차원 선택값)로 좁힌 뒤 dimension 단위로 펼친 합계"""
+        return self.rollup((dimension,), path)
+    
+    def top_n(self, dimension: str, measure: str, n: int = 10, filters: Optional[Dict] = None) -> pd.DataFrame:
+        """measure 합계가 큰 순서로 dimension 상위 n개"""
+        if measure not in self.measures:
+            raise ValueError(f"큐브에 없는 측정값: {measure}")
+        filters = self._normalize_filters(filters)
+        return self._memoized(
+            ("top_n", dimension, measure, n, filters),
+            lambda: self._rollup((dimension,), filters).nlargest(n, measure).reset_index(drop=True),
+        )
+    
+    def stats(self) -> Dict:
+        """큐브 크기와 조회 결과 재사용 통계"""
+        with self._lock:
+            return {
+                "rows": self.rows,
+                "cuboids": {" × ".join(key) or "(전체)": len(cuboid) for key, cuboid in self._cuboids.items()},
+                "build_ms": self.build_ms,
+                "built_at": self.built_at,
+                "memo_entries": len(self._memo),
+                "memo_hits": self._hits,
+                "memo_misses": self._misses,
+            }
+    
+    def _normalize_filters(self, filters: Optional[Dict]) -> tuple:
+        """필터를 (차원, 값 튜플) 목록으로 정리합니다 (조회 결과 기억 키로 사용)."""
+        normalized = []
+        for dimension, values in (filters or {}).items():
+            if dimension not in self.dimensions:
+                raise ValueError(f"큐브에 없는 차원: {dimension}")
+            if values is None:
+                continue
+            if isinstance(values, (list, tuple, set, frozenset, pd.Index, np.ndarray)):
+                values = tuple(values)
+            else:
+                values = (values,)
+            normalized.append((dimension, values))
+        return tuple(sorted(normalized, key=lambda item: self.dimensions.index(item[0])))
+    
+    def _rollup(self, dimensions: tuple, filters: tuple) -> pd.DataFrame:
+        unknown = [dimension for dimension in dimensions if dimension not in self.dimensions]
+        if unknown:
+            raise ValueError(f"큐브에 없는 차원: {', '.join(unknown)}")
+        
+        # 묶을 차원과 필터 차원을 모두 가진 가장 작은 큐보이드에서 시작
+        needed = set(dimensions) | {dimension for dimension, _ in filters}
+        cuboid = self._cuboids[tuple(dimension for dimension in self.dimensions if dimension in needed)]
+        if filters:
+            mask = np.ones(len(cuboid), dtype=bool)
+            for dimension, values in filters:
+                mask &= cuboid.index.get_level_values(dimension).isin(values)
+            cuboid = cuboid[mask]
+        
+        if not dimensions:
+            return cuboid.sum().to_frame().T if filters else cuboid.reset_index(drop=True)
+        if set(dimensions) != needed:
+            cuboid = cuboid.groupby(level=list(dimensions), observed=True, sort=True, dropna=False).sum()
+        elif list(cuboid.index.names) != list(dimensions):
+            cuboid = cuboid.reorder_levels(list(dimensions)).sort_index()
+        return cuboid.reset_index()
+    
+    def _memoized(self, key: tuple, compute) -> pd.DataFrame:
+        with self._lock:
+            result = self._memo.get(key)
+            if result is not None:
+                self._memo.move_to_end(key)
+                self._hits += 1
+                return result
+            self._misses += 1
+        
+        result = compute()
+        with self._lock:
+            self._memo[key] = result
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return result
+
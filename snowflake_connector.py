@@ -3,111 +3,2361 @@ Snowflake 데이터베이스 연결 및 데이터 조회 모듈
 F&F 실적 데이터를 Snowflake에서 조회하는 기능을 제공합니다.
 """
 
+import contextvars
+import decimal
+import hashlib
+import json
 import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 import pandas as pd
 import snowflake.connector
 from snowflake.connector import DictCursor
-from typing import Optional, Dict, List
+from snowflake.connector.errors import NotSupportedError
+from typing import Optional, Dict, List, Iterator, Sequence
 import streamlit as st
+from rollup_cube import RollupCube
+# 금액/비율 표시 함수 (formatting 모듈로 이동, 기존 import 경로 유지)
+from formatting import format_currency, format_percentage  # noqa: F401
 
+# pyarrow는 Arrow 결과 경로에 필요합니다 (없으면 DictCursor 경로로 동작)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pc = None
+    HAS_PYARROW = False
 
-class SnowflakeConnector:
-    """Snowflake 데이터베이스 연결 및 쿼리 실행 클래스"""
+
+# execute_query 결과 수신 방식
+FETCH_MODE_ARROW = "arrow"  # fetch_arrow_all → to_pandas (Arrow 결과 → DataFrame 직접 변환)
+FETCH_MODE_DICT = "dict"    # DictCursor.fetchall (호환용 fallback)
+
+# iter_query_batches 기본 배치 크기 (행)
+DEFAULT_BATCH_ROWS = 50000
+
+# 쿼리 실행 제한 시간 기본값 (초, 0이면 제한 없음) - 초과하면 SYSTEM$CANCEL_QUERY로 취소
+DEFAULT_QUERY_TIMEOUT = float(os.getenv('SNOWFLAKE_QUERY_TIMEOUT', '300'))
+
+# SYSTEM$CANCEL_QUERY 전용 연결을 기다리는 최대 시간 (초)
+CANCEL_TIMEOUT = 5.0
+
+# 비동기 실행 상태 확인 간격 (초, 처음 값에서 두 배씩 최대값까지)
+QUERY_POLL_INTERVAL = 0.05
+QUERY_POLL_MAX_INTERVAL = 0.5
+
+# 쿼리 워크로드 등급 (우선순위 높은 순) - query_workload()로 지정, 지정하지 않으면 드릴다운
+WORKLOAD_TILE = "tile"            # 대시보드 지표/차트 (경영진 화면)
+WORKLOAD_DRILLDOWN = "drilldown"  # 테이블 탐색 등 상세 조회
+WORKLOAD_ADHOC = "adhoc"          # 사이드바 커스텀 쿼리, CSV 내보내기
+QUERY_WORKLOAD = contextvars.ContextVar('query_workload', default=WORKLOAD_DRILLDOWN)
+
+# 현재 실행 중인 쿼리의 소유자 (Streamlit 세션 ID, 실행 ID) - 스레드 풀 작업은 contextvars.copy_context()로 전달
+QUERY_OWNER = contextvars.ContextVar('query_owner', default=None)
+
+# 조회 결과 dtype 정리 (SNOWFLAKE_NORMALIZE_DTYPES=0이면 사용 안 함)
+NORMALIZE_DTYPES = os.getenv('SNOWFLAKE_NORMALIZE_DTYPES', '1') != '0'
+# 이 행 수 이상일 때만 문자열 컬럼을 category로 변환 (작은 결과는 절약 효과가 없음)
+CATEGORY_MIN_ROWS = 1000
+# 고유값 수가 행 수의 이 비율 이하이고 최대 개수 이하인 문자열 컬럼만 category로 변환
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_UNIQUE = 10000
+# float64로 정확히 표현할 수 있는 십진 자릿수 (이보다 정밀한 소수는 Decimal 그대로 유지)
+FLOAT64_SAFE_DIGITS = 15
+
+# 쿼리 성능 기록에 붙는 호출자 이름 (예: 로더 함수 이름) - query_label()로 지정
+QUERY_LABEL = contextvars.ContextVar('query_label', default=None)
+
+# 성능 기록에 남기는 SQL 문 길이 (자)
+METRICS_QUERY_CHARS = 200
+
+# 테이블 LAST_ALTERED 조회 결과를 메모리에 유지하는 시간 (초)
+TABLE_VERSION_TTL = 60
+
+# 스키마 카탈로그(테이블 + 컬럼)를 재검증 없이 사용하는 시간 (초)
+CATALOG_TTL = 600
+
+# 카탈로그의 테이블별 컬럼 정보 (get_table_columns 반환 형식)
+CATALOG_COLUMNS = ["COLUMN_NAME", "DATA_TYPE", "IS_NULLABLE", "COLUMN_DEFAULT", "COMMENT"]
+
+# 이름이 붙은 SQL 문 템플릿 (값은 ? 자리에 바인딩, 식별자만 {이름} 자리에 채움)
+STATEMENT_TEMPLATES: Dict[str, str] = {}
+
+_IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_$]*$')
+
+# Snowflake 쿼리 ID (RESULT_SCAN 인자로 SQL에 직접 넣기 전에 확인)
+_QUERY_ID_PATTERN = re.compile(r'^[0-9A-Za-z_-]+$')
+
+
+def register_statement(name: str, sql: str):
+    """SQL 문 템플릿을 이름으로 등록합니다 (같은 이름은 교체)."""
+    STATEMENT_TEMPLATES[name] = sql
+
+
+def statement(name: str, **identifiers) -> str:
+    """등록된 템플릿에 식별자(데이터베이스/스키마 이름 등)를 채운 SQL을 반환합니다.
+    
+    식별자는 바인딩할 수 없으므로 따옴표 없는 Snowflake 식별자 형식만 허용합니다.
+    """
+    if name not in STATEMENT_TEMPLATES:
+        raise KeyError(f"등록되지 않은 SQL 문: {name}")
+    for key, value in identifiers.items():
+        if not _IDENTIFIER_PATTERN.match(str(value)):
+            raise ValueError(f"잘못된 식별자 {key}={value!r}")
+    return STATEMENT_TEMPLATES[name].format(**identifiers)
+
+
+register_statement("tables", """
+    SELECT TABLE_NAME, TABLE_TYPE, CREATED, LAST_ALTERED
+    FROM {database}.INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = ?
+    ORDER BY TABLE_NAME
+""")
+register_statement("catalog_version", """
+    SELECT COUNT(*) AS TABLE_COUNT, MAX(LAST_ALTERED) AS LAST_ALTERED
+    FROM {database}.INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = ?
+""")
+register_statement("catalog_rows", """
+    SELECT
+        t.TABLE_NAME, t.TABLE_TYPE, t.CREATED, t.LAST_ALTERED,
+        c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE, c.COLUMN_DEFAULT, c.COMMENT
+    FROM {database}.INFORMATION_SCHEMA.TABLES t
+    LEFT JOIN {database}.INFORMATION_SCHEMA.COLUMNS c
+        ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
+    WHERE t.TABLE_SCHEMA = ?
+    ORDER BY t.TABLE_NAME, c.ORDINAL_POSITION
+""")
+register_statement("connection_info", """
+    SELECT CURRENT_VERSION(), CURRENT_USER(), CURRENT_DATABASE(), CURRENT_SCHEMA(), CURRENT_ROLE()
+""")
+
+
+class ConnectionPool:
+    """스레드 안전한 Snowflake 연결 풀
+    
+    - min_size: 유휴 정리 시에도 유지하는 최소 연결 수
+    - max_size: 동시에 열 수 있는 최대 연결 수
+    - checkout_timeout: 연결 대여 대기 최대 시간 (초)
+    - idle_timeout: 이 시간 이상 쓰이지 않은 유휴 연결은 정리 (초)
+    - max_lifetime: 생성 후 이 시간이 지난 연결은 재사용하지 않음 (초)
+    - health_check_interval: 이 시간 이상 유휴였던 연결은 대여 시 SELECT 1로 확인 (초)
+    """
+    
+    def __init__(self, factory, min_size: int = 1, max_size: int = 10,
+                 checkout_timeout: float = 30.0, idle_timeout: float = 600.0,
+                 max_lifetime: float = 3600.0, health_check_interval: float = 60.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"잘못된 연결 풀 크기: min_size={min_size}, max_size={max_size}")
+        
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        
+        self._lock = threading.Condition()
+        self._idle = deque()      # (connection, created_at, last_used)
+        self._created_at = {}     # id(connection) -> created_at (대여 중 연결 포함)
+        self._in_use = 0
+        self._waiting = 0
+        self._pending = 0         # 생성 중인 연결 수
+        
+        # 통계
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._opened = 0
+        self._closed = 0
+    
+    @property
+    def size(self) -> int:
+        """현재 열려 있는(또는 생성 중인) 연결 수"""
+        return len(self._idle) + self._in_use + self._pending
+    
+    def acquire(self, timeout: Optional[float] = None):
+        """풀에서 연결을 빌립니다. 사용 후 반드시 release()로 반환해야 합니다."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        
+        while True:
+            stale = []
+            candidate = None
+            create = False
+            with self._lock:
+                self._waiting += 1
+                try:
+                    while True:
+                        stale.extend(self._evict_idle_locked())
+                        if self._idle:
+                            candidate = self._idle.pop()
+                            self._in_use += 1
+                            break
+                        if self.size < self.max_size:
+                            self._pending += 1
+                            create = True
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise ConnectionError(
+                                f"연결 풀 대기 시간 초과 ({timeout:g}초, 최대 {self.max_size}개 사용 중)"
+                            )
+                        self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            
+            self._close_quietly(stale)
+            
+            if create:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._lock:
+                        self._pending -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._pending -= 1
+                    self._in_use += 1
+                    self._opened += 1
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._record_wait_locked(time.monotonic() - started)
+                return conn
+            
+            conn, created_at, last_used = candidate
+            if self._is_healthy(conn, last_used):
+                with self._lock:
+                    self._record_wait_locked(time.monotonic() - started)
+                return conn
+            
+            # 상태 확인 실패 → 버리고 다시 시도
+            self._discard(conn)
+    
+    def release(self, conn, discard: bool = False):
+        """빌린 연결을 풀에 반환합니다. discard=True이면 연결을 닫고 버립니다."""
+        now = time.monotonic()
+        with self._lock:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(conn), now)
+            close_conn = discard or now - created_at >= self.max_lifetime or conn.is_closed()
+            if close_conn:
+                self._created_at.pop(id(conn), None)
+                self._closed += 1
+            else:
+                self._idle.append((conn, created_at, now))
+            self._lock.notify()
+        
+        if close_conn:
+            self._close_quietly([conn])
+    
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """작업 단위 하나 동안 연결을 빌려주는 컨텍스트 매니저"""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            # 오류로 연결이 닫혔다면 풀에 되돌리지 않음
+            discard = conn.is_closed()
+            raise
+        except BaseException:
+            # Streamlit 재실행/중지 등으로 작업 도중 중단되면 연결 상태를 알 수 없으므로 버림
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+    
+    def stats(self) -> Dict:
+        """연결 풀 사용 현황을 반환합니다."""
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "opened": self._opened,
+                "closed": self._closed,
+            }
+    
+    def close_all(self):
+        """유휴 연결을 모두 닫습니다. 대여 중인 연결은 반환 시 닫히지 않고 재사용됩니다."""
+        with self._lock:
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            for conn in idle:
+                self._created_at.pop(id(conn), None)
+            self._closed += len(idle)
+        self._close_quietly(idle)
+    
+    def _evict_idle_locked(self) -> List:
+        """수명이 지났거나 오래 유휴 상태인 연결을 풀에서 빼냅니다 (락 보유 상태에서 호출)."""
+        now = time.monotonic()
+        kept = deque()
+        evicted = []
+        for conn, created_at, last_used in self._idle:
+            too_old = now - created_at >= self.max_lifetime
+            too_idle = now - last_used >= self.idle_timeout and self.size - len(evicted) > self.min_size
+            if too_old or too_idle:
+                evicted.append(conn)
+                self._created_at.pop(id(conn), None)
+            else:
+                kept.append((conn, created_at, last_used))
+        self._idle = kept
+        self._closed += len(evicted)
+        return evicted
+    
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        """대여 직전 연결 상태를 확인합니다."""
+        try:
+            if conn.is_closed():
+                return False
+            if time.monotonic() - last_used < self.health_check_interval:
+                return True
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+    
+    def _discard(self, conn):
+        """대여 처리된 연결을 닫고 풀에서 제거합니다."""
+        with self._lock:
+            self._in_use -= 1
+            self._created_at.pop(id(conn), None)
+            self._closed += 1
+            self._lock.notify()
+        self._close_quietly([conn])
+    
+    def _record_wait_locked(self, waited: float):
+        """대기 시간 통계를 갱신합니다 (락 보유 상태에서 호출)."""
+        self._checkouts += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+    
+    @staticmethod
+    def _close_quietly(connections: List):
+        """연결을 닫되 오류는 무시합니다."""
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class WorkloadClass:
+    """스케줄러 워크로드 등급 설정
+    
+    - priority: 작을수록 먼저 실행 (대기 중인 높은 등급이 있으면 낮은 등급은 기다림)
+    - max_concurrency: 등급 전체 동시 실행 상한 (None이면 스케줄러 전체 상한)
+    - max_per_user: 사용자(세션)별 동시 실행 상한 (None이면 제한 없음)
+    """
+    
+    def __init__(self, name: str, priority: int, max_concurrency: Optional[int] = None,
+                 max_per_user: Optional[int] = None):
+        self.name = name
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+
+
+class QueryScheduler:
+    """워크로드 등급별 우선순위와 동시 실행 상한으로 쿼리 실행 순서를 정하는 스케줄러
+    
+    실행 슬롯은 max_concurrency개이며(연결 풀 크기와 같게 설정), 대기열은 (우선순위, 도착 순)으로
+    처리합니다. 등급/사용자 상한에 걸린 요청은 건너뛰고 다음 요청이 실행되므로 한 사용자의
+    대기 요청이 다른 요청을 막지 않습니다. 하위 등급의 상한을 전체보다 작게 두면
+    지표 쿼리용 슬롯이 항상 남습니다.
+    """
+    
+    def __init__(self, classes: List[WorkloadClass], max_concurrency: int = 10,
+                 queue_timeout: float = 300.0):
+        self.classes = {workload.name: workload for workload in classes}
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        
+        self._lock = threading.Condition()
+        self._sequence = 0
+        self._queue = []          # 대기 중인 티켓 (dict)
+        self._running = 0
+        self._running_by_class = {name: 0 for name in self.classes}
+        self._running_by_user = {}  # (등급, 사용자) -> 실행 수
+        
+        # 통계
+        self._completed = {name: 0 for name in self.classes}
+        self._timeouts = {name: 0 for name in self.classes}
+        self._total_wait = {name: 0.0 for name in self.classes}
+        self._max_wait = {name: 0.0 for name in self.classes}
+    
+    def acquire(self, workload: str, user: Optional[str] = None, label: Optional[str] = None,
+                timeout: Optional[float] = None) -> Dict:
+        """실행 슬롯을 받을 때까지 기다립니다. 사용 후 반드시 release()로 반환해야 합니다."""
+        if workload not in self.classes:
+            raise ValueError(f"알 수 없는 워크로드 등급: {workload}")
+        timeout = self.queue_timeout if timeout is None else timeout
+        
+        with self._lock:
+            self._sequence += 1
+            ticket = {
+                "sequence": self._sequence,
+                "workload": workload,
+                "priority": self.classes[workload].priority,
+                "user": user or "(system)",
+                "label": label,
+                "queued_at": time.monotonic(),
+            }
+            self._queue.append(ticket)
+            deadline = ticket["queued_at"] + timeout
+            try:
+                while self._next_locked() is not ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts[workload] += 1
+                        raise ConnectionError(
+                            f"쿼리 대기열 시간 초과 ({timeout:g}초, {workload} 등급, 실행 중 {self._running}개)"
+                        )
+                    self._lock.wait(remaining)
+            finally:
+                self._queue.remove(ticket)
+                # 다른 대기자의 순서가 바뀌었을 수 있음
+                self._lock.notify_all()
+            
+            waited = time.monotonic() - ticket["queued_at"]
+            self._running += 1
+            self._running_by_class[workload] += 1
+            user_key = (workload, ticket["user"])
+            self._running_by_user[user_key] = self._running_by_user.get(user_key, 0) + 1
+            self._total_wait[workload] += waited
+            self._max_wait[workload] = max(self._max_wait[workload], waited)
+            ticket["waited"] = waited
+            return ticket
+    
+    def release(self, ticket: Dict):
+        """실행 슬롯을 반환합니다."""
+        with self._lock:
+            workload = ticket["workload"]
+            self._running -= 1
+            self._running_by_class[workload] -= 1
+            user_key = (workload, ticket["user"])
+            self._running_by_user[user_key] -= 1
+            if not self._running_by_user[user_key]:
+                del self._running_by_user[user_key]
+            self._completed[workload] += 1
+            self._lock.notify_all()
+    
+    @contextmanager
+    def slot(self, workload: str, user: Optional[str] = None, label: Optional[str] = None,
+             timeout: Optional[float] = None):
+        """쿼리 하나를 실행하는 동안 슬롯을 잡고 있는 컨텍스트 매니저"""
+        ticket = self.acquire(workload, user, label, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+    
+    def queued(self) -> List[Dict]:
+        """대기 중인 요청 목록 (실행될 순서대로)"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "workload": ticket["workload"],
+                    "user": ticket["user"],
+                    "label": ticket["label"],
+                    "waiting_s": round(now - ticket["queued_at"], 2),
+                }
+                for ticket in sorted(self._queue, key=lambda ticket: (ticket["priority"], ticket["sequence"]))
+            ]
+    
+    def stats(self) -> Dict:
+        """등급별 실행/대기 현황과 대기 시간 통계를 반환합니다."""
+        with self._lock:
+            classes = {}
+            for name, workload in self.classes.items():
+                completed = self._completed[name]
+                classes[name] = {
+                    "priority": workload.priority,
+                    "max_concurrency": workload.max_concurrency or self.max_concurrency,
+                    "max_per_user": workload.max_per_user,
+                    "running": self._running_by_class[name],
+                    "queued": sum(1 for ticket in self._queue if ticket["workload"] == name),
+                    "completed": completed,
+                    "timeouts": self._timeouts[name],
+                    "avg_wait_ms": round(self._total_wait[name] / completed * 1000, 2) if completed else 0.0,
+                    "max_wait_ms": round(self._max_wait[name] * 1000, 2),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "running": self._running,
+                "queued": len(self._queue),
+                "classes": classes,
+            }
+    
+    def _next_locked(self) -> Optional[Dict]:
+        """지금 실행할 수 있는 가장 앞선 대기 요청 (락 보유 상태에서 호출)"""
+        if self._running >= self.max_concurrency:
+            return None
+        for ticket in sorted(self._queue, key=lambda ticket: (ticket["priority"], ticket["sequence"])):
+            workload = self.classes[ticket["workload"]]
+            class_limit = workload.max_concurrency or self.max_concurrency
+            if self._running_by_class[workload.name] >= class_limit:
+                continue
+            user_running = self._running_by_user.get((workload.name, ticket["user"]), 0)
+            if workload.max_per_user is not None and user_running >= workload.max_per_user:
+                continue
+            return ticket
+        return None
+
+
+def default_workload_classes(max_concurrency: int) -> List[WorkloadClass]:
+    """기본 워크로드 등급: 지표는 제한 없음, 드릴다운은 슬롯의 3/4, 커스텀 쿼리는 절반까지
+    
+    드릴다운/커스텀 쿼리는 사용자(세션)별로 SNOWFLAKE_USER_MAX_CONCURRENCY개까지만 동시에 실행합니다.
+    """
+    per_user = int(os.getenv('SNOWFLAKE_USER_MAX_CONCURRENCY', '2'))
+    drilldown_limit = int(os.getenv('SNOWFLAKE_DRILLDOWN_MAX_CONCURRENCY', str(max(1, max_concurrency * 3 // 4))))
+    adhoc_limit = int(os.getenv('SNOWFLAKE_ADHOC_MAX_CONCURRENCY', str(max(1, max_concurrency // 2))))
+    return [
+        WorkloadClass(WORKLOAD_TILE, priority=0),
+        WorkloadClass(WORKLOAD_DRILLDOWN, priority=1, max_concurrency=drilldown_limit, max_per_user=per_user),
+        WorkloadClass(WORKLOAD_ADHOC, priority=2, max_concurrency=adhoc_limit, max_per_user=per_user),
+    ]
+
+
+@contextmanager
+def query_workload(workload: str):
+    """블록 안에서 실행되는 쿼리의 워크로드 등급을 지정하는 컨텍스트 매니저
+    
+    사용 예:
+        with query_workload(WORKLOAD_ADHOC):
+            connector.open_result(sql)
+    """
+    token = QUERY_WORKLOAD.set(workload)
+    try:
+        yield
+    finally:
+        QUERY_WORKLOAD.reset(token)
+
+
+class HealthMonitor:
+    """백그라운드 연결 상태 감시 (keepalive 하트비트 + 지터 백오프 재연결)
+    
+    interval초마다 연결 풀에서 연결을 빌려 SELECT 1을 실행합니다. 유휴 세션이 만료되지 않게
+    유지하면서 상태(up/down)를 기록하므로, 페이지는 매번 왕복 없이 status()만 읽으면 됩니다.
+    실패하면 그 연결을 버리고 backoff_base × 2^(연속 실패 수)초(최대 max_backoff, ±50% 지터)
+    뒤에 새 연결로 다시 시도합니다.
+    """
+    
+    STATUS_UNKNOWN = "unknown"
+    STATUS_UP = "up"
+    STATUS_DOWN = "down"
+    
+    def __init__(self, pool: ConnectionPool, interval: float = 60.0, backoff_base: float = 1.0,
+                 max_backoff: float = 60.0, timeout: float = 10.0):
+        self.pool = pool
+        self.interval = interval
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._checked = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._status = self.STATUS_UNKNOWN
+        self._message = None
+        self._checked_at = None
+        self._latency_ms = None
+        self._failures = 0
+        self._next_check = None
+    
+    def start(self):
+        """감시 스레드를 시작합니다 (이미 실행 중이면 무시)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snowflake-health", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """감시 스레드를 멈춥니다."""
+        self._stop.set()
+        self._wake.set()
+    
+    def check_now(self) -> Dict:
+        """즉시 한 번 확인하고 상태를 반환합니다."""
+        self._check()
+        return self.status()
+    
+    def request_check(self):
+        """다음 주기를 기다리지 않고 감시 스레드가 바로 확인하도록 깨웁니다."""
+        self._wake.set()
+    
+    def status(self, wait: float = 0.0) -> Dict:
+        """마지막으로 확인한 연결 상태를 반환합니다.
+        
+        wait초 동안 첫 확인이 끝나기를 기다립니다 (이미 확인했으면 바로 반환).
+        """
+        if wait > 0:
+            self._checked.wait(wait)
+        with self._lock:
+            return {
+                "status": self._status,
+                "message": self._message,
+                "checked_at": self._checked_at,
+                "latency_ms": self._latency_ms,
+                "consecutive_failures": self._failures,
+                "next_check_in": None if self._next_check is None else max(0.0, round(self._next_check - time.monotonic(), 1)),
+            }
+    
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self._check()
+            with self._lock:
+                self._next_check = time.monotonic() + delay
+            self._wake.wait(delay)
+            self._wake.clear()
+    
+    def _check(self) -> float:
+        """하트비트 한 번을 실행하고 다음 확인까지의 대기 시간을 반환합니다."""
+        started = time.monotonic()
+        try:
+            conn = self.pool.acquire(self.timeout)
+        except Exception as e:
+            return self._record_failure(e)
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+        except Exception as e:
+            # 하트비트에 실패한 연결은 재사용하지 않음
+            self.pool.release(conn, discard=True)
+            return self._record_failure(e)
+        self.pool.release(conn)
+        
+        with self._lock:
+            self._status = self.STATUS_UP
+            self._message = None
+            self._checked_at = pd.Timestamp.now()
+            self._latency_ms = round((time.monotonic() - started) * 1000, 1)
+            self._failures = 0
+        self._checked.set()
+        return self.interval
+    
+    def _record_failure(self, error: Exception) -> float:
+        with self._lock:
+            self._status = self.STATUS_DOWN
+            self._message = str(error)
+            self._checked_at = pd.Timestamp.now()
+            self._latency_ms = None
+            self._failures += 1
+            backoff = min(self.max_backoff, self.backoff_base * 2 ** (self._failures - 1))
+        self._checked.set()
+        return backoff * random.uniform(0.5, 1.5)
+
+
+class QueryCancelledError(Exception):
+    """쿼리가 취소되었을 때 (사용자 취소 또는 다음 실행으로 대체됨)"""
+
+
+class QueryTracker:
+    """실행 중인 쿼리 ID를 세션/실행 단위로 추적
+    
+    세션마다 현재 실행 ID를 기억하며, 이전 실행이 소유한 쿼리는 대체된 것으로 보고 취소 대상이 됩니다.
+    """
     
     def __init__(self):
-        """환경 변수에서 Snowflake 연결 정보를 읽어옵니다."""
-        self.account = os.getenv('SNOWFLAKE_ACCOUNT')
-        self.user = os.getenv('SNOWFLAKE_USER')
-        self.password = os.getenv('SNOWFLAKE_PASSWORD')
-        self.warehouse = os.getenv('SNOWFLAKE_WAREHOUSE', 'DEV_WH')
-        self.database = os.getenv('SNOWFLAKE_DATABASE', 'FNF')
-        self.schema = os.getenv('SNOWFLAKE_SCHEMA', 'SAP_FNF')
-        self.role = os.getenv('SNOWFLAKE_ROLE', 'PU_SQL_SAP')
-        self._connection = None
+        self._lock = threading.Lock()
+        self._running = {}
+        self._cancelled = set()
+        self._current_runs = {}
+    
+    def begin_run(self, session_id: str, run_id: str) -> List[str]:
+        """세션의 새 실행을 기록하고, 이전 실행이 소유한 실행 중 쿼리 ID를 반환합니다."""
+        with self._lock:
+            self._current_runs[session_id] = run_id
+            return [
+                query_id for query_id, entry in self._running.items()
+                if entry["session_id"] == session_id and entry["run_id"] != run_id
+            ]
+    
+    def current_run(self, session_id: str) -> Optional[str]:
+        """세션의 현재 실행 ID (기록된 실행이 없으면 None)"""
+        with self._lock:
+            return self._current_runs.get(session_id)
+    
+    def register(self, query_id: str, owner: Optional[tuple], query: str) -> bool:
+        """실행 중 쿼리를 등록합니다. 소유 실행이 이미 대체되었으면 False를 반환합니다."""
+        session_id, run_id = owner or (None, None)
+        with self._lock:
+            self._running[query_id] = {
+                "query_id": query_id,
+                "session_id": session_id,
+                "run_id": run_id,
+                "query": normalize_sql(query)[:200],
+                "started_at": pd.Timestamp.now(),
+            }
+            return session_id is None or self._current_runs.get(session_id, run_id) == run_id
+    
+    def unregister(self, query_id: str):
+        with self._lock:
+            self._running.pop(query_id, None)
+            self._cancelled.discard(query_id)
+    
+    def mark_cancelled(self, query_id: str) -> bool:
+        """취소 표시를 합니다. 실행 중인 쿼리였으면 True."""
+        with self._lock:
+            if query_id not in self._running:
+                return False
+            self._cancelled.add(query_id)
+            return True
+    
+    def cancel_failed(self, query_id: str, message: str):
+        """웨어하우스 취소 요청이 실패한 쿼리의 취소 표시를 되돌리고 오류를 기록합니다.
+        
+        쿼리는 계속 실행 중인 것으로 추적되어, 실행 쪽이 상태 확인을 이어가고 다시 취소할 수 있습니다.
+        """
+        with self._lock:
+            self._cancelled.discard(query_id)
+            entry = self._running.get(query_id)
+            if entry is not None:
+                entry["cancel_error"] = message
+    
+    def is_cancelled(self, query_id: str) -> bool:
+        with self._lock:
+            return query_id in self._cancelled
+    
+    def running(self, session_id: Optional[str] = None) -> List[Dict]:
+        """실행 중 쿼리 목록 (session_id를 주면 해당 세션만)"""
+        with self._lock:
+            return [
+                dict(entry) for entry in self._running.values()
+                if session_id is None or entry["session_id"] == session_id
+            ]
+
+
+@contextmanager
+def query_label(label: str):
+    """블록 안에서 실행되는 쿼리의 성능 기록에 label을 붙이는 컨텍스트 매니저
+    
+    사용 예:
+        with query_label("load_income_statement"):
+            connector.execute_query(...)
+    """
+    token = QUERY_LABEL.set(label)
+    try:
+        yield
+    finally:
+        QUERY_LABEL.reset(token)
+
+
+class QueryMetrics:
+    """쿼리별 실행 기록을 최근 capacity건만 보관하는 링 버퍼
+    
+    기록 하나는 쿼리 ID, 라벨, 캐시 적중 여부(memory/disk/coalesced/miss), 실행/수신/DataFrame 변환
+    시간(ms), 행 수, 바이트 수를 담습니다. log_path를 주면 기록마다 JSONL로 이어 씁니다.
+    """
+    
+    def __init__(self, capacity: int = 1000, log_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=capacity)
+        self.log_path = log_path
+    
+    def record(self, entry: Dict):
+        """기록 하나를 추가합니다 (가장 오래된 기록은 밀려남)."""
+        with self._lock:
+            self._records.append(entry)
+            if self.log_path:
+                try:
+                    with open(self.log_path, 'a', encoding='utf-8') as log_file:
+                        log_file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                except OSError:
+                    # 기록 파일 문제로 쿼리가 실패하지 않도록 무시
+                    pass
+    
+    def records(self) -> List[Dict]:
+        """보관 중인 기록 (오래된 순)"""
+        with self._lock:
+            return [dict(entry) for entry in self._records]
+    
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+def summarize_query_metrics(records: List[Dict]) -> pd.DataFrame:
+    """쿼리 기록을 라벨별로 묶어 건수, 캐시 적중, 병합된 호출, 소요 시간 p50/p95/최대(ms)를 계산합니다."""
+    columns = [
+        "label", "queries", "cache_hits", "coalesced", "errors", "p50_ms", "p95_ms", "max_ms", "rows", "mb", "saved_mb",
+    ]
+    if not records:
+        return pd.DataFrame(columns=columns)
+    
+    df = pd.DataFrame(records)
+    df["label"] = df["label"].fillna("(기타)")
+    grouped = df.groupby("label")
+    summary = pd.DataFrame({
+        "queries": grouped.size(),
+        "cache_hits": grouped["cache"].apply(lambda cache: int(cache.isin(["memory", "disk"]).sum())),
+        "coalesced": grouped["cache"].apply(lambda cache: int((cache == "coalesced").sum())),
+        "errors": grouped["error"].count() if "error" in df else 0,
+        "p50_ms": grouped["total_ms"].quantile(0.5),
+        "p95_ms": grouped["total_ms"].quantile(0.95),
+        "max_ms": grouped["total_ms"].max(),
+        "rows": grouped["rows"].sum(),
+        "mb": grouped["bytes"].sum() / 1024 / 1024,
+        "saved_mb": (
+            (df["memory_before"] - df["memory_after"]).groupby(df["label"]).sum() / 1024 / 1024
+            if "memory_before" in df else 0.0
+        ),
+    }).reset_index()
+    return summary.sort_values("p95_ms", ascending=False)[columns].round(1)
+
+
+# SQL 정규화: 문자열 리터럴/따옴표 식별자는 보존하고 주석과 공백만 정리
+_SQL_TOKEN_PATTERN = re.compile(
+    r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")"   # 1: 문자열 리터럴 또는 따옴표 식별자
+    r"|((?:\s|--[^\n]*|/\*.*?\*/)+)",          # 2: 연속된 공백/주석
+    re.DOTALL,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """캐시 키용으로 SQL을 정규화합니다 (주석 제거, 공백 축약, 끝 세미콜론 제거)."""
+    def replace(match):
+        return match.group(1) if match.group(1) is not None else " "
+    
+    return _SQL_TOKEN_PATTERN.sub(replace, query).strip().rstrip(";").rstrip()
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나로 합치는 요청 병합기 (single-flight)
+    
+    키별로 첫 호출(leader)만 실제로 실행하고, 실행 중에 들어온 호출(waiter)은 같은 Future의
+    결과나 예외를 받습니다. leader가 취소로 끝난 경우(세션 재실행 등)에는 waiter가 직접 다시 실행합니다.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}    # key -> Future
+        self._waiters = {}  # key -> 현재 기다리는 호출 수
+        
+        # 통계
+        self._leaders = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+    
+    def run(self, key: str, fn) -> tuple:
+        """fn()을 실행하거나 실행 중인 같은 키의 결과를 기다립니다. (결과, 병합 여부)를 반환합니다."""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+                    self._leaders += 1
+                else:
+                    self._coalesced += 1
+                    self._waiters[key] = self._waiters.get(key, 0) + 1
+                    self._max_waiters = max(self._max_waiters, self._waiters[key])
+            
+            if leader:
+                try:
+                    value = fn()
+                except BaseException as e:
+                    self._finish(key)
+                    # 재실행 중단 등 Exception이 아닌 예외는 waiter에게 취소로 전달
+                    future.set_exception(
+                        e if isinstance(e, Exception) else QueryCancelledError("쿼리가 중단되었습니다")
+                    )
+                    raise
+                self._finish(key)
+                future.set_result(value)
+                return value, False
+            
+            try:
+                return future.result(), True
+            except Exception as e:
+                if not _is_cancellation(e):
+                    raise
+                # leader만 취소된 것이므로 다시 실행 (새 leader가 되거나 다른 실행에 합류)
+            finally:
+                with self._lock:
+                    self._waiters[key] -= 1
+                    if not self._waiters[key]:
+                        del self._waiters[key]
+    
+    def stats(self) -> Dict:
+        """실행(leader)/병합(waiter) 횟수와 현재 진행 중인 호출, 기다리는 호출 수를 반환합니다."""
+        with self._lock:
+            return {
+                "leaders": self._leaders,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+                "waiting": sum(self._waiters.values()),
+                "max_waiters": self._max_waiters,
+            }
+    
+    def _finish(self, key: str):
+        # 결과를 알리기 전에 빼 두어, 취소된 waiter가 다시 시도할 때 끝난 Future에 합류하지 않게 함
+        with self._lock:
+            self._calls.pop(key, None)
+
+
+def _is_cancellation(error: BaseException) -> bool:
+    """예외(또는 그 원인 체인)에 QueryCancelledError가 있는지 확인합니다."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, QueryCancelledError):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class QueryResultCache:
+    """쿼리 결과 DataFrame을 보관하는 스레드 안전 TTL + LRU 캐시
+    
+    항목마다 만료 시간(TTL)을 가지며, 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용되지 않은 항목부터 제거합니다. 캐시된 DataFrame은 여러 세션이
+    공유하므로 호출 측에서 제자리(in-place) 수정하면 안 됩니다.
+    """
+    
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, default_ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (DataFrame, expires_at, nbytes)
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """캐시된 결과를 반환합니다. 없거나 만료되었으면 None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove_locked(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+    
+    def put(self, key: str, df: pd.DataFrame, ttl: Optional[float] = None):
+        """결과를 캐시에 저장합니다. ttl이 0 이하이거나 max_bytes보다 크면 저장하지 않습니다."""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (df, time.monotonic() + ttl, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._evictions += 1
+    
+    def invalidate(self, key: Optional[str] = None):
+        """특정 항목(key) 또는 전체 캐시를 무효화합니다."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._remove_locked(key)
+    
+    def stats(self) -> Dict:
+        """캐시 적중/미스 및 사용량 통계를 반환합니다."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+    
+    def _remove_locked(self, key: str):
+        """항목을 제거합니다 (락 보유 상태에서 호출)."""
+        _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+
+# FROM/JOIN 뒤의 테이블 이름 (db.schema.table 형태까지, 따옴표 식별자 포함)
+_SOURCE_TABLE_PATTERN = re.compile(
+    r'\b(?:FROM|JOIN)\s+((?:"[^"]+"|[^\s,;()."]+)(?:\.(?:"[^"]+"|[^\s,;()."]+)){0,2})',
+    re.IGNORECASE,
+)
+_CTE_NAME_PATTERN = re.compile(r'(?:\bWITH|,)\s*("[^"]+"|\w+)\s+AS\s*\(', re.IGNORECASE)
+
+
+def _normalize_identifier(identifier: str) -> str:
+    """따옴표 식별자는 그대로, 그 외는 Snowflake 규칙대로 대문자로 변환합니다."""
+    if identifier.startswith('"') and identifier.endswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    return identifier.upper()
+
+
+def extract_source_tables(query: str, database: str, schema: str) -> List[tuple]:
+    """쿼리가 읽는 테이블을 (database, schema, table) 목록으로 추출합니다.
+    
+    INFORMATION_SCHEMA와 CTE 이름은 제외합니다. 문자열 리터럴 안의 FROM 등
+    SQL을 완전히 파싱하지는 않으므로 캐시 재검증 용도로만 사용합니다.
+    """
+    normalized = normalize_sql(query)
+    cte_names = {_normalize_identifier(name) for name in _CTE_NAME_PATTERN.findall(normalized)}
+    
+    tables = []
+    for reference in _SOURCE_TABLE_PATTERN.findall(normalized):
+        parts = [_normalize_identifier(part) for part in re.findall(r'"(?:[^"]|"")+"|[^.]+', reference)]
+        if len(parts) == 1 and parts[0] in cte_names:
+            continue
+        if len(parts) > 3:
+            continue
+        db, sch, table = [database.upper(), schema.upper()][:3 - len(parts)] + parts
+        if sch == "INFORMATION_SCHEMA":
+            continue
+        if (db, sch, table) not in tables:
+            tables.append((db, sch, table))
+    return tables
+
+
+class ParquetDiskCache:
+    """쿼리 결과를 압축 Parquet 파일로 보관하는 디스크 캐시 (프로세스 재시작 후에도 유지)
+    
+    manifest.json에 항목별 조회 시각과 원본 테이블의 LAST_ALTERED를 기록합니다.
+    원본 테이블이 모두 확인되는 항목은 LAST_ALTERED가 그대로인 동안 max_age까지 유효하고,
+    원본 테이블을 확인할 수 없는 항목(뷰, 상수 쿼리 등)은 저장 시 지정한 TTL 동안만 유효합니다.
+    """
+    
+    MANIFEST_FILE = "manifest.json"
+    
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 * 1024 * 1024,
+                 max_age: float = 24 * 3600):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+    
+    def lookup(self, key: str) -> Optional[Dict]:
+        """기한이 남은 항목의 manifest 정보를 반환합니다 (LAST_ALTERED 확인 전)."""
+        with self._lock:
+            entry = self._manifest.get(key)
+        if entry is None:
+            return None
+        
+        age = time.time() - entry["fetched_at"]
+        limit = self.max_age if entry["tables"] else entry["ttl"]
+        if age >= limit or not (self.directory / entry["file"]).exists():
+            self.invalidate(key)
+            return None
+        return entry
+    
+    def load(self, key: str, entry: Dict, current_versions: Dict[str, str]) -> Optional[pd.DataFrame]:
+        """원본 테이블 버전이 기록과 같으면 Parquet 파일을 읽어 반환합니다."""
+        if any(current_versions.get(table) != version for table, version in entry["tables"].items()):
+            with self._lock:
+                self._stale += 1
+                self._misses += 1
+            self.invalidate(key)
+            return None
+        
+        try:
+            df = pd.read_parquet(self.directory / entry["file"])
+        except Exception:
+            self.invalidate(key)
+            with self._lock:
+                self._misses += 1
+            return None
+        
+        with self._lock:
+            self._hits += 1
+        return df
+    
+    def record_miss(self):
+        """디스크 캐시에 항목이 없었던 조회를 기록합니다."""
+        with self._lock:
+            self._misses += 1
+    
+    def put(self, key: str, df: pd.DataFrame, table_versions: Dict[str, str], ttl: float):
+        """결과를 zstd 압축 Parquet으로 저장하고 manifest에 기록합니다."""
+        file_name = f"{key}.parquet"
+        tmp_path = self.directory / f"{file_name}.tmp"
+        try:
+            df.to_parquet(tmp_path, compression="zstd", index=False)
+            os.replace(tmp_path, self.directory / file_name)
+        except Exception:
+            # 직렬화할 수 없는 결과는 디스크에 저장하지 않음
+            tmp_path.unlink(missing_ok=True)
+            return
+        
+        with self._lock:
+            self._manifest[key] = {
+                "file": file_name,
+                "fetched_at": time.time(),
+                "ttl": ttl,
+                "tables": table_versions,
+                "rows": len(df),
+                "bytes": (self.directory / file_name).stat().st_size,
+            }
+            evicted = self._evict_locked()
+            self._save_manifest_locked()
+        self._remove_files(evicted)
+    
+    def invalidate(self, key: Optional[str] = None):
+        """특정 항목(key) 또는 전체 디스크 캐시를 삭제합니다."""
+        with self._lock:
+            if key is None:
+                removed = list(self._manifest.values())
+                self._manifest.clear()
+            else:
+                entry = self._manifest.pop(key, None)
+                removed = [entry] if entry else []
+            if removed:
+                self._save_manifest_locked()
+        self._remove_files(removed)
+    
+    def stats(self) -> Dict:
+        """디스크 캐시 적중/미스 및 사용량 통계를 반환합니다."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "entries": len(self._manifest),
+                "bytes": sum(entry["bytes"] for entry in self._manifest.values()),
+                "max_bytes": self.max_bytes,
+            }
+    
+    def _evict_locked(self) -> List[Dict]:
+        """전체 크기가 max_bytes를 넘으면 오래된 항목부터 제거합니다 (락 보유 상태에서 호출)."""
+        total = sum(entry["bytes"] for entry in self._manifest.values())
+        evicted = []
+        for key in sorted(self._manifest, key=lambda k: self._manifest[k]["fetched_at"]):
+            if total <= self.max_bytes:
+                break
+            entry = self._manifest.pop(key)
+            total -= entry["bytes"]
+            evicted.append(entry)
+        return evicted
+    
+    def _remove_files(self, entries: List[Dict]):
+        """항목의 Parquet 파일을 삭제합니다."""
+        for entry in entries:
+            (self.directory / entry["file"]).unlink(missing_ok=True)
+    
+    def _load_manifest(self) -> Dict:
+        """manifest.json을 읽습니다. 없거나 손상되었으면 빈 manifest로 시작합니다."""
+        path = self.directory / self.MANIFEST_FILE
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest_locked(self):
+        """manifest.json을 원자적으로 저장합니다 (락 보유 상태에서 호출)."""
+        path = self.directory / self.MANIFEST_FILE
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def bind_value(value):
+    """pandas/NumPy 값을 드라이버가 바인딩할 수 있는 파이썬 기본 타입으로 변환합니다."""
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        return value.item()
+    return value
+
+
+def bind_params(params: Optional[Sequence]) -> Optional[list]:
+    """바인딩 파라미터 목록을 정리합니다 (없으면 None)."""
+    if not params:
+        return None
+    return [bind_value(value) for value in params]
+
+
+def _decimal_to_numeric(column: pd.Series) -> Optional[pd.Series]:
+    """Decimal 객체 컬럼을 int64/float64로 변환합니다. 값이 손실되면 None을 반환합니다.
+    
+    Arrow decimal128로 한 번에 변환한 뒤(정밀도/스케일 유지), 모든 값이 정수이고 int64 범위면
+    int64로, 정밀도가 FLOAT64_SAFE_DIGITS 이하면 float64로 바꿉니다.
+    NULL이 있는 정수 컬럼은 2^53 미만일 때만 float64(NaN)로 바꿉니다.
+    """
+    try:
+        values = pa.array(column, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Decimal과 다른 타입이 섞인 컬럼
+        return None
+    if not pa.types.is_decimal(values.type):
+        return None
+    
+    try:
+        integers = values.cast(pa.int64())  # 소수부가 있거나 범위를 넘으면 ArrowInvalid
+    except pa.ArrowInvalid:
+        integers = None
+    if integers is not None:
+        if integers.null_count == 0:
+            return pd.Series(integers.to_numpy(), index=column.index, name=column.name)
+        limit = 2 ** 53
+        extremes = pc.min_max(integers)
+        if -limit < extremes["min"].as_py() and extremes["max"].as_py() < limit:
+            return pd.Series(integers.to_pandas(), index=column.index, name=column.name).astype("float64")
+        return None
+    
+    if values.type.precision <= FLOAT64_SAFE_DIGITS:
+        return pd.Series(values.cast(pa.float64()).to_pandas(), index=column.index, name=column.name)
+    return None
+
+
+def _is_low_cardinality(column: pd.Series) -> bool:
+    """category로 바꿀 만한 문자열 컬럼인지 확인합니다 (고유값 수 기준)."""
+    unique = column.nunique(dropna=True)
+    return unique <= CATEGORY_MAX_UNIQUE and unique <= len(column) * CATEGORY_MAX_RATIO
+
+
+def normalize_dtypes(df: pd.DataFrame) -> tuple:
+    """조회 결과의 dtype을 작게 정리하고 (DataFrame, 보고서)를 반환합니다.
+    
+    - Decimal 객체 컬럼(Snowflake NUMBER 등)은 값 손실이 없을 때만 int64(원 단위)/float64로 변환
+    - CATEGORY_MIN_ROWS행 이상 결과의 반복되는 문자열 컬럼(항목, 분류 등)은 category로 변환
+    보고서는 변환 전후 메모리(bytes, deep)와 컬럼별 변경 내용({컬럼: "object→int64"} 형식)입니다.
+    """
+    report = {"memory_before": int(df.memory_usage(index=True, deep=True).sum()), "columns": {}}
+    if df.empty:
+        report["memory_after"] = report["memory_before"]
+        return df, report
+    
+    converted = {}
+    for name, dtype in df.dtypes.items():
+        column = df[name]
+        if isinstance(dtype, pd.StringDtype):
+            is_text = True
+        elif dtype == object:
+            sample = column.dropna()
+            if sample.empty:
+                continue
+            first = sample.iloc[0]
+            if isinstance(first, decimal.Decimal):
+                if HAS_PYARROW:
+                    numeric = _decimal_to_numeric(column)
+                    if numeric is not None:
+                        converted[name] = numeric
+                continue
+            is_text = isinstance(first, str)
+        else:
+            continue
+        if is_text and len(df) >= CATEGORY_MIN_ROWS and _is_low_cardinality(column):
+            converted[name] = column.astype("category")
+    
+    if converted:
+        # 얕은 복사본의 컬럼만 교체 (캐시 등 원본을 참조하는 쪽은 그대로)
+        df = df.copy(deep=False)
+        for name, values in converted.items():
+            report["columns"][name] = f"{df[name].dtype}→{values.dtype}"
+            df[name] = values
+    report["memory_after"] = int(df.memory_usage(index=True, deep=True).sum())
+    return df, report
+
+
+class QueryFilters:
+    """대시보드 조회 조건 (기간, 연도, 브랜드, 부서)
+    
+    where()는 데이터셋별 컬럼 매핑에 맞춰 바인딩 WHERE 절을 만듭니다. 조건은 컬럼에 함수를
+    씌우지 않은 범위/IN 비교로만 만들어 기준일자/연도 클러스터링 기준으로 micro-partition
+    pruning이 되도록 합니다. 값은 바인딩되므로 조회 조건은 결과 캐시 키에도 포함됩니다.
+    """
+    
+    def __init__(self, start_date=None, end_date=None, years: Sequence[int] = (),
+                 brands: Sequence[str] = (), departments: Sequence[str] = ()):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.years = tuple(sorted(int(year) for year in years))
+        self.brands = tuple(sorted(brands))
+        self.departments = tuple(sorted(departments))
+    
+    def replace(self, **changes) -> "QueryFilters":
+        """일부 조건만 바꾼 새 QueryFilters를 반환합니다."""
+        values = {
+            "start_date": self.start_date, "end_date": self.end_date, "years": self.years,
+            "brands": self.brands, "departments": self.departments,
+        }
+        values.update(changes)
+        return QueryFilters(**values)
+    
+    def where(self, date_column: Optional[str] = None, year_column: Optional[str] = None,
+              brand_column: Optional[str] = None, department_column: Optional[str] = None) -> tuple:
+        """(WHERE 절, 바인딩 파라미터)를 반환합니다. 컬럼이 없는 조건은 건너뛰며, 조건이 없으면 "1=1"."""
+        clauses, params = [], []
+        if date_column and self.start_date is not None:
+            clauses.append(f'"{date_column}" >= ?')
+            params.append(self.start_date)
+        if date_column and self.end_date is not None:
+            # 종료일 당일 전체를 포함하도록 다음 날 미만으로 비교
+            clauses.append(f'"{date_column}" < ?')
+            params.append(pd.Timestamp(self.end_date) + pd.Timedelta(days=1))
+        for column, values in ((year_column, self.years), (brand_column, self.brands),
+                               (department_column, self.departments)):
+            if column and values:
+                clauses.append(f'"{column}" IN ({", ".join("?" for _ in values)})')
+                params.extend(values)
+        return " AND ".join(clauses) or "1=1", params
+    
+    def restrict(self, date_column: Optional[str] = None, year_column: Optional[str] = None,
+                 brand_column: Optional[str] = None, department_column: Optional[str] = None) -> "QueryFilters":
+        """컬럼이 매핑된 조건만 남긴 QueryFilters (where()가 건너뛰는 조건은 비움)"""
+        return QueryFilters(
+            start_date=self.start_date if date_column else None,
+            end_date=self.end_date if date_column else None,
+            years=self.years if year_column else (),
+            brands=self.brands if brand_column else (),
+            departments=self.departments if department_column else (),
+        )
+    
+    def token(self, **columns) -> str:
+        """조회 조건을 나타내는 짧은 문자열 (증분 데이터셋 이름 등에 사용)
+        
+        where()와 같은 컬럼 매핑을 넘기면 매핑되지 않아 결과에 영향이 없는 조건은 제외합니다.
+        """
+        filters = self.restrict(**columns) if columns else self
+        parts = [str(filters.start_date), str(filters.end_date), filters.years, filters.brands, filters.departments]
+        return hashlib.sha256(json.dumps(parts, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, QueryFilters) and self.token() == other.token()
+    
+    def __hash__(self) -> int:
+        return hash(self.token())
+
+
+def upsert_frame(base: Optional[pd.DataFrame], delta: pd.DataFrame, key_columns: List[str]) -> pd.DataFrame:
+    """key_columns 기준으로 delta 행을 base에 덮어쓰거나 추가합니다."""
+    if base is None or base.empty:
+        return delta.reset_index(drop=True)
+    if delta.empty:
+        return base
+    
+    delta_keys = pd.MultiIndex.from_frame(delta[key_columns])
+    keep = ~pd.MultiIndex.from_frame(base[key_columns]).isin(delta_keys)
+    return pd.concat([base[keep], delta], ignore_index=True)
+
+
+class IncrementalDataset:
+    """워터마크 기반 증분 조회 상태
+    
+    query에는 {watermark_filter} 자리가 있어야 하며, 첫 조회에서는 1=1,
+    이후에는 "watermark_column >= ?"(마지막 워터마크 바인딩)로 바뀝니다.
+    params는 query의 다른 ? 자리 값이며, {watermark_filter}는 그 자리들보다 뒤에 있어야 합니다. 경계 값과 같은 행도 다시
+    받아오므로(당일 집계가 계속 바뀌는 경우 등) key_columns 기준 upsert로 병합합니다.
+    retention이 주어지면 워터마크 컬럼이 (현재 - retention)보다 오래된 행은 버립니다.
+    """
+    
+    def __init__(self, name: str, query: str, watermark_column: str, key_columns: List[str],
+                 retention: Optional[pd.DateOffset] = None, min_interval: float = 0.0,
+                 params: Optional[Sequence] = None):
+        if "{watermark_filter}" not in query:
+            raise ValueError(f"증분 쿼리 '{name}'에 {{watermark_filter}} 자리가 없습니다.")
+        self.name = name
+        self.query = query
+        self.params = list(params or [])
+        self.watermark_column = watermark_column
+        self.key_columns = key_columns
+        self.retention = retention
+        self.min_interval = min_interval
+        self.frame: Optional[pd.DataFrame] = None
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self.last_delta_rows = 0
+        self.lock = threading.Lock()
+    
+    def build_query(self) -> str:
+        """현재 워터마크 이후 행만 조회하는 SQL을 만듭니다 (값은 build_params()로 바인딩)."""
+        if self.watermark is None:
+            watermark_filter = "1=1"
+        else:
+            watermark_filter = f'"{self.watermark_column}" >= ?'
+        return self.query.replace("{watermark_filter}", watermark_filter)
+    
+    def build_params(self) -> Optional[list]:
+        """build_query()의 바인딩 파라미터"""
+        watermark = [] if self.watermark is None else [bind_value(self.watermark)]
+        return self.params + watermark or None
+    
+    def merge(self, delta: pd.DataFrame):
+        """조회된 증분을 병합하고 워터마크를 갱신합니다."""
+        frame = upsert_frame(self.frame, delta, self.key_columns)
+        if self.retention is not None and not frame.empty:
+            cutoff = pd.Timestamp.now() - self.retention
+            watermarks = pd.to_datetime(frame[self.watermark_column])
+            if watermarks.dt.tz is not None:
+                cutoff = cutoff.tz_localize(watermarks.dt.tz)
+            frame = frame[watermarks >= cutoff].reset_index(drop=True)
+        
+        self.frame = frame.sort_values(self.key_columns, ignore_index=True)
+        if not frame.empty:
+            self.watermark = frame[self.watermark_column].max()
+        self.last_delta_rows = len(delta)
+        self.refreshed_at = time.monotonic()
+
+
+class SchemaCatalog:
+    """한 스키마의 테이블/컬럼 메타데이터 스냅샷
+    
+    INFORMATION_SCHEMA.TABLES와 COLUMNS를 조인한 한 번의 조회 결과로 만들어지며,
+    version(테이블 수, 최대 LAST_ALTERED)이 그대로인 동안 재사용됩니다.
+    """
+    
+    def __init__(self, rows: pd.DataFrame, version: tuple):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.tables = []
+        self._columns = {}
+        
+        if rows.empty:
+            return
+        table_rows = rows.drop_duplicates("TABLE_NAME")
+        self.tables = table_rows[["TABLE_NAME", "TABLE_TYPE", "CREATED", "LAST_ALTERED"]].to_dict('records')
+        columns = rows.dropna(subset=["COLUMN_NAME"])
+        for table_name, group in columns.groupby("TABLE_NAME", sort=False):
+            self._columns[table_name] = group[CATALOG_COLUMNS].reset_index(drop=True)
+    
+    def columns(self, table_name: str) -> pd.DataFrame:
+        """테이블의 컬럼 정보 (없는 테이블이면 빈 DataFrame)"""
+        columns = self._columns.get(table_name)
+        return columns if columns is not None else pd.DataFrame(columns=CATALOG_COLUMNS)
+    
+    def __len__(self) -> int:
+        return len(self.tables)
+
+
+class QueryResult:
+    """서버에 보관된 쿼리 결과 (전체 행은 받아오지 않고 쿼리 ID와 메타데이터만 보관)"""
+    
+    def __init__(self, query_id: str, columns: List[str], row_count: int, query: str):
+        self.query_id = query_id
+        self.columns = columns
+        self.row_count = row_count
+        self.query = query
+
+
+class ResultPager:
+    """QueryResult를 페이지 단위로 조회하는 뷰어 상태
+    
+    요청한 페이지만 서버에서 받아오고(fetch_result_page), 앞뒤 prefetch개 페이지는 백그라운드에서
+    미리 받아둡니다. 받아둔 페이지는 max_rows/max_bytes 예산을 넘지 않도록 오래 안 본 순서로 버립니다.
+    페이지는 pyarrow가 있으면 pyarrow.Table(st.dataframe에 pandas 변환 없이 전달), 없으면 DataFrame입니다.
+    """
+    
+    def __init__(self, backend: "QueryBackend", result: QueryResult, page_size: int = 500,
+                 max_rows: int = 20000, max_bytes: int = 64 * 1024 * 1024, prefetch: int = 1):
+        self.backend = backend
+        self.result = result
+        self.page_size = max(1, min(page_size, max_rows))
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self._loading = {}
+        self._bytes = 0
+        self._fetches = 0
+        self._hits = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-prefetch")
+    
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.result.row_count // self.page_size))
+    
+    def page(self, number: int):
+        """number번째 페이지(0부터)를 반환하고 이웃 페이지를 미리 받아옵니다."""
+        number = min(max(number, 0), self.page_count - 1)
+        with self._lock:
+            df = self._pages.get(number)
+            if df is not None:
+                self._pages.move_to_end(number)
+                self._hits += 1
+            future = self._loading.get(number)
+        
+        if df is None:
+            df = future.result() if future is not None else self._fetch(number)
+        for neighbor in range(number - self.prefetch, number + self.prefetch + 1):
+            if neighbor != number and 0 <= neighbor < self.page_count:
+                self._schedule(neighbor)
+        with self._lock:
+            self._evict_locked(keep=number)
+        return df
+    
+    def stats(self) -> Dict:
+        """받아둔 페이지 수/행/바이트와 서버 조회 횟수를 반환합니다."""
+        with self._lock:
+            return {
+                "cached_pages": len(self._pages),
+                "cached_rows": sum(len(df) for df in self._pages.values()),
+                "bytes": self._bytes,
+                "fetches": self._fetches,
+                "hits": self._hits,
+            }
+    
+    def close(self):
+        """백그라운드 조회를 멈추고 받아둔 페이지와 서버 결과를 정리합니다."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._pages.clear()
+            self._bytes = 0
+        self.backend.close_result(self.result)
+    
+    def _schedule(self, number: int):
+        with self._lock:
+            if number in self._pages or number in self._loading:
+                return
+            try:
+                # 요청한 쪽의 쿼리 소유자/워크로드 등급을 그대로 적용
+                self._loading[number] = self._executor.submit(contextvars.copy_context().run, self._fetch, number)
+            except RuntimeError:
+                # close() 이후
+                pass
+    
+    def _fetch(self, number: int):
+        try:
+            df = self.backend.fetch_result_page(self.result, number * self.page_size, self.page_size)
+        finally:
+            with self._lock:
+                self._loading.pop(number, None)
+        with self._lock:
+            self._fetches += 1
+            if number not in self._pages:
+                self._pages[number] = df
+                self._bytes += _page_bytes(df)
+        return df
+    
+    def _evict_locked(self, keep: int):
+        rows = sum(len(df) for df in self._pages.values())
+        while len(self._pages) > 1 and (rows > self.max_rows or self._bytes > self.max_bytes):
+            number = next(iter(self._pages))
+            if number == keep:
+                self._pages.move_to_end(number)
+                continue
+            df = self._pages.pop(number)
+            rows -= len(df)
+            self._bytes -= _page_bytes(df)
+
+
+def _page_bytes(page) -> int:
+    """결과 페이지(pyarrow.Table 또는 DataFrame)의 메모리 크기"""
+    if HAS_PYARROW and isinstance(page, pa.Table):
+        return page.nbytes
+    return int(page.memory_usage(deep=True).sum())
+
+
+class QueryBackend:
+    """쿼리 백엔드 공통 기능 (연결 풀, 결과 캐시, 증분 조회, 배치 순회)
+    
+    하위 클래스는 connect()에서 DB-API 연결을 반환하며, 그 커서는 Snowflake 커서와 같은
+    메서드(execute, description, fetch_pandas_all, fetch_arrow_all, fetch_pandas_batches,
+    fetch_arrow_batches, fetchall, fetchmany, fetchone, close)를 제공해야 합니다.
+    account/role/warehouse/database/schema 속성은 결과 캐시 키에 사용됩니다.
+    """
+    
+    def __init__(self, disk_cache_dir: Optional[str] = None):
+        """연결 풀과 결과 캐시를 준비합니다. disk_cache_dir가 없으면 디스크 캐시를 쓰지 않습니다."""
+        self._pool = ConnectionPool(
+            self.connect,
+            min_size=int(os.getenv('SNOWFLAKE_POOL_MIN_SIZE', '1')),
+            max_size=int(os.getenv('SNOWFLAKE_POOL_MAX_SIZE', '10')),
+            checkout_timeout=float(os.getenv('SNOWFLAKE_POOL_TIMEOUT', '30')),
+            idle_timeout=float(os.getenv('SNOWFLAKE_POOL_IDLE_TIMEOUT', '600')),
+            max_lifetime=float(os.getenv('SNOWFLAKE_POOL_MAX_LIFETIME', '3600')),
+        )
+        # SYSTEM$CANCEL_QUERY 전용 연결 (쿼리 풀이 가득 찬 상태에서도 취소를 바로 보낼 수 있도록 따로 둠)
+        self._cancel_pool = ConnectionPool(
+            self.connect,
+            min_size=1,
+            max_size=int(os.getenv('SNOWFLAKE_CANCEL_POOL_SIZE', '1')),
+            checkout_timeout=CANCEL_TIMEOUT,
+        )
+        self._scheduler = QueryScheduler(
+            default_workload_classes(self._pool.max_size),
+            max_concurrency=self._pool.max_size,
+            queue_timeout=float(os.getenv('SNOWFLAKE_QUEUE_TIMEOUT', '300')),
+        )
+        self._cache = QueryResultCache(
+            max_bytes=int(os.getenv('SNOWFLAKE_CACHE_MAX_MB', '256')) * 1024 * 1024,
+            default_ttl=float(os.getenv('SNOWFLAKE_CACHE_TTL', '300')),
+        )
+        self._disk_cache = ParquetDiskCache(
+            disk_cache_dir,
+            max_bytes=int(os.getenv('SNOWFLAKE_DISK_CACHE_MAX_MB', '2048')) * 1024 * 1024,
+            max_age=float(os.getenv('SNOWFLAKE_DISK_CACHE_MAX_AGE', str(24 * 3600))),
+        ) if disk_cache_dir and HAS_PYARROW else None
+        # 증분 데이터셋 (최근에 쓴 순서, 조회 조건별로 생기므로 개수를 제한)
+        self._incremental = OrderedDict()
+        self._incremental_max = int(os.getenv('SNOWFLAKE_INCREMENTAL_MAX_DATASETS', '32'))
+        self._incremental_lock = threading.Lock()
+        self._catalogs = {}
+        self._catalog_lock = threading.Lock()
+        # 롤업 큐브 (최근에 쓴 순서, 조회 조건별로 생기므로 개수를 제한)
+        self._cubes = OrderedDict()
+        self._cube_max = int(os.getenv('SNOWFLAKE_CUBE_MAX_ENTRIES', '32'))
+        self._cube_lock = threading.Lock()
+        self._queries = QueryTracker()
+        self._in_flight = SingleFlight()
+        self._health = HealthMonitor(
+            self._pool,
+            interval=float(os.getenv('SNOWFLAKE_HEARTBEAT_INTERVAL', '60')),
+            max_backoff=float(os.getenv('SNOWFLAKE_MAX_BACKOFF', '60')),
+        )
+        self._metrics = QueryMetrics(
+            capacity=int(os.getenv('SNOWFLAKE_METRICS_SIZE', '1000')),
+            log_path=os.getenv('SNOWFLAKE_METRICS_LOG') or None,
+        )
     
     def connect(self):
-        """Snowflake에 연결합니다."""
-        # 필수 환경 변수 검증
-        if not self.account:
-            raise ConnectionError("SNOWFLAKE_ACCOUNT 환경 변수가 설정되지 않았습니다.")
-        if not self.user:
-            raise ConnectionError("SNOWFLAKE_USER 환경 변수가 설정되지 않았습니다.")
-        if not self.password:
-            raise ConnectionError("SNOWFLAKE_PASSWORD 환경 변수가 설정되지 않았습니다.")
+        """새 DB-API 연결을 엽니다 (연결 풀이 호출). 하위 클래스에서 구현합니다."""
+        raise NotImplementedError
+    
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """스케줄러 실행 슬롯을 받은 뒤 연결 풀에서 연결 하나를 빌려주는 컨텍스트 매니저
+        
+        슬롯은 현재 컨텍스트의 워크로드 등급(query_workload)과 쿼리 소유 세션 기준으로 배정됩니다.
+        
+        사용 예:
+            with connector.connection() as conn:
+                cursor = conn.cursor()
+                ...
+        """
+        with self._scheduler.slot(*self._workload()):
+            with self._pool.connection(timeout) as conn:
+                yield conn
+    
+    def _workload(self) -> tuple:
+        """현재 컨텍스트의 (워크로드 등급, 사용자, 라벨)"""
+        owner = QUERY_OWNER.get()
+        return QUERY_WORKLOAD.get(), owner[0] if owner else None, QUERY_LABEL.get()
+    
+    def pool_stats(self) -> Dict:
+        """연결 풀 사용 현황 (사용 중/유휴/대기 시간 등)을 반환합니다."""
+        return self._pool.stats()
+    
+    def scheduler_stats(self) -> Dict:
+        """워크로드 등급별 실행/대기 현황과 대기열('queue', 실행될 순서)을 반환합니다."""
+        stats = self._scheduler.stats()
+        stats["queue"] = self._scheduler.queued()
+        return stats
+    
+    def begin_run(self, session_id: str) -> str:
+        """Streamlit 실행 시작 시 호출: 새 실행 ID를 현재 컨텍스트의 쿼리 소유자로 지정하고
+        같은 세션의 이전 실행이 남긴 쿼리를 취소합니다. 새 실행 ID를 반환합니다.
+        
+        취소 요청은 백그라운드 스레드에서 보내므로 스크립트 실행을 막지 않습니다.
+        """
+        run_id = os.urandom(8).hex()
+        QUERY_OWNER.set((session_id, run_id))
+        superseded = self._queries.begin_run(session_id, run_id)
+        if superseded:
+            threading.Thread(
+                target=lambda: [self.cancel_query(query_id) for query_id in superseded],
+                name="snowflake-cancel",
+                daemon=True,
+            ).start()
+        return run_id
+    
+    def attach_run(self, session_id: str) -> str:
+        """fragment 실행 시작 시 호출: 세션의 현재 실행을 현재 컨텍스트의 쿼리 소유자로 지정합니다.
+        
+        fragment 재실행은 main()의 begin_run을 거치지 않고 빈 컨텍스트의 새 스레드에서 실행되므로,
+        소유자를 다시 지정해야 취소 버튼/재실행 대체/스케줄러의 사용자 구분이 적용됩니다.
+        begin_run과 달리 아무 쿼리도 취소하지 않으며, 기록된 실행이 없을 때만 새 실행을 시작합니다.
+        """
+        run_id = self._queries.current_run(session_id)
+        if run_id is None:
+            return self.begin_run(session_id)
+        QUERY_OWNER.set((session_id, run_id))
+        return run_id
+    
+    def running_queries(self, session_id: Optional[str] = None) -> List[Dict]:
+        """실행 중인 쿼리 목록 (쿼리 ID, 세션, 시작 시각, SQL 앞부분)을 반환합니다."""
+        return self._queries.running(session_id)
+    
+    def cancel_query(self, query_id: str) -> bool:
+        """SYSTEM$CANCEL_QUERY로 쿼리를 취소합니다. 추적 중인 쿼리에 취소 요청을 보냈으면 True.
+        
+        취소는 대기열과 쿼리 연결 풀을 거치지 않고 전용 연결로 보냅니다 (풀이 가득 차도 바로 실행).
+        요청이 실패하면 취소 표시를 되돌리고 running_queries()의 cancel_error에 오류를 남깁니다.
+        """
+        tracked = self._queries.mark_cancelled(query_id)
+        try:
+            with self._cancel_pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SELECT SYSTEM$CANCEL_QUERY(?)", [query_id])
+                finally:
+                    cursor.close()
+        except Exception as e:
+            if tracked:
+                self._queries.cancel_failed(query_id, str(e))
+            return False
+        return tracked
+    
+    def cancel_session_queries(self, session_id: str) -> int:
+        """세션이 실행 중인 쿼리를 모두 취소하고 취소 요청을 보낸 개수를 반환합니다."""
+        return sum(self.cancel_query(entry["query_id"]) for entry in self._queries.running(session_id))
+    
+    def health(self, wait: float = 0.0) -> Dict:
+        """백그라운드 하트비트가 기록한 연결 상태를 반환합니다 (조회 왕복 없음).
+        
+        감시 스레드가 아직 없으면 시작하며, wait초 동안 첫 확인 결과를 기다립니다.
+        """
+        self._health.start()
+        return self._health.status(wait)
+    
+    def cache_key(self, query: str, params: Optional[Sequence] = None) -> str:
+        """결과 캐시 키: 정규화된 SQL + 바인딩 값 + 계정/역할/웨어하우스/데이터베이스/스키마
+        
+        역할이 키에 포함되므로 한 역할의 결과가 다른 역할에 반환되지 않습니다.
+        """
+        parts = [self.account or "", self.role, self.warehouse, self.database, self.schema, normalize_sql(query)]
+        if params:
+            parts.append(json.dumps([bind_value(value) for value in params], default=str, ensure_ascii=False))
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    def invalidate_cache(self, query: Optional[str] = None, params: Optional[Sequence] = None):
+        """결과 캐시(메모리 + 디스크)를 무효화합니다. query를 주면 해당 쿼리 결과만 제거합니다."""
+        key = self.cache_key(query, params) if query is not None else None
+        self._cache.invalidate(key)
+        if self._disk_cache is not None:
+            self._disk_cache.invalidate(key)
+    
+    def cache_stats(self) -> Dict:
+        """결과 캐시 적중/미스 통계를 반환합니다 (디스크 캐시는 'disk' 항목)."""
+        stats = self._cache.stats()
+        stats["disk"] = self._disk_cache.stats() if self._disk_cache is not None else None
+        stats["coalesced"] = self._in_flight.stats()
+        return stats
+    
+    def query_metrics(self) -> List[Dict]:
+        """최근 execute_query 실행 기록 (오래된 순, 최대 SNOWFLAKE_METRICS_SIZE건)"""
+        return self._metrics.records()
+    
+    def query_metrics_summary(self) -> pd.DataFrame:
+        """라벨(로더)별 쿼리 소요 시간 p50/p95 요약"""
+        return summarize_query_metrics(self.query_metrics())
+    
+    def _normalize(self, df: pd.DataFrame, entry: Dict) -> pd.DataFrame:
+        """조회 직후 dtype을 정리하고 전후 메모리와 소요 시간을 기록에 남깁니다."""
+        started = time.perf_counter()
+        df, report = normalize_dtypes(df)
+        entry["normalize_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        entry["memory_before"] = report["memory_before"]
+        entry["memory_after"] = report["memory_after"]
+        entry["normalized_columns"] = report["columns"]
+        return df
+    
+    def _record_query(self, entry: Dict, started: float, df: Optional[pd.DataFrame] = None):
+        """execute_query 한 번의 기록을 완성해 링 버퍼에 추가합니다."""
+        entry["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if df is not None:
+            entry["rows"] = len(df)
+            entry["bytes"] = int(df.memory_usage(index=True).sum())
+        self._metrics.record(entry)
+    
+    def execute_query(self, query: str, params: Optional[Sequence] = None,
+                      fetch_mode: str = FETCH_MODE_ARROW, ttl: Optional[float] = None,
+                      persist: bool = True, timeout: Optional[float] = None) -> pd.DataFrame:
+        """SQL 쿼리를 실행하고 결과를 DataFrame으로 반환합니다.
+        
+        params는 쿼리의 ? 자리에 서버 측에서 바인딩되므로, 값만 다른 쿼리도 SQL 문이 같아
+        Snowflake 결과 캐시/실행 계획과 클라이언트 캐시 항목을 공유합니다.
+        결과는 TTL 캐시에 저장되어 같은 쿼리는 만료 전까지 웨어하우스를 다시 조회하지 않습니다.
+        ttl을 지정하지 않으면 기본 TTL(SNOWFLAKE_CACHE_TTL)을, 0이면 캐시를 사용하지 않습니다.
+        persist=True이면 디스크 캐시에도 저장하여 재시작 후에도 원본 테이블의
+        LAST_ALTERED만 확인하고 재사용합니다.
+        timeout(초, 기본 SNOWFLAKE_QUERY_TIMEOUT)을 넘기면 쿼리를 취소하고 실패로 처리합니다.
+        캐시에 없는 같은 쿼리가 다른 세션에서 이미 실행 중이면 새로 제출하지 않고 그 결과를 함께 받습니다.
+        """
+        started = time.perf_counter()
+        entry = {
+            "timestamp": pd.Timestamp.now().isoformat(),
+            "label": QUERY_LABEL.get(),
+            "warehouse": self.warehouse,
+            "query": normalize_sql(query)[:METRICS_QUERY_CHARS],
+            "query_id": None,
+            "cache": "miss",
+            "execute_ms": 0.0,
+            "fetch_ms": 0.0,
+            "convert_ms": 0.0,
+            "normalize_ms": 0.0,
+            "rows": 0,
+            "bytes": 0,
+        }
+        use_cache = ttl is None or ttl > 0
+        use_disk = use_cache and persist and self._disk_cache is not None
+        key = self.cache_key(query, params) if use_cache else None
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                entry["cache"] = "memory"
+                self._record_query(entry, started, cached)
+                return cached
+        
+        if use_disk:
+            cached = self._load_from_disk(key)
+            if cached is not None:
+                self._cache.put(key, cached, ttl)
+                entry["cache"] = "disk"
+                self._record_query(entry, started, cached)
+                return cached
+            # 조회 전에 원본 테이블 버전을 기록 (조회 중 변경되면 다음 재검증에서 갱신됨)
+            table_versions = self._source_table_versions(query)
+        
+        def fetch():
+            df = self._run_query(query, params, fetch_mode, timeout, entry)
+            if NORMALIZE_DTYPES:
+                df = self._normalize(df, entry)
+            # 실행 중 표시가 사라지기 전에 캐시에 저장 (그 사이에 온 호출이 실행과 캐시를 모두 놓치지 않게 함)
+            if use_cache:
+                self._cache.put(key, df, ttl)
+            if use_disk:
+                self._disk_cache.put(key, df, table_versions, self._cache.default_ttl if ttl is None else ttl)
+            return df
+        
+        # 같은 쿼리(같은 캐시 키 = SQL, 파라미터, 계정/역할 등)가 이미 실행 중이면 그 결과를 기다림
+        try:
+            df, coalesced = self._in_flight.run(key or self.cache_key(query, params), fetch)
+        except Exception as e:
+            entry["error"] = str(e)
+            self._record_query(entry, started)
+            raise
+        if coalesced:
+            entry["cache"] = "coalesced"
+        self._record_query(entry, started, df)
+        return df
+    
+    def refresh_incremental(self, name: str, query: str, watermark_column: str, key_columns: List[str],
+                            retention: Optional[pd.DateOffset] = None,
+                            min_interval: float = 0.0, params: Optional[Sequence] = None) -> pd.DataFrame:
+        """워터마크 이후 변경분만 조회해 보관 중인 DataFrame에 병합하고 반환합니다.
+        
+        데이터셋 상태(DataFrame, 워터마크)는 name별로 커넥터에 보관되며, 마지막 갱신 후
+        min_interval초가 지나지 않았으면 조회 없이 보관 중인 결과를 반환합니다.
+        보관하는 데이터셋은 SNOWFLAKE_INCREMENTAL_MAX_DATASETS개까지이며, 넘으면 가장 오래 쓰지 않은
+        데이터셋부터 버립니다 (다시 요청되면 처음부터 조회).
+        쿼리 형식은 IncrementalDataset을 참고하세요.
+        """
+        with self._incremental_lock:
+            dataset = self._incremental.get(name)
+            if dataset is None or dataset.query != query or dataset.params != list(params or []):
+                dataset = IncrementalDataset(name, query, watermark_column, key_columns, retention, min_interval, params)
+                self._incremental[name] = dataset
+            self._incremental.move_to_end(name)
+            while len(self._incremental) > self._incremental_max:
+                self._incremental.popitem(last=False)
+        
+        with dataset.lock:
+            fresh = time.monotonic() - dataset.refreshed_at < dataset.min_interval
+            if dataset.frame is None or not fresh:
+                # 증분 쿼리는 워터마크마다 SQL이 달라 결과 캐시를 거치지 않음
+                delta = self.execute_query(dataset.build_query(), dataset.build_params(), ttl=0)
+                dataset.merge(delta)
+            return dataset.frame
+    
+    def rollup_cube(self, name: str, query: str, dimensions: List[str], measures: List[str],
+                    params: Optional[Sequence] = None, ttl: Optional[float] = None) -> RollupCube:
+        """팩트 쿼리 결과로 만든 롤업 큐브를 반환합니다 (드릴다운/롤업/Top-N은 메모리에서 처리).
+        
+        팩트는 execute_query 캐시를 그대로 쓰며, 캐시가 같은 결과 객체를 돌려주는 동안(TTL 안)은
+        이미 만든 큐브를 재사용하고 새로 조회된 경우에만 다시 만듭니다.
+        큐브는 SNOWFLAKE_CUBE_MAX_ENTRIES개까지 보관하며, 넘으면 가장 오래 쓰지 않은 큐브부터 버립니다.
+        """
+        fact = self.execute_query(query, params, ttl=ttl)
+        with self._cube_lock:
+            entry = self._cubes.get(name)
+            if entry is not None and entry[0] is fact:
+                self._cubes.move_to_end(name)
+                return entry[1]
+        
+        cube = RollupCube(fact, dimensions, measures)
+        with self._cube_lock:
+            self._cubes[name] = (fact, cube)
+            self._cubes.move_to_end(name)
+            while len(self._cubes) > self._cube_max:
+                self._cubes.popitem(last=False)
+        return cube
+    
+    def incremental_stats(self) -> Dict:
+        """증분 데이터셋별 행 수, 워터마크, 마지막 증분 행 수를 반환합니다."""
+        with self._incremental_lock:
+            datasets = list(self._incremental.values())
+        return {
+            dataset.name: {
+                "rows": 0 if dataset.frame is None else len(dataset.frame),
+                "watermark": None if dataset.watermark is None else str(dataset.watermark),
+                "last_delta_rows": dataset.last_delta_rows,
+            }
+            for dataset in datasets
+        }
+    
+    def _load_from_disk(self, key: str) -> Optional[pd.DataFrame]:
+        """디스크 캐시 항목을 LAST_ALTERED로 재검증한 뒤 읽어옵니다."""
+        entry = self._disk_cache.lookup(key)
+        if entry is None:
+            self._disk_cache.record_miss()
+            return None
+        
+        current_versions = {}
+        if entry["tables"]:
+            try:
+                current_versions = self._table_versions([tuple(name.split(".", 2)) for name in entry["tables"]])
+            except Exception:
+                # 버전을 확인할 수 없으면 캐시를 신뢰하지 않음
+                self._disk_cache.record_miss()
+                return None
+        return self._disk_cache.load(key, entry, current_versions)
+    
+    def _source_table_versions(self, query: str) -> Dict[str, str]:
+        """쿼리 원본 테이블의 현재 LAST_ALTERED를 반환합니다.
+        
+        원본 테이블이 없거나, 뷰가 포함되었거나, 조회에 실패하면 빈 dict를 반환하며
+        이 경우 디스크 캐시 항목은 TTL 동안만 유효합니다.
+        """
+        tables = extract_source_tables(query, self.database, self.schema)
+        if not tables:
+            return {}
+        try:
+            versions = self._table_versions(tables)
+        except Exception:
+            return {}
+        names = [".".join(table) for table in tables]
+        if not all(name in versions for name in names):
+            return {}
+        return {name: versions[name] for name in names}
+    
+    def _table_versions(self, tables: List[tuple]) -> Dict[str, str]:
+        """'DB.SCHEMA.TABLE' → LAST_ALTERED(ISO 문자열) 매핑을 반환합니다 (뷰 제외).
+        
+        스키마별로 get_tables()와 같은 INFORMATION_SCHEMA.TABLES 조회 한 번으로 확인하며,
+        조회 결과는 TABLE_VERSION_TTL 동안 메모리 캐시에 유지됩니다.
+        """
+        versions = {}
+        for database, schema in {(db, sch) for db, sch, _ in tables}:
+            for table in self.get_tables(database, schema):
+                if table['TABLE_TYPE'] == 'VIEW' or table['LAST_ALTERED'] is None:
+                    continue
+                name = f"{database}.{schema}.{table['TABLE_NAME']}"
+                versions[name] = pd.Timestamp(table['LAST_ALTERED']).isoformat()
+        return versions
+    
+    def execute_statement(self, name: str, params: Optional[Sequence] = None,
+                          identifiers: Optional[Dict[str, str]] = None, **kwargs) -> pd.DataFrame:
+        """등록된 SQL 문 템플릿을 실행합니다 (kwargs는 execute_query로 전달)."""
+        return self.execute_query(statement(name, **(identifiers or {})), params, **kwargs)
+    
+    def _execute(self, conn, cursor, query: str, params: Optional[Sequence] = None,
+                 timeout: Optional[float] = None, on_wait=None):
+        """쿼리를 비동기로 제출하고 끝날 때까지 기다립니다 (결과는 cursor에서 읽음).
+        
+        실행 중에는 쿼리 ID를 추적하여 다른 실행이 취소할 수 있게 하고, timeout초(기본
+        DEFAULT_QUERY_TIMEOUT)를 넘기면 취소합니다. on_wait(경과 초)는 대기 중 주기적으로
+        호출되며, 여기서 예외가 나면(Streamlit 재실행 등) 쿼리를 취소한 뒤 다시 던집니다.
+        비동기 실행을 지원하지 않는 커서는 timeout만 적용해 동기로 실행합니다.
+        """
+        timeout = DEFAULT_QUERY_TIMEOUT if timeout is None else timeout
+        if not hasattr(cursor, 'execute_async'):
+            cursor.execute(query, bind_params(params), timeout=int(timeout) or None)
+            return
+        
+        cursor.execute_async(query, bind_params(params))
+        query_id = cursor.sfqid
+        if not self._queries.register(query_id, QUERY_OWNER.get(), query):
+            # 제출 사이에 같은 세션의 새 실행이 시작됨
+            self.cancel_query(query_id)
+        
+        started = time.monotonic()
+        delay = QUERY_POLL_INTERVAL
+        running = True
+        try:
+            while True:
+                if self._queries.is_cancelled(query_id):
+                    raise QueryCancelledError(f"쿼리가 취소되었습니다 ({query_id})")
+                running = conn.is_still_running(conn.get_query_status_throw_if_error(query_id))
+                if not running:
+                    break
+                elapsed = time.monotonic() - started
+                if timeout and elapsed >= timeout:
+                    self.cancel_query(query_id)
+                    raise TimeoutError(f"쿼리 실행 시간 초과 ({timeout:g}초, {query_id})")
+                if on_wait is not None:
+                    on_wait(elapsed)
+                time.sleep(delay)
+                delay = min(delay * 2, QUERY_POLL_MAX_INTERVAL)
+            cursor.get_results_from_sfqid(query_id)
+        except BaseException:
+            # 대기 중 중단되면 웨어하우스에서 계속 실행되지 않도록 취소
+            if running and not self._queries.is_cancelled(query_id):
+                self.cancel_query(query_id)
+            raise
+        finally:
+            self._queries.unregister(query_id)
+    
+    def _run_query(self, query: str, params: Optional[Sequence], fetch_mode: str,
+                   timeout: Optional[float] = None, timings: Optional[Dict] = None) -> pd.DataFrame:
+        """쿼리를 웨어하우스에서 실행합니다.
+        
+        기본은 Arrow 경로(fetch_arrow_all → to_pandas)이며, pyarrow가 없거나 결과가 Arrow 형식이
+        아닌 경우(SHOW/DDL 등)에만 DictCursor 경로로 대체합니다.
+        timings를 주면 쿼리 ID와 실행/수신/DataFrame 변환 시간(ms)을 채워 넣습니다.
+        """
+        if fetch_mode == FETCH_MODE_ARROW and not HAS_PYARROW:
+            fetch_mode = FETCH_MODE_DICT
+        timings = {} if timings is None else timings
         
         try:
-            if self._connection is None or self._connection.is_closed():
-                # account에서 .snowflakecomputing.com 제거 (있는 경우)
-                account_clean = self.account.replace('.snowflakecomputing.com', '').replace('https://', '').replace('http://', '')
+            with self.connection() as conn:
+                if fetch_mode == FETCH_MODE_DICT:
+                    return self._execute_query_dict(conn, query, params, timeout, timings)
                 
-                self._connection = snowflake.connector.connect(
-                    user=self.user,
-                    password=self.password,
-                    account=account_clean,
-                    warehouse=self.warehouse,
-                    database=self.database,
-                    schema=self.schema,
-                    role=self.role
-                )
-            return self._connection
+                cursor = conn.cursor()
+                try:
+                    started = time.perf_counter()
+                    self._execute(conn, cursor, query, params, timeout)
+                    fetched = time.perf_counter()
+                    timings["query_id"] = getattr(cursor, 'sfqid', None)
+                    timings["execute_ms"] = round((fetched - started) * 1000, 1)
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                    try:
+                        table = cursor.fetch_arrow_all()
+                    except NotSupportedError:
+                        # Arrow 형식이 아닌 결과는 남은 행을 그대로 받아 DataFrame으로 변환
+                        rows = cursor.fetchall()
+                        converted = time.perf_counter()
+                        timings["fetch_ms"] = round((converted - fetched) * 1000, 1)
+                        df = pd.DataFrame(rows, columns=columns)
+                        timings["convert_ms"] = round((time.perf_counter() - converted) * 1000, 1)
+                        return df
+                finally:
+                    cursor.close()
+            
+            converted = time.perf_counter()
+            timings["fetch_ms"] = round((converted - fetched) * 1000, 1)
+            # 결과 행이 없으면 fetch_arrow_all은 None을 반환
+            df = table.to_pandas() if table is not None else pd.DataFrame(columns=columns)
+            timings["convert_ms"] = round((time.perf_counter() - converted) * 1000, 1)
+            if df.empty and len(df.columns) == 0:
+                return pd.DataFrame(columns=columns)
+            return df
+        except (QueryCancelledError, TimeoutError):
+            raise
         except Exception as e:
-            raise ConnectionError(f"Snowflake 연결 실패: {str(e)}")
+            raise Exception(f"쿼리 실행 실패: {str(e)}") from e
     
-    def execute_query(self, query: str) -> pd.DataFrame:
-        """SQL 쿼리를 실행하고 결과를 DataFrame으로 반환합니다."""
+    def execute_query_arrow(self, query: str, params: Optional[Sequence] = None,
+                            timeout: Optional[float] = None) -> "pa.Table":
+        """SQL 쿼리를 실행하고 결과를 pyarrow.Table로 반환합니다 (pandas 변환 없음, 결과 페이지 표시와 복제에 사용)."""
+        if not HAS_PYARROW:
+            raise ImportError("execute_query_arrow를 사용하려면 pyarrow가 필요합니다.")
+        
         try:
-            conn = self.connect()
-            cursor = conn.cursor(DictCursor)
-            cursor.execute(query)
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    self._execute(conn, cursor, query, params, timeout)
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                    try:
+                        table = cursor.fetch_arrow_all()
+                    except NotSupportedError:
+                        rows = cursor.fetchall()
+                        return pa.table({col: [row[i] for row in rows] for i, col in enumerate(columns)})
+                finally:
+                    cursor.close()
             
-            # 결과를 DataFrame으로 변환
+            if table is None:
+                # 결과 행이 없으면 컬럼만 있는 빈 테이블 반환
+                return pa.table({col: [] for col in columns})
+            return table
+        except (QueryCancelledError, TimeoutError):
+            raise
+        except Exception as e:
+            raise Exception(f"쿼리 실행 실패: {str(e)}") from e
+    
+    def iter_query_batches(self, query: str, batch_rows: Optional[int] = DEFAULT_BATCH_ROWS,
+                           as_arrow: bool = False, params: Optional[Sequence] = None,
+                           timeout: Optional[float] = None, on_wait=None) -> Iterator:
+        """SQL 쿼리를 실행하고 결과를 배치 단위로 순회합니다.
+        
+        fetch_pandas_batches(as_arrow=True면 fetch_arrow_batches)로 결과를 받아오며,
+        백그라운드 스레드가 다음 배치 하나를 미리 가져옵니다. 동시에 메모리에 있는 배치는
+        최대 두 개이므로 결과 크기와 무관하게 메모리 사용량이 제한됩니다.
+        batch_rows가 None이면 서버 청크 크기 그대로 반환합니다.
+        timeout/on_wait는 _execute()를 참고하세요 (실행이 끝나기 전까지만 적용).
+        """
+        # 스케줄러 슬롯과 연결은 마지막 배치를 읽을 때까지 대여 상태로 유지
+        ticket = self._scheduler.acquire(*self._workload())
+        try:
+            conn = self._pool.acquire()
+        except BaseException:
+            self._scheduler.release(ticket)
+            raise
+        
+        def release():
+            self._pool.release(conn, discard=conn.is_closed())
+            self._scheduler.release(ticket)
+        
+        try:
+            cursor = conn.cursor()
+            self._execute(conn, cursor, query, params, timeout, on_wait)
+        except (QueryCancelledError, TimeoutError):
+            release()
+            raise
+        except Exception as e:
+            release()
+            raise Exception(f"쿼리 실행 실패: {str(e)}") from e
+        except BaseException:
+            # Streamlit 재실행 등으로 중단된 경우 (쿼리는 _execute에서 취소됨)
+            release()
+            raise
+        
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        source = _rebatch(self._iter_cursor_batches(cursor, columns, batch_rows, as_arrow), batch_rows)
+        
+        # 다음 배치를 미리 가져오는 백그라운드 스레드 (큐 크기 1 = 선행 배치 1개)
+        batches = queue.Queue(maxsize=1)
+        stop = threading.Event()
+        done = object()
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                for batch in source:
+                    if not put(batch):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+            finally:
+                cursor.close()
+                release()
+        
+        prefetcher = threading.Thread(target=produce, name="snowflake-batch-prefetch", daemon=True)
+        prefetcher.start()
+        
+        try:
+            while True:
+                item = batches.get()
+                if item is done:
+                    break
+                if isinstance(item, (QueryCancelledError, TimeoutError)):
+                    raise item
+                if isinstance(item, Exception):
+                    raise Exception(f"쿼리 실행 실패: {str(item)}") from item
+                yield item
+        finally:
+            # 소비자가 중간에 멈춰도 스레드와 커서를 정리
+            stop.set()
+            prefetcher.join(timeout=1.0)
+    
+    def _iter_cursor_batches(self, cursor, columns: List[str], batch_rows: Optional[int],
+                             as_arrow: bool) -> Iterator:
+        """커서에서 Arrow/DataFrame 배치를 순서대로 읽습니다."""
+        if HAS_PYARROW:
+            try:
+                if as_arrow:
+                    yield from cursor.fetch_arrow_batches()
+                else:
+                    yield from cursor.fetch_pandas_batches()
+                return
+            except NotSupportedError:
+                pass
+        
+        # Arrow 형식이 아닌 결과는 fetchmany로 나눠 받음
+        while True:
+            rows = cursor.fetchmany(batch_rows or DEFAULT_BATCH_ROWS)
+            if not rows:
+                return
+            if as_arrow:
+                yield pa.table({col: [row[i] for row in rows] for i, col in enumerate(columns)})
+            else:
+                yield pd.DataFrame(rows, columns=columns)
+    
+    def _execute_query_dict(self, conn, query: str, params: Optional[Sequence] = None,
+                            timeout: Optional[float] = None, timings: Optional[Dict] = None) -> pd.DataFrame:
+        """DictCursor로 쿼리를 실행합니다 (pyarrow 미설치 환경용 호환 경로)."""
+        timings = {} if timings is None else timings
+        cursor = conn.cursor(DictCursor)
+        try:
+            started = time.perf_counter()
+            self._execute(conn, cursor, query, params, timeout)
+            fetched = time.perf_counter()
+            timings["query_id"] = getattr(cursor, 'sfqid', None)
+            timings["execute_ms"] = round((fetched - started) * 1000, 1)
             columns = [desc[0] for desc in cursor.description] if cursor.description else []
             rows = cursor.fetchall()
-            
+        finally:
             cursor.close()
-            
-            if rows:
-                df = pd.DataFrame(rows)
-                return df
-            else:
-                return pd.DataFrame(columns=columns)
+        
+        converted = time.perf_counter()
+        timings["fetch_ms"] = round((converted - fetched) * 1000, 1)
+        df = pd.DataFrame(rows) if rows else pd.DataFrame(columns=columns)
+        timings["convert_ms"] = round((time.perf_counter() - converted) * 1000, 1)
+        return df
+    
+    def open_result(self, query: str, params: Optional[Sequence] = None, timeout: Optional[float] = None,
+                    on_wait=None) -> QueryResult:
+        """쿼리를 실행만 하고 결과 행은 받아오지 않습니다 (ResultPager로 페이지 단위 조회).
+        
+        Snowflake는 결과를 24시간 보관하므로 RESULT_SCAN(쿼리 ID)으로 필요한 구간만 다시 읽습니다.
+        """
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    self._execute(conn, cursor, query, params, timeout, on_wait)
+                    query_id = cursor.sfqid
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                    row_count = getattr(cursor, 'rowcount', None)
+                finally:
+                    cursor.close()
+        except (QueryCancelledError, TimeoutError):
+            raise
         except Exception as e:
-            raise Exception(f"쿼리 실행 실패: {str(e)}")
+            raise Exception(f"쿼리 실행 실패: {str(e)}") from e
+        
+        result = QueryResult(query_id, columns, 0, query)
+        if row_count is None or row_count < 0:
+            row_count = int(self.execute_query(f"SELECT COUNT(*) FROM ({self.result_query(result)})", ttl=0).iloc[0, 0])
+        result.row_count = row_count
+        return result
+    
+    def result_query(self, result: QueryResult) -> str:
+        """보관된 결과 전체를 읽는 SQL (CSV 내보내기 등에 사용)"""
+        if not _QUERY_ID_PATTERN.match(result.query_id or ""):
+            raise ValueError(f"잘못된 쿼리 ID: {result.query_id!r}")
+        return f"SELECT * FROM TABLE(RESULT_SCAN('{result.query_id}'))"
     
-    def get_tables(self) -> List[Dict]:
-        """현재 스키마의 테이블 목록을 반환합니다."""
-        query = f"""
-            SELECT TABLE_NAME, TABLE_TYPE, CREATED, LAST_ALTERED
-            FROM {self.database}.INFORMATION_SCHEMA.TABLES
-            WHERE TABLE_SCHEMA = '{self.schema}'
-            ORDER BY TABLE_NAME
+    def fetch_result_page(self, result: QueryResult, offset: int, limit: int):
+        """보관된 결과의 [offset, offset + limit) 구간을 조회합니다.
+        
+        pyarrow가 있으면 pandas로 변환하지 않은 pyarrow.Table을 반환합니다 (st.dataframe에 그대로 전달).
         """
-        return self.execute_query(query).to_dict('records')
+        query = f"{self.result_query(result)} LIMIT {int(limit)} OFFSET {int(offset)}"
+        if HAS_PYARROW:
+            return self.execute_query_arrow(query)
+        return self.execute_query(query, ttl=0)
+    
+    def close_result(self, result: QueryResult):
+        """보관된 결과를 정리합니다 (Snowflake 결과는 자동 만료되므로 할 일 없음)."""
+    
+    def get_tables(self, database: Optional[str] = None, schema: Optional[str] = None) -> List[Dict]:
+        """스키마의 테이블 목록을 반환합니다 (기본값: 현재 데이터베이스/스키마)."""
+        return self.execute_statement(
+            "tables", [schema or self.schema], {"database": database or self.database},
+            ttl=TABLE_VERSION_TTL, persist=False,
+        ).to_dict('records')
     
     def get_table_columns(self, table_name: str) -> pd.DataFrame:
-        """테이블의 컬럼 정보를 반환합니다."""
-        query = f"""
-            SELECT 
-                COLUMN_NAME,
-                DATA_TYPE,
-                IS_NULLABLE,
-                COLUMN_DEFAULT,
-                COMMENT
-            FROM {self.database}.INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_SCHEMA = '{self.schema}' AND TABLE_NAME = '{table_name}'
-            ORDER BY ORDINAL_POSITION
-        """
-        return self.execute_query(query)
+        """테이블의 컬럼 정보를 반환합니다 (스키마 카탈로그에서 조회)."""
+        return self.get_catalog().columns(table_name)
+    
+    def get_catalog(self, database: Optional[str] = None, schema: Optional[str] = None,
+                    refresh: bool = False) -> SchemaCatalog:
+        """스키마의 모든 테이블과 컬럼을 한 번에 조회한 카탈로그를 반환합니다.
+        
+        카탈로그는 메모리에 보관되며 CATALOG_TTL이 지나면 테이블 수와 최대 LAST_ALTERED만
+        확인해, 바뀌었을 때만 다시 조회합니다. refresh=True면 즉시 다시 조회합니다.
+        """
+        database = database or self.database
+        schema = schema or self.schema
+        with self._catalog_lock:
+            catalog = self._catalogs.get((database, schema))
+            if catalog is not None and not refresh:
+                if time.monotonic() - catalog.loaded_at < CATALOG_TTL:
+                    return catalog
+                version = self._catalog_version(database, schema)
+                if version == catalog.version:
+                    catalog.loaded_at = time.monotonic()
+                    return catalog
+            else:
+                version = self._catalog_version(database, schema)
+            
+            catalog = SchemaCatalog(self._catalog_rows(database, schema), version)
+            self._catalogs[(database, schema)] = catalog
+            return catalog
+    
+    def _catalog_version(self, database: str, schema: str) -> tuple:
+        """(테이블 수, 최대 LAST_ALTERED) - 카탈로그 변경 감지용"""
+        row = self.execute_statement("catalog_version", [schema], {"database": database}, ttl=0).iloc[0]
+        last_altered = row['LAST_ALTERED']
+        return int(row['TABLE_COUNT']), None if pd.isna(last_altered) else pd.Timestamp(last_altered).isoformat()
+    
+    def _catalog_rows(self, database: str, schema: str) -> pd.DataFrame:
+        """스키마의 테이블 × 컬럼 행 (TABLES LEFT JOIN COLUMNS, 조회 1회)"""
+        return self.execute_statement("catalog_rows", [schema], {"database": database}, ttl=0)
     
     def test_connection(self) -> Dict:
         """연결을 테스트하고 현재 설정 정보를 반환합니다."""
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            cursor.execute("SELECT CURRENT_VERSION(), CURRENT_USER(), CURRENT_DATABASE(), CURRENT_SCHEMA(), CURRENT_ROLE()")
-            result = cursor.fetchone()
-            cursor.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(statement("connection_info"))
+                result = cursor.fetchone()
+                cursor.close()
             
+            self._health.request_check()
             return {
                 "status": "success",
                 "version": result[0],
@@ -117,44 +2367,139 @@ class SnowflakeConnector:
                 "role": result[4]
             }
         except Exception as e:
+            self._health.request_check()
             return {
                 "status": "error",
                 "message": str(e)
             }
     
     def close(self):
-        """연결을 닫습니다."""
-        if self._connection and not self._connection.is_closed():
-            self._connection.close()
-            self._connection = None
+        """상태 감시를 멈추고 연결 풀(취소 전용 포함)의 유휴 연결을 모두 닫습니다."""
+        self._health.stop()
+        self._pool.close_all()
+        self._cancel_pool.close_all()
 
 
-@st.cache_resource
-def get_snowflake_connector():
-    """Streamlit 캐시를 사용한 Snowflake 연결자 반환"""
-    return SnowflakeConnector()
+class SnowflakeConnector(QueryBackend):
+    """Snowflake 데이터베이스 연결 및 쿼리 실행 클래스"""
+    
+    def __init__(self):
+        """환경 변수에서 Snowflake 연결 정보를 읽어옵니다."""
+        self.account = os.getenv('SNOWFLAKE_ACCOUNT')
+        self.user = os.getenv('SNOWFLAKE_USER')
+        self.password = os.getenv('SNOWFLAKE_PASSWORD')
+        self.warehouse = os.getenv('SNOWFLAKE_WAREHOUSE', 'DEV_WH')
+        self.database = os.getenv('SNOWFLAKE_DATABASE', 'FNF')
+        self.schema = os.getenv('SNOWFLAKE_SCHEMA', 'SAP_FNF')
+        self.role = os.getenv('SNOWFLAKE_ROLE', 'PU_SQL_SAP')
+        super().__init__(disk_cache_dir=os.getenv('SNOWFLAKE_DISK_CACHE_DIR', '.query_cache'))
+        self._health.start()
+    
+    def connect(self):
+        """새 Snowflake 연결을 엽니다 (연결 풀이 호출하며, 직접 쓸 때는 connection()을 사용)."""
+        # 필수 환경 변수 검증
+        if not self.account:
+            raise ConnectionError("SNOWFLAKE_ACCOUNT 환경 변수가 설정되지 않았습니다.")
+        if not self.user:
+            raise ConnectionError("SNOWFLAKE_USER 환경 변수가 설정되지 않았습니다.")
+        if not self.password:
+            raise ConnectionError("SNOWFLAKE_PASSWORD 환경 변수가 설정되지 않았습니다.")
+        
+        try:
+            # account에서 .snowflakecomputing.com 제거 (있는 경우)
+            account_clean = self.account.replace('.snowflakecomputing.com', '').replace('https://', '').replace('http://', '')
+            
+            return snowflake.connector.connect(
+                user=self.user,
+                password=self.password,
+                account=account_clean,
+                warehouse=self.warehouse,
+                database=self.database,
+                schema=self.schema,
+                role=self.role,
+                # 유휴 세션이 만료되지 않도록 드라이버 하트비트 사용
+                client_session_keep_alive=True,
+                # ? 자리 값을 서버 측에서 바인딩 (SQL 문이 같아 결과 캐시/실행 계획 재사용)
+                paramstyle='qmark'
+            )
+        except Exception as e:
+            raise ConnectionError(f"Snowflake 연결 실패: {str(e)}")
 
 
-def format_currency(value: float, unit: str = "원") -> str:
-    """금액을 한국어 형식으로 포맷팅합니다."""
-    if value is None or pd.isna(value):
-        return "0"
+def _rebatch(batches: Iterator, batch_rows: Optional[int]) -> Iterator:
+    """Arrow/DataFrame 배치를 batch_rows 행 단위로 다시 나눕니다."""
+    if not batch_rows:
+        yield from batches
+        return
     
-    abs_value = abs(value)
+    pending = []
+    pending_rows = 0
+    for batch in batches:
+        if len(batch) == 0:
+            continue
+        pending.append(batch)
+        pending_rows += len(batch)
+        if pending_rows < batch_rows:
+            continue
+        
+        merged = _concat_batches(pending)
+        offset = 0
+        while pending_rows - offset >= batch_rows:
+            yield _slice_batch(merged, offset, batch_rows)
+            offset += batch_rows
+        pending = [_slice_batch(merged, offset, pending_rows - offset)] if offset < pending_rows else []
+        pending_rows -= offset
     
-    if abs_value >= 1000000000000:  # 조
-        return f"{value/1000000000000:.2f}조 {unit}"
-    elif abs_value >= 100000000:  # 억
-        return f"{value/100000000:.2f}억 {unit}"
-    elif abs_value >= 10000:  # 만
-        return f"{value/10000:.2f}만 {unit}"
-    else:
-        return f"{value:,.0f} {unit}"
+    if pending:
+        yield _concat_batches(pending)
+
+
+def _concat_batches(batches: List):
+    """배치 목록을 하나로 합칩니다."""
+    if len(batches) == 1:
+        return batches[0]
+    if HAS_PYARROW and isinstance(batches[0], pa.Table):
+        return pa.concat_tables(batches)
+    return pd.concat(batches, ignore_index=True)
 
 
-def format_percentage(value: float, decimals: int = 2) -> str:
-    """퍼센트를 포맷팅합니다."""
-    if value is None or pd.isna(value):
-        return "0%"
-    return f"{value:.{decimals}f}%"
+def _slice_batch(batch, offset: int, length: int):
+    """배치의 일부 행을 잘라냅니다."""
+    if HAS_PYARROW and isinstance(batch, pa.Table):
+        return batch.slice(offset, length)
+    return batch.iloc[offset:offset + length].reset_index(drop=True)
 
+
+@st.cache_resource
+def get_snowflake_connector():
+    """Streamlit 캐시를 사용한 쿼리 백엔드 반환
+    
+    DASHBOARD_BACKEND (기본값 replica):
+    - replica: 재무 테이블을 로컬 DuckDB 복제본(REPLICA_PATH)으로 주기적으로 동기화하고
+      대시보드 쿼리는 복제본에서 처리 (사용자 정의 쿼리/변경 확인만 Snowflake 사용)
+    - snowflake: 모든 쿼리를 Snowflake에서 실행
+    - local: 로컬 DuckDB 백엔드만 사용
+      (LOCAL_DATA_PATH: 데이터 파일/디렉터리, LOCAL_LATENCY_MS: 쿼리당 주입 지연)
+    """
+    backend = os.getenv('DASHBOARD_BACKEND', 'replica').lower()
+    if backend == 'local':
+        from local_backend import LocalQueryBackend
+        return LocalQueryBackend(
+            data_path=os.getenv('LOCAL_DATA_PATH', 'sample_data.json'),
+            latency=float(os.getenv('LOCAL_LATENCY_MS', '0')) / 1000,
+            jitter=float(os.getenv('LOCAL_JITTER_MS', '0')) / 1000,
+        )
+    
+    connector = SnowflakeConnector()
+    if backend == 'replica':
+        try:
+            from replica_sync import ReplicaQueryBackend
+        except ImportError:
+            # duckdb가 없으면 Snowflake만 사용
+            return connector
+        return ReplicaQueryBackend(
+            connector,
+            database_path=os.getenv('REPLICA_PATH', '.replica/sap_fnf.duckdb'),
+            sync_interval=float(os.getenv('REPLICA_SYNC_INTERVAL', '300')),
+        )
+    return connector
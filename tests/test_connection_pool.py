@@ -0,0 +1,91 @@
+"""
+연결 풀 반환 테스트
+쿼리 대기 중 on_wait에서 Exception이 아닌 BaseException(Streamlit RerunException/StopException 등)이
+나와도 빌린 연결이 풀에 남지 않는지 확인합니다.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snowflake_connector import QueryBackend  # noqa: E402
+
+
+class RerunInterrupt(BaseException):
+    """Streamlit 재실행 예외 대용 (Exception이 아닌 BaseException)"""
+
+
+class _RunningCursor:
+    def __init__(self):
+        self.sfqid = None
+        self.description = None
+    
+    def execute_async(self, query, params=None):
+        self.sfqid = "query-1"
+        return {"queryId": self.sfqid}
+    
+    def execute(self, query, params=None, timeout=None):
+        # SYSTEM$CANCEL_QUERY
+        return self
+    
+    def close(self):
+        pass
+
+
+class _RunningConnection:
+    """제출한 쿼리가 끝나지 않는 연결"""
+    
+    def __init__(self):
+        self.closed = False
+    
+    def cursor(self, kind=None):
+        return _RunningCursor()
+    
+    def get_query_status_throw_if_error(self, query_id):
+        return "RUNNING"
+    
+    def is_still_running(self, status):
+        return True
+    
+    def is_closed(self):
+        return self.closed
+    
+    def close(self):
+        self.closed = True
+
+
+class _Backend(QueryBackend):
+    account = role = warehouse = database = schema = "test"
+    
+    def connect(self):
+        return _RunningConnection()
+
+
+def _interrupt(elapsed):
+    raise RerunInterrupt()
+
+
+@pytest.fixture
+def backend():
+    return _Backend()
+
+
+def test_open_result_releases_connection_on_interrupt(backend):
+    with pytest.raises(RerunInterrupt):
+        backend.open_result("SELECT 1", on_wait=_interrupt)
+    
+    stats = backend.pool_stats()
+    assert stats["in_use"] == 0
+    # 중단된 연결은 상태를 알 수 없으므로 풀에 되돌리지 않음
+    assert stats["closed"] >= 1
+
+
+def test_pool_connection_releases_on_base_exception(backend):
+    with pytest.raises(RerunInterrupt):
+        with backend.connection():
+            raise RerunInterrupt()
+    
+    assert backend.pool_stats()["in_use"] == 0
@@ -0,0 +1,88 @@
+"""
+차트 캐시 테스트
+같은 데이터 버전/사양이면 Figure를 다시 만들지 않고, 적중 시 st.plotly_chart가 하는 변환
+(검증 + JSON 직렬화)이 생성보다 훨씬 가벼운지 확인합니다.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import plotly.tools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from figure_cache import FigureCache  # noqa: E402
+
+
+def _frame():
+    return pd.DataFrame({
+        "매출일자": pd.date_range("2025-01-01", periods=400, freq="D"),
+        "매출액": np.arange(400) * 1e6,
+    })
+
+
+def _render(figure):
+    """st.plotly_chart가 차트를 보낼 때 하는 변환 (Figure 검증 → JSON)"""
+    figure = plotly.tools.return_figure_from_figure_or_data(figure, validate_figure=True)
+    return pio.to_json(figure, validate=False)
+
+
+def test_hit_reuses_figure_without_rebuilding():
+    cache = FigureCache()
+    data = _frame()
+    builds = []
+    
+    def build():
+        builds.append(1)
+        return px.line(data, x="매출일자", y="매출액").update_layout(height=400)
+    
+    first = cache.figure(data, {"chart": "sales_trend"}, build)
+    second = cache.figure(data, {"chart": "sales_trend"}, build)
+    
+    assert second is first
+    assert len(builds) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["bytes"] > 0
+
+
+def test_new_data_version_or_spec_rebuilds():
+    cache = FigureCache()
+    data = _frame()
+    builds = []
+    
+    def build():
+        builds.append(1)
+        return px.line(data, x="매출일자", y="매출액")
+    
+    cache.figure(data, {"chart": "sales_trend"}, build)
+    cache.figure(data, {"chart": "sales_trend", "height": 300}, build)
+    cache.figure(data.copy(), {"chart": "sales_trend"}, build)
+    
+    assert len(builds) == 3
+
+
+def test_hit_render_is_much_cheaper_than_miss():
+    cache = FigureCache()
+    data = _frame()
+    spec = {"chart": "sales_trend"}
+    
+    def build():
+        return px.line(data, x="매출일자", y="매출액").update_layout(height=400)
+    
+    started = time.perf_counter()
+    _render(cache.figure(data, spec, build))
+    miss = time.perf_counter() - started
+    
+    hits = []
+    for _ in range(5):
+        started = time.perf_counter()
+        _render(cache.figure(data, spec, build))
+        hits.append(time.perf_counter() - started)
+    
+    # 적중 시에는 생성/재검증 없이 to_dict/to_json 변환만 남음
+    assert min(hits) * 5 < miss
@@ -0,0 +1,77 @@
+"""
+재무 비율 엔진 테스트
+기간별 지표 값, 분모가 0인 기간, 시점 잔액 재무상태표 처리와 데이터 버전별 계산 결과 기억을 확인합니다.
+"""
+
+import math
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from financial_ratios import Metric, RatioEngine  # noqa: E402
+
+
+@pytest.fixture
+def income():
+    return pd.DataFrame({
+        "항목": ["매출액", "매출원가", "영업이익", "순이익"] * 2,
+        "연도": [2023] * 4 + [2024] * 4,
+        "금액": [1000, 600, 200, 100, 0, 0, -50, -80],
+    })
+
+
+@pytest.fixture
+def balance():
+    return pd.DataFrame({
+        "항목": ["현금", "재고자산", "설비", "단기차입금", "장기차입금", "자본금"],
+        "값": [300, 200, 500, 250, 250, 500],
+        "분류": ["유동자산", "유동자산", "비유동자산", "유동부채", "비유동부채", "자본"],
+    })
+
+
+def test_ratios_are_computed_per_period(income, balance):
+    ratios = RatioEngine().compute(income, balance, ["매출총이익률", "영업이익률", "ROE", "부채비율", "유동비율"])
+    
+    assert ratios.index.tolist() == [2023, 2024]
+    assert ratios.loc[2023, "매출총이익률"] == pytest.approx(40.0)
+    assert ratios.loc[2023, "영업이익률"] == pytest.approx(20.0)
+    # 분모(매출액)가 0인 기간은 NaN
+    assert math.isnan(ratios.loc[2024, "영업이익률"])
+    # 연도 없는 재무상태표는 가장 최근 기간의 시점 잔액
+    assert math.isnan(ratios.loc[2023, "ROE"])
+    assert ratios.loc[2024, "ROE"] == pytest.approx(-16.0)
+    assert ratios.loc[2024, "부채비율"] == pytest.approx(100.0)
+    assert ratios.loc[2024, "유동비율"] == pytest.approx(200.0)
+
+
+def test_same_data_is_not_recomputed(income, balance):
+    calls = []
+    
+    def gross_profit(revenue, cost):
+        calls.append(1)
+        return revenue - cost
+    
+    engine = RatioEngine([
+        Metric("매출총이익", ["매출액", "매출원가"], gross_profit, "원"),
+        Metric("매출총이익률", ["매출총이익", "매출액"], lambda profit, revenue: profit / revenue * 100),
+    ])
+    
+    first = engine.compute(income, balance, ["매출총이익률"])
+    engine.compute(income, balance, ["매출총이익", "매출총이익률"])
+    assert len(calls) == 1
+    
+    # 새로 조회된 결과(다른 객체)는 다시 계산
+    second = engine.compute(income.copy(), balance, ["매출총이익률"])
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_cyclic_or_unknown_metrics_are_rejected(income):
+    with pytest.raises(ValueError):
+        RatioEngine([Metric("A", ["B"], lambda b: b), Metric("B", ["A"], lambda a: a)])
+    with pytest.raises(ValueError):
+        RatioEngine().compute(income, names=["없는지표"])
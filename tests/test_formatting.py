@@ -0,0 +1,38 @@
+"""
+금액/비율 표시 형식 테스트
+배열 단위 조/억/만 변환이 단위 경계, 음수, 결측값, 숫자 문자열과 일반 문자열을 올바르게 표시하는지 확인합니다.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formatting import format_currency, format_currency_array, format_percentage_array  # noqa: E402
+
+
+def test_units_are_chosen_per_value():
+    values = [1.5e12, 1e12, 1.5e8, 1e8, 12_345, 9_999, 0]
+    
+    assert format_currency_array(values).tolist() == [
+        "1.50조 원", "1.00조 원", "1.50억 원", "1.00억 원", "1.23만 원", "9,999 원", "0 원",
+    ]
+
+
+def test_negative_missing_and_text_values():
+    values = pd.Series([-1.5e8, np.nan, None, "1,234원", "합계", ""], dtype=object)
+    
+    assert format_currency_array(values).tolist() == ["-1.50억 원", "0", "0", "1,234 원", "합계", "0"]
+    assert format_currency_array(values, keep_text=False, na_rep="-").tolist()[4] == "-"
+
+
+def test_unit_and_decimals_options():
+    assert format_currency_array(np.array([2.5e8, 500]), unit="", decimals=1).tolist() == ["2.5억", "500"]
+    assert format_currency(123_456_789) == "1.23억 원"
+
+
+def test_percentage_array():
+    assert format_percentage_array([12.5, None, -3]).tolist() == ["12.50%", "0%", "-3.00%"]
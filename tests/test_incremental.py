@@ -0,0 +1,84 @@
+"""
+증분 조회 테스트
+upsert_frame 병합 규칙과, 워터마크 이후 변경분만 조회해 보관 중인 결과에 병합하는
+refresh_incremental을 DuckDB LocalQueryBackend로 확인합니다.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_backend import LocalQueryBackend  # noqa: E402
+from snowflake_connector import upsert_frame  # noqa: E402
+
+QUERY = "SELECT 매출일자, 부서명, 매출액 FROM FNF.SAP_FNF.일별매출 WHERE {watermark_filter}"
+KEYS = ["매출일자", "부서명"]
+
+
+def _sales(rows):
+    return pd.DataFrame(rows, columns=["매출일자", "부서명", "매출액"]).astype({"매출일자": "datetime64[ns]"})
+
+
+@pytest.fixture
+def backend():
+    backend = LocalQueryBackend(tables={"일별매출": _sales([
+        ("2025-01-01", "영업1팀", 100),
+        ("2025-01-02", "영업1팀", 200),
+    ])})
+    yield backend
+    backend.close()
+
+
+def _refresh(backend, name="daily_sales", params=None, query=QUERY):
+    return backend.refresh_incremental(name, query, "매출일자", KEYS, params=params)
+
+
+def test_upsert_overwrites_matching_keys_and_appends_new_rows():
+    base = pd.DataFrame({"키": [1, 2], "값": ["a", "b"]})
+    delta = pd.DataFrame({"키": [2, 3], "값": ["B", "c"]})
+    
+    merged = upsert_frame(base, delta, ["키"]).sort_values("키", ignore_index=True)
+    
+    assert merged.to_dict("list") == {"키": [1, 2, 3], "값": ["a", "B", "c"]}
+    assert upsert_frame(None, delta, ["키"]).equals(delta)
+    assert upsert_frame(base, delta.iloc[:0], ["키"]) is base
+
+
+def test_refresh_fetches_only_rows_from_watermark(backend):
+    first = _refresh(backend)
+    assert len(first) == 2
+    assert backend.incremental_stats()["daily_sales"]["watermark"].startswith("2025-01-02")
+    
+    # 경계일 값 수정 + 새 날짜 추가, 워터마크 이전 행은 원본에서 사라져도 보관 중인 결과에 남음
+    backend.register_table("일별매출", _sales([
+        ("2025-01-02", "영업1팀", 250),
+        ("2025-01-03", "영업1팀", 300),
+    ]))
+    merged = _refresh(backend)
+    
+    assert merged["매출액"].tolist() == [100, 250, 300]
+    stats = backend.incremental_stats()["daily_sales"]
+    assert stats["rows"] == 3
+    assert stats["last_delta_rows"] == 2
+    assert stats["watermark"].startswith("2025-01-03")
+
+
+def test_refresh_restarts_when_params_change(backend):
+    query = QUERY.replace("WHERE", "WHERE 부서명 = ? AND")
+    assert len(_refresh(backend, params=["영업1팀"], query=query)) == 2
+    assert _refresh(backend, params=["영업2팀"], query=query).empty
+
+
+def test_datasets_are_bounded(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_INCREMENTAL_MAX_DATASETS", "2")
+    backend = LocalQueryBackend(tables={"일별매출": _sales([("2025-01-01", "영업1팀", 100)])})
+    try:
+        for name in ["a", "b", "a", "c"]:
+            _refresh(backend, name)
+        assert sorted(backend.incremental_stats()) == ["a", "c"]
+    finally:
+        backend.close()
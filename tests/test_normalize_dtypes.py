@@ -0,0 +1,64 @@
+"""
+조회 결과 dtype 정리 테스트
+Decimal 컬럼은 값 손실이 없을 때만 int64/float64로, 반복되는 문자열 컬럼은 category로 바뀌고
+원본 DataFrame은 그대로 남는지 확인합니다.
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_backend import LocalQueryBackend  # noqa: E402
+from snowflake_connector import CATEGORY_MIN_ROWS, normalize_dtypes  # noqa: E402
+
+
+def test_decimals_become_numeric_only_without_loss():
+    df = pd.DataFrame({
+        "금액": [Decimal("1200"), Decimal("-3400")],
+        "결측금액": [Decimal("1"), None],
+        "비율": [Decimal("0.125"), Decimal("1.500")],
+        "큰금액": [Decimal("123456789012345678901234567890"), Decimal("1")],
+    })
+    
+    normalized, report = normalize_dtypes(df)
+    
+    assert normalized["금액"].dtype == "int64"
+    assert normalized["금액"].tolist() == [1200, -3400]
+    assert normalized["결측금액"].dtype == "float64"
+    assert normalized["비율"].tolist() == [0.125, 1.5]
+    # int64/float64로 정확히 표현할 수 없으면 그대로 둠
+    assert normalized["큰금액"].dtype == object
+    assert report["columns"]["금액"] == "object→int64"
+    assert "큰금액" not in report["columns"]
+    assert df["금액"].dtype == object
+
+
+def test_repeated_strings_become_category_for_large_results():
+    rows = CATEGORY_MIN_ROWS
+    df = pd.DataFrame({
+        "분류": ["유동자산", "비유동자산"] * (rows // 2),
+        "전표번호": [f"DOC-{i}" for i in range(rows)],
+    })
+    
+    normalized, report = normalize_dtypes(df)
+    
+    assert isinstance(normalized["분류"].dtype, pd.CategoricalDtype)
+    assert not isinstance(normalized["전표번호"].dtype, pd.CategoricalDtype)
+    assert report["memory_after"] < report["memory_before"]
+    # 작은 결과는 변환하지 않음
+    assert normalize_dtypes(df.head(10))[1]["columns"] == {}
+
+
+def test_query_results_are_normalized():
+    backend = LocalQueryBackend()
+    try:
+        df = backend.execute_query("SELECT CAST(1234 AS DECIMAL(18, 0)) AS 금액, CAST(0.5 AS DECIMAL(10, 2)) AS 비율")
+    finally:
+        backend.close()
+    
+    assert df["금액"].dtype == "int64"
+    assert df["비율"].dtype == "float64"
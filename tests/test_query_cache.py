@@ -0,0 +1,168 @@
+"""
+쿼리 결과 캐시 테스트
+메모리 캐시(TTL + LRU), 디스크 캐시 manifest, 같은 쿼리 요청 병합(single-flight)과
+실행 표시가 사라지기 전에 결과가 캐시에 들어가는지를 DuckDB LocalQueryBackend로 확인합니다.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_backend import LocalQueryBackend  # noqa: E402
+from snowflake_connector import ParquetDiskCache, QueryResultCache, SingleFlight  # noqa: E402
+
+QUERY = "SELECT 부서명, SUM(매출액) AS 매출액 FROM FNF.SAP_FNF.매출 GROUP BY 부서명 ORDER BY 부서명"
+
+
+def _frame(rows=10):
+    return pd.DataFrame({"값": range(rows)})
+
+
+@pytest.fixture
+def backend():
+    sales = pd.DataFrame({"부서명": ["영업1팀", "영업2팀", "영업1팀"], "매출액": [100, 200, 300]})
+    backend = LocalQueryBackend(tables={"매출": sales}, latency=0.2)
+    yield backend
+    backend.close()
+
+
+def _count_runs(backend):
+    """_run_query 호출 횟수를 세는 목록을 반환합니다."""
+    runs = []
+    run_query = backend._run_query
+    
+    def counted(*args, **kwargs):
+        runs.append(1)
+        return run_query(*args, **kwargs)
+    
+    backend._run_query = counted
+    return runs
+
+
+def test_result_cache_expires_after_ttl():
+    cache = QueryResultCache(default_ttl=0.1)
+    df = _frame()
+    cache.put("a", df)
+    cache.put("b", df, ttl=0)
+    
+    assert cache.get("a") is df
+    assert cache.get("b") is None
+    time.sleep(0.15)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_result_cache_evicts_least_recently_used():
+    size = int(_frame().memory_usage(index=True, deep=True).sum())
+    cache = QueryResultCache(max_bytes=size * 2)
+    cache.put("a", _frame())
+    cache.put("b", _frame())
+    cache.get("a")
+    cache.put("c", _frame())
+    
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_disk_cache_manifest_survives_restart(tmp_path):
+    versions = {"FNF.SAP_FNF.매출": "2025-01-01 00:00:00"}
+    ParquetDiskCache(tmp_path).put("key", _frame(), versions, ttl=60)
+    
+    cache = ParquetDiskCache(tmp_path)
+    entry = cache.lookup("key")
+    assert entry["rows"] == 10
+    pd.testing.assert_frame_equal(cache.load("key", entry, versions), _frame())
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_cache_drops_entry_when_table_changes(tmp_path):
+    cache = ParquetDiskCache(tmp_path)
+    cache.put("key", _frame(), {"FNF.SAP_FNF.매출": "v1"}, ttl=60)
+    
+    entry = cache.lookup("key")
+    assert cache.load("key", entry, {"FNF.SAP_FNF.매출": "v2"}) is None
+    assert cache.lookup("key") is None
+    assert cache.stats()["stale"] == 1
+    assert not list(tmp_path.glob("*.parquet"))
+
+
+def test_disk_cache_without_tables_uses_ttl(tmp_path):
+    cache = ParquetDiskCache(tmp_path, max_age=3600)
+    cache.put("key", _frame(), {}, ttl=0.1)
+    
+    assert cache.lookup("key") is not None
+    time.sleep(0.15)
+    assert cache.lookup("key") is None
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    calls = []
+    
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "결과"
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.run("key", slow)))
+    leader.start()
+    started.wait()
+    waiters = [threading.Thread(target=lambda: results.append(flight.run("key", slow))) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    for thread in [leader, *waiters]:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert sorted(results) == [("결과", False)] + [("결과", True)] * 3
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_concurrent_identical_queries_run_once(backend):
+    runs = _count_runs(backend)
+    barrier = threading.Barrier(4)
+    results = []
+    
+    def query():
+        barrier.wait()
+        results.append(backend.execute_query(QUERY))
+    
+    threads = [threading.Thread(target=query) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(runs) == 1
+    assert len(results) == 4
+    assert all(df is results[0] for df in results)
+
+
+def test_result_is_cached_before_flight_finishes(backend):
+    runs = _count_runs(backend)
+    late = []
+    finish = backend._in_flight._finish
+    
+    def finish_then_query(key):
+        # 실행 표시가 사라진 직후(대기자에게 결과를 넘기기 전)에 들어온 호출
+        finish(key)
+        late.append(backend.execute_query(QUERY))
+    
+    backend._in_flight._finish = finish_then_query
+    df = backend.execute_query(QUERY)
+    
+    assert len(runs) == 1
+    assert late[0] is df
+    assert df["매출액"].tolist() == [400, 200]
@@ -0,0 +1,102 @@
+"""
+쿼리 취소 테스트
+쿼리 연결 풀이 가득 차도 전용 연결로 SYSTEM$CANCEL_QUERY를 보내는지, 취소 요청이 실패하면
+쿼리를 계속 추적하는지, 새 실행 시작(begin_run)이 취소 요청을 기다리지 않는지 확인합니다.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snowflake_connector import QueryBackend  # noqa: E402
+
+
+class _Cursor:
+    def __init__(self, connection):
+        self._connection = connection
+    
+    def execute(self, query, params=None, timeout=None):
+        if self._connection.backend.fail_cancel:
+            raise ConnectionError("cancel failed")
+        time.sleep(self._connection.backend.cancel_delay)
+        self._connection.backend.cancelled.append(params[0])
+        return self
+    
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, backend):
+        self.backend = backend
+        self.closed = False
+    
+    def cursor(self, kind=None):
+        return _Cursor(self)
+    
+    def is_closed(self):
+        return self.closed
+    
+    def close(self):
+        self.closed = True
+
+
+class _Backend(QueryBackend):
+    account = role = warehouse = database = schema = "test"
+    
+    def __init__(self):
+        self.cancelled = []
+        self.fail_cancel = False
+        self.cancel_delay = 0.0
+        super().__init__()
+    
+    def connect(self):
+        return _Connection(self)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_POOL_MAX_SIZE", "1")
+    monkeypatch.setenv("SNOWFLAKE_POOL_MIN_SIZE", "1")
+    return _Backend()
+
+
+def test_cancel_uses_dedicated_connection_when_pool_is_full(backend):
+    backend._queries.register("q1", ("S", "run-1"), "SELECT 1")
+    with backend._pool.connection():
+        assert backend.pool_stats()["in_use"] == backend.pool_stats()["max_size"]
+        started = time.monotonic()
+        assert backend.cancel_query("q1") is True
+        assert time.monotonic() - started < 1.0
+    
+    assert backend.cancelled == ["q1"]
+
+
+def test_failed_cancel_keeps_query_tracked(backend):
+    backend._queries.register("q1", ("S", "run-1"), "SELECT 1")
+    backend.fail_cancel = True
+    
+    assert backend.cancel_query("q1") is False
+    assert not backend._queries.is_cancelled("q1")
+    running = backend.running_queries("S")
+    assert [entry["query_id"] for entry in running] == ["q1"]
+    assert "cancel failed" in running[0]["cancel_error"]
+
+
+def test_begin_run_does_not_wait_for_cancel(backend):
+    backend.cancel_delay = 1.0
+    first_run = backend.begin_run("S")
+    backend._queries.register("q1", ("S", first_run), "SELECT 1")
+    
+    started = time.monotonic()
+    backend.begin_run("S")
+    assert time.monotonic() - started < 0.5
+    
+    deadline = time.monotonic() + 5
+    while not backend.cancelled and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert backend.cancelled == ["q1"]
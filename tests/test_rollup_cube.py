@@ -0,0 +1,74 @@
+"""
+롤업 큐브 테스트
+큐보이드 합계가 팩트 합계와 맞는지(차원 값이 NULL인 행 포함), 드릴다운/Top-N과 조회 결과 기억,
+rollup_cube가 캐시된 팩트로 만든 큐브를 재사용하는지 확인합니다.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_backend import LocalQueryBackend  # noqa: E402
+from rollup_cube import RollupCube  # noqa: E402
+
+
+@pytest.fixture
+def fact():
+    return pd.DataFrame({
+        "월": ["2025-01", "2025-01", "2025-02", "2025-02", "2025-02"],
+        "부서명": ["영업1팀", "영업2팀", "영업1팀", None, "영업2팀"],
+        "매출액": [100, 200, 300, 400, 500],
+        "판매수량": [1, 2, 3, 4, 5],
+    })
+
+
+def test_every_cuboid_keeps_the_fact_total(fact):
+    cube = RollupCube(fact, ["월", "부서명"], ["매출액", "판매수량"])
+    
+    assert cube.rollup()["매출액"].tolist() == [1500]
+    assert cube.rollup(["월"])["매출액"].tolist() == [300, 1200]
+    by_department = cube.rollup(["부서명"])
+    assert by_department["매출액"].sum() == 1500
+    assert by_department[by_department["부서명"].isna()]["매출액"].tolist() == [400]
+    assert cube.rollup(["부서명", "월"])["매출액"].sum() == 1500
+
+
+def test_drill_down_and_top_n(fact):
+    cube = RollupCube(fact, ["월", "부서명"], ["매출액"])
+    
+    february = cube.drill_down("부서명", {"월": "2025-02"})
+    assert february["매출액"].sum() == 1200
+    assert cube.rollup(filters={"월": ["2025-01"]})["매출액"].tolist() == [300]
+    
+    top = cube.top_n("부서명", "매출액", n=2)
+    assert top["부서명"].tolist() == ["영업2팀", "영업1팀"]
+    assert top["매출액"].tolist() == [700, 400]
+    with pytest.raises(ValueError):
+        cube.top_n("부서명", "원가")
+
+
+def test_repeated_queries_are_memoized(fact):
+    cube = RollupCube(fact, ["월", "부서명"], ["매출액"])
+    
+    first = cube.drill_down("부서명", {"월": "2025-02"})
+    assert cube.drill_down("부서명", {"월": ["2025-02"]}) is first
+    assert cube.stats()["memo_hits"] == 1
+    assert cube.stats()["memo_misses"] == 1
+
+
+def test_backend_reuses_cube_while_fact_is_cached(fact):
+    backend = LocalQueryBackend(tables={"월별매출": fact})
+    query = "SELECT * FROM FNF.SAP_FNF.월별매출"
+    try:
+        cube = backend.rollup_cube("sales", query, ["월", "부서명"], ["매출액"])
+        assert backend.rollup_cube("sales", query, ["월", "부서명"], ["매출액"]) is cube
+        assert cube.rollup()["매출액"].tolist() == [1500]
+        
+        backend.invalidate_cache()
+        assert backend.rollup_cube("sales", query, ["월", "부서명"], ["매출액"]) is not cube
+    finally:
+        backend.close()
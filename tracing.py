@@ -0,0 +1,205 @@
+"""
+대시보드 실행 구간 추적 (tracing span)
+Streamlit 재실행의 단계별 소요 시간(CSS 주입, 로더, Plotly 차트, 표 렌더링 등)을
+지연 시간 히스토그램으로 모으고 Prometheus 텍스트 형식으로 내보냅니다.
+"""
+
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# 히스토그램 구간 상한 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prometheus 지표 이름
+METRIC_NAME = "dashboard_span_duration_seconds"
+
+# 바깥 span의 라벨 (예: tab) - 안쪽 span이 물려받음
+_SPAN_LABELS = contextvars.ContextVar('span_labels', default=())
+
+
+class LatencyHistogram:
+    """고정 구간 누적 히스토그램 (Prometheus histogram과 같은 구조)"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, seconds: float):
+        index = len(self.buckets)
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+    
+    def cumulative(self) -> List[int]:
+        """구간별 누적 건수 (마지막 값은 전체 건수)"""
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """구간 안을 선형 보간해 분위수(초)를 추정합니다 (Prometheus histogram_quantile과 같은 방식)."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for upper, cumulative in zip(self.buckets, self.cumulative()):
+            if cumulative >= rank:
+                in_bucket = cumulative - previous
+                return lower + (upper - lower) * ((rank - previous) / in_bucket if in_bucket else 0)
+            lower, previous = upper, cumulative
+        # +Inf 구간에 걸리면 마지막 상한으로 표시
+        return self.buckets[-1]
+
+
+class Tracer:
+    """span 이름과 라벨 조합별로 소요 시간 히스토그램을 모읍니다.
+    
+    사용 예:
+        with tracer.span("tab", tab="손익계산서"):
+            with tracer.span("plotly_chart", chart="income_trend"):
+                st.plotly_chart(fig)
+    
+    안쪽 span은 바깥 span의 라벨(tab 등)을 물려받습니다.
+    """
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._histograms = {}
+    
+    @contextmanager
+    def span(self, name: str, **labels):
+        """블록 실행 시간을 name/라벨 히스토그램에 기록하는 컨텍스트 매니저"""
+        merged = dict(_SPAN_LABELS.get())
+        merged.update({key: str(value) for key, value in labels.items()})
+        token = _SPAN_LABELS.set(tuple(sorted(merged.items())))
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _SPAN_LABELS.reset(token)
+            self.observe(name, time.perf_counter() - started, **merged)
+    
+    def observe(self, name: str, seconds: float, **labels):
+        """측정한 시간(초)을 직접 기록합니다 (예: 실행 시작부터 탭 표시까지)."""
+        key = (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self._buckets)
+            histogram.observe(seconds)
+    
+    def summary(self, name: Optional[str] = None) -> List[Dict]:
+        """span별 건수와 p50/p95/p99/평균(ms) 목록 (name을 주면 해당 span만)"""
+        rows = []
+        with self._lock:
+            for (span_name, labels), histogram in sorted(self._histograms.items()):
+                if name is not None and span_name != name:
+                    continue
+                row = {"span": span_name}
+                row.update(labels)
+                row["count"] = histogram.count
+                for label, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                    row[label] = round(histogram.quantile(q) * 1000, 1)
+                row["mean_ms"] = round(histogram.sum / histogram.count * 1000, 1)
+                rows.append(row)
+        return rows
+    
+    def prometheus_text(self) -> str:
+        """모든 히스토그램을 Prometheus 텍스트 노출 형식으로 반환합니다."""
+        lines = [
+            f"# HELP {METRIC_NAME} 대시보드 실행 구간별 소요 시간",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for (span_name, labels), histogram in sorted(self._histograms.items()):
+                base = [("span", span_name)] + list(labels)
+                bounds = [_format_bound(upper) for upper in histogram.buckets] + ["+Inf"]
+                for bound, cumulative in zip(bounds, histogram.cumulative()):
+                    lines.append(f"{METRIC_NAME}_bucket{_format_labels(base + [('le', bound)])} {cumulative}")
+                lines.append(f"{METRIC_NAME}_sum{_format_labels(base)} {histogram.sum:.6f}")
+                lines.append(f"{METRIC_NAME}_count{_format_labels(base)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+    
+    def write_prometheus_file(self, path: str):
+        """Prometheus 텍스트를 파일로 씁니다 (node_exporter textfile collector 등에서 읽음).
+        
+        임시 파일에 쓴 뒤 교체하므로 읽는 쪽이 반쯤 쓰인 파일을 보지 않습니다.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as metrics_file:
+                metrics_file.write(self.prometheus_text())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def _format_bound(value: float) -> str:
+    return f"{value:g}"
+
+
+def _format_labels(labels) -> str:
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", source: Optional[Tracer] = None) -> ThreadingHTTPServer:
+    """GET /metrics 요청에 Prometheus 텍스트를 돌려주는 HTTP 서버를 백그라운드 스레드로 시작합니다."""
+    source = source or tracer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            # 수집 요청마다 stderr에 로그를 남기지 않음
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+# 프로세스 공용 tracer
+tracer = Tracer()
+
+
+def span(name: str, **labels):
+    """공용 tracer의 span (Tracer.span 참고)"""
+    return tracer.span(name, **labels)